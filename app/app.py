@@ -1,9 +1,20 @@
 import asyncio
 
+from aiohttp import web
+from aiogram import Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 
 from extension import bot, dp
 from settings.config import settings
 from logging_handler.main import rout_logging
+from http_client.main import http_client
+from metrics.main import metrics_server
+from middlewares.metrics import setup_metrics_middlewares
+from bot_functions.total import archive_executor
+from utils.crawl_scheduler import crawl_scheduler
+from utils.image_cache import image_cache
+from bot_functions.find_video import get_youtube_client, close_youtube_clients
+from utils.weather_translations import get_weather_translations
 from views.main import router as main_router
 from views.weather_forecast import router as weather_forecast_router
 from views.find_image import router as find_image_router
@@ -14,27 +25,113 @@ from views.generate_password import router as generate_password_router
 
 
 async def on_startup():
-    """Выводит информацию о запуске бота."""
+    """Создает общие ресурсы и выводит информацию о запуске бота."""
+    await http_client.start()
+    await metrics_server.start()
+    await get_weather_translations(path=settings.PATH_TO_WEATHER_TRANSLATION).start()
+    # Без ключа клиент google не строится, поиск видео вернет ошибку при запросе
+    if (
+        settings.find_video.youtube.BACKEND == "googleapiclient"
+        and settings.find_video.youtube.YoutubeApiKey
+    ):
+        await get_youtube_client(
+            api_key=settings.find_video.youtube.YoutubeApiKey
+        ).start()
+    await bot.set_my_commands(settings.BOT_COMMAND)
+
+    if settings.RUN_MODE == "webhook":
+        # Без публичного адреса сервер принимает обновления, но телеграм о нем
+        # не знает (например при локальном тестировании)
+        if settings.webhook.BASE_URL:
+            await bot.set_webhook(
+                url=f"{settings.webhook.BASE_URL}{settings.webhook.PATH}",
+                secret_token=settings.webhook.SECRET_TOKEN,
+                allowed_updates=dp.resolve_used_update_types(),
+                drop_pending_updates=True,
+            )
+    else:
+        await bot.delete_webhook(drop_pending_updates=True)
     print("Бот запущен")
 
 
+async def on_shutdown():
+    """Закрывает общие ресурсы при остановке бота."""
+    await http_client.close()
+    await get_weather_translations(path=settings.PATH_TO_WEATHER_TRANSLATION).stop()
+    archive_executor.shutdown(wait=True)
+    await crawl_scheduler.shutdown()
+    await image_cache.flush()
+    close_youtube_clients()
+    await metrics_server.stop()
+    rout_logging.info("Бот остановлен")
+
+
+def setup_dispatcher(dispatcher: Dispatcher) -> Dispatcher:
+    """Подключает к диспетчеру роутеры и обработчики запуска и остановки."""
+
+    dispatcher.startup.register(on_startup)
+    dispatcher.shutdown.register(on_shutdown)
+    if settings.metrics.ENABLED:
+        setup_metrics_middlewares(dispatcher=dispatcher)
+    dispatcher.include_router(generate_password_router)
+    dispatcher.include_router(proxies_router)
+    dispatcher.include_router(find_video_router)
+    dispatcher.include_router(find_image_router)
+    dispatcher.include_router(weather_forecast_router)
+    dispatcher.include_router(user_info_router)
+    dispatcher.include_router(main_router)
+    return dispatcher
+
+
+def create_webhook_app() -> web.Application:
+    """Возвращает веб приложение aiohttp, принимающее обновления телеграм.
+
+    Запуск и остановка приложения вызывают обработчики запуска и остановки
+    диспетчера, поэтому общие ресурсы живут столько же, сколько веб сервер.
+    """
+    app: web.Application = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=settings.webhook.SECRET_TOKEN,
+        handle_in_background=settings.webhook.HANDLE_IN_BACKGROUND,
+    ).register(app, path=settings.webhook.PATH)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def run_webhook():
+    """Запускает веб сервер для получения обновлений через webhook."""
+
+    runner: web.AppRunner = web.AppRunner(create_webhook_app())
+    await runner.setup()
+    site: web.TCPSite = web.TCPSite(
+        runner,
+        host=settings.webhook.HOST,
+        port=settings.webhook.PORT,
+    )
+    await site.start()
+    rout_logging.info(
+        f"Webhook сервер слушает {settings.webhook.HOST}:{settings.webhook.PORT}"
+        f"{settings.webhook.PATH}"
+    )
+    try:
+        # Работаем до остановки процесса
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
 async def main():
     """Собирает все части приложения и запускает бота."""
 
     rout_logging.info("Бот запущен")
-    await bot.set_my_commands(settings.BOT_COMMAND)
-    await bot.delete_webhook(drop_pending_updates=True)
-
-    dp.startup.register(on_startup)
-    dp.include_router(generate_password_router)
-    dp.include_router(proxies_router)
-    dp.include_router(find_video_router)
-    dp.include_router(find_image_router)
-    dp.include_router(weather_forecast_router)
-    dp.include_router(user_info_router)
-    dp.include_router(main_router)
-
-    await dp.start_polling(bot)
+    setup_dispatcher(dispatcher=dp)
+
+    if settings.RUN_MODE == "webhook":
+        await run_webhook()
+    else:
+        await dp.start_polling(bot)
 
 
 if __name__ == "__main__":
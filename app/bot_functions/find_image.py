@@ -1,20 +1,37 @@
-from typing import Dict, List, Optional
-import os
+from typing import Callable, Dict, List, Optional
+from pathlib import Path
 import traceback
 import aiohttp
 from aiogram.types import Message
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
 from asyncio import AbstractEventLoop, Task
 
+from icrawler import ImageDownloader
 from icrawler.builtin import BingImageCrawler
 
 from logging_handler.main import error_logging
 from errors_handlers.main import error_handler_for_the_website
+from http_client.main import http_client
+from utils.crawl_scheduler import crawl_scheduler, CrawlQueueFullError
+from utils.image_cache import image_cache
+from bot_functions.total import create_zip_archive, get_list_images_name
 from settings.response import ResponseData
 from settings.config import settings
 
 
+class ProgressImageDownloader(ImageDownloader):
+    """Загрузчик картинок icrawler, сообщающий о каждой скачанной картинке.
+
+    on_download вызывается из потока загрузчика с именем сохраненного файла.
+    """
+
+    on_download: Optional[Callable[[str], None]] = None
+
+    def process_meta(self, task: Dict) -> None:
+        if task.get("success") and self.on_download is not None:
+            self.on_download(task["filename"])
+
+
 async def find_image_with_goole_and_save_image(
     name: str,
     count: int,
@@ -48,14 +65,14 @@ async def find_image_with_goole_and_save_image(
 
         # Проверяем доступен ли сайт с помощью которого будем скачивать
         # картинки
-        async with aiohttp.ClientSession() as session:
-            response: Dict = await error_handler_for_the_website(
-                session=session,
-                url="https://www.google.com/",
-                data_type="TEXT",
-            )
-            if response.error:
-                return response
+        session: aiohttp.ClientSession = http_client.session
+        response: Dict = await error_handler_for_the_website(
+            session=session,
+            url=settings.find_image.URL_CHECK_CONNECTION,
+            data_type="TEXT",
+        )
+        if response.error:
+            return response
 
         # Количество скаченных картинок
         crawler_download: int = 0
@@ -65,39 +82,66 @@ async def find_image_with_goole_and_save_image(
             f"📸 Загружено: {crawler_download} из {count}..."
         )
 
-        crawler: BingImageCrawler = BingImageCrawler(storage={"root_dir": path})
+        loop: AbstractEventLoop = asyncio.get_running_loop()
 
-        loop: AbstractEventLoop = asyncio.get_event_loop()
-        executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1)
+        # Очередь событий о скачанных картинках из потоков краулера
+        events: asyncio.Queue = asyncio.Queue()
+        crawler: BingImageCrawler = BingImageCrawler(
+            downloader_cls=ProgressImageDownloader,
+            storage={"root_dir": path},
+        )
+        crawler.downloader.on_download = lambda filename: loop.call_soon_threadsafe(
+            events.put_nowait, filename
+        )
+
+        async def report_position(position: int) -> None:
+            """Показывает пользователю место его поиска в очереди."""
+            if position:
+                text: str = f"⏳ Ваш запрос в очереди, позиция {position}..."
+            else:
+                text = f"📸 Загружено: {crawler_download} из {count}..."
+            await status_message.edit_text(text)
 
-        async def run_crowl() -> None:
-            await loop.run_in_executor(
-                executor,
-                lambda: crawler.crawl(
+        crawl_task: Task[None] = asyncio.create_task(
+            crawl_scheduler.submit(
+                user_id=message.from_user.id,
+                func=lambda: crawler.crawl(
                     keyword=name,
                     max_num=count,
                     filters=filters,
                 ),
+                on_position=report_position,
             )
+        )
+        # События о картинках попадают в очередь раньше, чем завершится задача,
+        # поэтому None в очереди означает конец скачивания
+        crawl_task.add_done_callback(lambda _: events.put_nowait(None))
 
-        crawl_task: Task[None] = asyncio.create_task(run_crowl())
-
-        # Отображаем прогресс скачивания для пользователя
-        last_count: int = 0
-        while not crawl_task.done():
-            await asyncio.sleep(1)
-            crawler_download = sum(len(files) for _, _, files in os.walk(path))
-            if crawler_download != last_count:
-                try:
-                    await status_message.edit_text(
-                        f"📸 Загружено: {crawler_download} из {count}..."
-                    )
-                    last_count = crawler_download
-                except Exception:
-                    traceback.print_exc()
-                    pass
+        # Отображаем прогресс скачивания для пользователя не чаще
+        # PROGRESS_EDIT_INTERVAL секунд
+        last_edit: float = 0.0
+        while await events.get() is not None:
+            crawler_download += 1
+            if loop.time() - last_edit < settings.find_image.PROGRESS_EDIT_INTERVAL:
+                continue
+            try:
+                await status_message.edit_text(
+                    f"📸 Загружено: {crawler_download} из {count}..."
+                )
+            except Exception:
+                traceback.print_exc()
+            last_edit = loop.time()
 
-        await crawl_task
+        try:
+            await crawl_task
+        except CrawlQueueFullError as error:
+            await status_message.delete()
+            return ResponseData(
+                error=str(error),
+                status=429,
+                url=getattr(response, "url", "<unknown>"),
+                method=getattr(response, "method", "TEXT"),
+            )
 
         if not crawler_download:
             return ResponseData(
@@ -133,6 +177,131 @@ async def find_image_with_goole_and_save_image(
         )
 
 
+async def find_image_archives(
+    name: str,
+    count: int,
+    filters: Dict,
+    path: Path,
+    message: Message,
+) -> ResponseData:
+    """Возвращает архив с картинками по запросу.
+
+    Повторные запросы с тем же названием и фильтрами отдаются из кэша
+    изображений на диске: сначала ищется готовый архив, затем сами картинки.
+    Поиск через BingImageCrawler запускается, только если в кэше ничего нет.
+
+    Args:
+        name (str): Имя картинки
+        count (int): Количество изображений для скачивания
+        filters (Dict): Фильтры для изображения
+        path (Path): Путь куда будут залиты изображения и архив
+        message: (Message): Тип сообщения для aiogram
+
+    Returns:
+        ResponseData: Объект с результатом запроса.
+
+        Атрибуты ResponseData:
+            - message (List[Path] | None): Пути до частей архива.
+            - error (str | None): Описание ошибки, если запрос завершился неудачей.
+            - status (int): HTTP-код ответа. 0 — если ошибка возникла на клиентской стороне.
+            - url (str): URL, по которому выполнялся запрос.
+            - method (str): HTTP-метод, использованный при запросе.
+    """
+    try:
+        use_cache: bool = settings.find_image.CACHE_ENABLED
+        response: ResponseData = ResponseData(status=200, url="<cache>", method="CACHE")
+
+        if use_cache:
+            list_path_archive: Optional[List[Path]] = await image_cache.get_archives(
+                keyword=name,
+                filters=filters,
+                count=count,
+                folder=path,
+            )
+            if list_path_archive:
+                response.message = list_path_archive
+                return response
+
+        list_images_name: Optional[List] = None
+        if use_cache:
+            list_images_name = await image_cache.get_images(
+                keyword=name,
+                filters=filters,
+                count=count,
+                folder=path,
+            )
+
+        if list_images_name is None:
+            response = await find_image_with_goole_and_save_image(
+                name=name,
+                count=count,
+                filters=filters,
+                path=path,
+                message=message,
+            )
+            if response.error:
+                return response
+
+            list_images_name = get_list_images_name(
+                count_images=response.message,
+                path_find_image=path,
+            )
+            if use_cache:
+                list_images_name = await image_cache.put_images(
+                    keyword=name,
+                    filters=filters,
+                    count=count,
+                    list_images_name=list_images_name,
+                    folder=path,
+                )
+
+        await message.answer(text="Идет упаковка в архив")
+
+        # В кэше картинки названы по хэшу, в архиве - по порядку
+        list_path_archive = await create_zip_archive(
+            path_folder=path,
+            path_archive=path / f"{name}.zip",
+            list_images_name=list_images_name,
+            list_arcnames=[
+                f"{number:06}{Path(path_image).suffix}"
+                for number, path_image in enumerate(list_images_name, start=1)
+            ],
+        )
+        if not list_path_archive:
+            return ResponseData(
+                error="Не удалось упаковать изображения в архив",
+                status=0,
+                url=response.url,
+                method=response.method,
+            )
+        if use_cache:
+            list_path_archive = await image_cache.put_archives(
+                keyword=name,
+                filters=filters,
+                count=count,
+                list_path_archive=list_path_archive,
+                folder=path,
+            )
+
+        response.message = list_path_archive
+        return response
+    except Exception:
+        error_logging.error(
+            settings.logging.ERROR_WEB_RESPONSE_MESSAGE.format(
+                method="<unknown>",
+                status=0,
+                url="<unknown>",
+                error_message=f"Unexpected error: {traceback.format_exc()}",
+            )
+        )
+        return ResponseData(
+            error="Ошибка на стороне сервера.Идет работа по исправлению...",
+            status=0,
+            url="<unknown>",
+            method="<unknown>",
+        )
+
+
 async def get_url_link_posters_for_kinopoisk(
     list_url: List, headers: Dict, message: Message
 ) -> ResponseData:
@@ -141,6 +310,10 @@ async def get_url_link_posters_for_kinopoisk(
     Возвращает обьект класса ResponseData, содержащий список с url ссылками
     на фото постеров и именами для фильмов с сайта кинопоиск.
 
+    Запросы выполняются одновременно, но не более POSTER_CONCURRENCY за раз.
+    Порядок постеров совпадает с порядком list_url, а ошибка для одного фильма
+    не прерывает поиск остальных.
+
     Args:
         list_url (List): Cписок с URL для сайта кипоиск
         headers (Dict): Заголовок должен быть вида
@@ -158,8 +331,6 @@ async def get_url_link_posters_for_kinopoisk(
             - method (str): HTTP-метод, использованный при запросе.
     """
     try:
-        array_link_img_url: List = []
-
         # Делаем оторбажения прогресс скачивания
         download: int = 0
         count: int = len(list_url)
@@ -171,38 +342,92 @@ async def get_url_link_posters_for_kinopoisk(
             )
         )
 
+        # Ссылки на постеры в порядке названий фильмов
+        array_link_img_url: List[Optional[List]] = [None] * count
+        # Ответы с ошибками для отдельных фильмов
+        error_responses: List[ResponseData] = []
+
         # Чтобы избежать UnboundLocalError
         poster_response: Optional[ResponseData] = None
-        async with aiohttp.ClientSession() as session:
-            for url in list_url:
-                # Делаем запрос на получени постера для фильма
-                poster_response: ResponseData = await error_handler_for_the_website(
-                    session=session,
+
+        # Ограничиваем количество одновременных запросов к кинопоиску
+        semaphore: asyncio.Semaphore = asyncio.Semaphore(
+            settings.recommender_system.kinopoisk.POSTER_CONCURRENCY
+        )
+        progress_lock: asyncio.Lock = asyncio.Lock()
+
+        async def update_progress() -> None:
+            """Обновляет сообщение с прогрессом по одному изменению за раз."""
+            async with progress_lock:
+                try:
+                    await status_message.edit_text(msg.format(download, count))
+                except Exception:
+                    traceback.print_exc()
+
+        async def get_poster(index: int, url: str) -> None:
+            """Получает ссылку на постер одного фильма. Ошибка для одного фильма
+            не прерывает получение остальных."""
+            nonlocal download, poster_response
+
+            # Делаем запрос на получени постера для фильма
+            async with semaphore:
+                response: ResponseData = await error_handler_for_the_website(
                     url=url,
                     headers=headers,
                 )
-                if poster_response.error:
-                    return poster_response
-                link_img_url: str = poster_response.message["docs"][0]["poster"]["url"]
-                # Если постер существует для фильма
-                if link_img_url:
-                    # Обновляем прогресс скачивания
-                    download += 1
-                    if download % 2 == 0 or download == count:
-                        await status_message.edit_text(
-                            msg.format(
-                                download,
-                                count,
-                            )
-                        )
-
-                    array_link_img_url.append(
-                        [
-                            link_img_url,
-                            poster_response.message["docs"][0]["name"],
-                        ]
+            if response.error:
+                error_responses.append(response)
+                return
+
+            try:
+                docs: List = response.message.get("docs") or []
+                if not docs:
+                    poster_response = response
+                    return
+
+                link_img_url: Optional[str] = (docs[0].get("poster") or {}).get(
+                    "url"
+                )
+                name: str = docs[0]["name"]
+            except Exception:
+                # Некорректный ответ для одного фильма не должен прерывать остальные
+                error_logging.error(
+                    settings.logging.ERROR_WEB_RESPONSE_MESSAGE.format(
+                        method=response.method,
+                        status=response.status,
+                        url=response.url,
+                        error_message=traceback.format_exc(),
+                    )
+                )
+                error_responses.append(
+                    ResponseData(
+                        error="Сайт вернул некорректный ответ",
+                        status=0,
+                        url=response.url,
+                        method=response.method,
                     )
+                )
+                return
+
+            poster_response = response
+            # Если постер существует для фильма
+            if link_img_url:
+                array_link_img_url[index] = [link_img_url, name]
+
+                # Обновляем прогресс скачивания
+                download += 1
+                if download % 2 == 0 or download == count:
+                    await update_progress()
+
+        await asyncio.gather(
+            *(get_poster(index, url) for index, url in enumerate(list_url))
+        )
+
+        array_link_img_url: List = [link for link in array_link_img_url if link]
         if not array_link_img_url:
+            # Если ни один запрос не удался, показываем ошибку сайта
+            if error_responses and poster_response is None:
+                return error_responses[0]
             return ResponseData(
                 error="Постеры для фильмов не найденны",
                 status=404,
@@ -1,114 +1,254 @@
 from typing import Optional, List, Dict
+from concurrent.futures import ThreadPoolExecutor
 import asyncio
+import functools
+import threading
 import traceback
+from urllib.parse import urlencode
 
+import httplib2
 from googleapiclient.errors import HttpError
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build, Resource
 from settings.response import ResponseData
 from logging_handler.main import error_logging
+from errors_handlers.main import error_handler_for_the_website
+from http_client.quota import quota_manager, QuotaExceededError
 
 from settings.config import settings
+from utils.cache import CoalescingTTLCache
 
 
-async def get_description_video_by_youtube(
-    name_video: str,
-    sort: str,
-    api_key: str,
+class YoutubeClient:
+    """Долгоживущий клиент YouTube Data API.
+
+    Сервис строится один раз из описания API, поставляемого вместе с
+    googleapiclient, поэтому при создании нет запросов в сеть. Запросы
+    выполняются в отдельном ограниченном пуле потоков, у каждого потока свой
+    httplib2.Http, так как он не потокобезопасен.
+    """
+
+    def __init__(self, api_key: Optional[str], workers: int, timeout: int):
+        """
+        Args:
+            api_key (str, optional): API ключ для youtube
+            workers (int): Сколько запросов к API выполняется одновременно
+            timeout (int): Таймаут запроса в секундах
+        """
+        self.api_key: Optional[str] = api_key
+        self.workers: int = workers
+        self.timeout: int = timeout
+        self._service: Optional[Resource] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._local: threading.local = threading.local()
+        self._build_lock: threading.Lock = threading.Lock()
+
+    @property
+    def service(self) -> Resource:
+        """Сервис youtube. Строится при первом обращении."""
+
+        with self._build_lock:
+            if self._service is None:
+                self._service = build(
+                    "youtube",
+                    "v3",
+                    developerKey=self.api_key,
+                    static_discovery=True,
+                    cache_discovery=False,
+                )
+        return self._service
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="youtube",
+            )
+        return self._executor
+
+    def _get_http(self) -> httplib2.Http:
+        """Возвращает httplib2.Http текущего потока."""
+
+        http: Optional[httplib2.Http] = getattr(self._local, "http", None)
+        if http is None:
+            http = httplib2.Http(timeout=self.timeout)
+            self._local.http = http
+        return http
+
+    def _execute_search(self, **params) -> Dict:
+        return self.service.search().list(**params).execute(http=self._get_http())
+
+    async def search(self, **params) -> Dict:
+        """Выполняет search.list в пуле потоков клиента.
+
+        Args:
+            **params: Параметры метода search.list
+        """
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor,
+            functools.partial(self._execute_search, **params),
+        )
+
+    async def start(self) -> None:
+        """Строит сервис заранее, чтобы первый поиск не тратил на это время."""
+
+        await asyncio.to_thread(lambda: self.service)
+
+    def close(self) -> None:
+        """Останавливает пул потоков клиента."""
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+# Клиенты по API ключу
+_youtube_clients: Dict[Optional[str], YoutubeClient] = {}
+
+
+def get_youtube_client(api_key: Optional[str]) -> YoutubeClient:
+    """Возвращает общий клиент youtube для API ключа."""
+
+    if api_key not in _youtube_clients:
+        _youtube_clients[api_key] = YoutubeClient(
+            api_key=api_key,
+            workers=settings.find_video.youtube.WORKERS,
+            timeout=settings.find_video.youtube.TIMEOUT,
+        )
+    return _youtube_clients[api_key]
+
+
+def close_youtube_clients() -> None:
+    """Останавливает пулы потоков всех клиентов youtube."""
+
+    for client in _youtube_clients.values():
+        client.close()
+
+
+# Кэш результатов поиска. Ключ - (запрос, сортировка, язык, количество результатов)
+youtube_search_cache: CoalescingTTLCache = CoalescingTTLCache(
+    maxsize=settings.find_video.youtube.CACHE_MAXSIZE,
+    ttl=settings.find_video.youtube.CACHE_TTL,
+)
+
+
+def parse_youtube_items(items: List[Dict]) -> List[Dict]:
+    """Возвращает из ответа search.list только нужные поля результатов.
+
+    Args:
+        items (List[Dict]): Список items ответа youtube
+
+    Returns:
+        List[Dict]: Список словарей с ключами video_id, channel_id, title, description
+    """
+    return [
+        {
+            "video_id": item["id"].get("videoId", None),
+            "channel_id": item["id"].get("channelId", None),
+            "title": item["snippet"]["title"].replace("&quot;", " "),
+            "description": item["snippet"]["description"].replace("&quot;", " "),
+        }
+        for item in items
+    ]
+
+
+def format_video_description(
+    video: Dict,
+    order: int,
     youtube_video_url: str,
     youtube_channel_url: str,
-    max_results: int = 50,
-    relevance_language: str = "ru",
-) -> ResponseData:
-    """
-    Ищет видео по имени для сайта youtube. Возвращает обьект ResponseData содержащий
-    список с данными.
+) -> str:
+    """Возвращает описание видео для пользователя.
 
     Args:
-        name_video (str): Имя видео
-        sort (str): тип сортировки
-        api_key (str): API ключ для youtube
+        video (Dict): Результат поиска из parse_youtube_items
+        order (int): Номер видео в выдаче
         youtube_video_url (str): URL поиска видео
         youtube_channel_url (str): URL поиска по каналам
+    """
+    if video["video_id"]:
+        url: str = youtube_video_url.format(video["video_id"])
+        template: str = f"Ссылка на видео\n{url}"
+    else:
+        url: str = youtube_channel_url.format(video["channel_id"])
+        template: str = f"Ссылка на канал\n{url}"
+
+    return f"{order}. {video['title']}\n\n{video['description']}\n\n{template}\n"
+
+
+def get_search_params(
+    name_video: str,
+    sort: str,
+    max_results: int,
+    relevance_language: str,
+) -> Dict:
+    """Возвращает параметры метода search.list для поиска.
+
+    Args:
+        name_video (str): Имя видео
+        sort (str): тип сортировки. 'channel' - поиск каналов
         max_results: int(): Количество результатов для поиска
         relevance_language: (str): Язык наиболее релевантный для выдачи ответов
+    """
+    params: Dict = {
+        "q": name_video,
+        "part": "snippet",
+        "relevanceLanguage": relevance_language,
+        "type": "channel" if sort == "channel" else "video",
+        "maxResults": max_results,
+    }
+    # Для каналов youtube сортирует по релевантности
+    if sort != "channel":
+        params["order"] = sort
+    return params
 
-    Returns:
-        ResponseData: Объект с результатом запроса.
 
-        Атрибуты ResponseData:
-            - message (Any | None): Данные успешного ответа (если запрос прошёл успешно).
-            - error (str | None): Описание ошибки, если запрос завершился неудачей.
-            - status (int): HTTP-код ответа. 0 — если ошибка возникла на клиентской стороне.
-            - url (str): URL, по которому выполнялся запрос.
-            - method (str): HTTP-метод, использованный при запросе.
+async def search_youtube_with_googleapiclient(
+    name_video: str,
+    sort: str,
+    api_key: str,
+    max_results: int,
+    relevance_language: str,
+) -> ResponseData:
+    """Ищет видео через клиент google в пуле потоков YoutubeClient.
+
+    Returns:
+        ResponseData: Объект с результатом запроса, message - результаты
+        parse_youtube_items
     """
     try:
-        service = build(
-            "youtube",
-            "v3",
-            developerKey=api_key,
-        )
-
-        type_youtube: str = (
-            "channel" if sort == "channel" else "video"
-        )  # Определяем тип сортировки
-        order_youtube: Optional[str] = (
-            None if sort == "channel" else sort
-        )  # Определяем критерии сортировки
-
-        loop: asyncio.AbstractEventLoop = asyncio.get_event_loop()
-
-        response_youtube: Dict = await loop.run_in_executor(
-            None,
-            lambda: service.search()
-            .list(
-                q=name_video,
-                part="snippet",
-                relevanceLanguage=relevance_language,
-                type=type_youtube,
-                maxResults=max_results,
-                order=order_youtube,
+        # Клиент google идет в сеть мимо error_handler_for_the_website, поэтому
+        # ограничение запросов проверяется здесь
+        await quota_manager.acquire(service="youtube")
+        response_youtube: Dict = await get_youtube_client(api_key=api_key).search(
+            **get_search_params(
+                name_video=name_video,
+                sort=sort,
+                max_results=max_results,
+                relevance_language=relevance_language,
             )
-            .execute(),
         )
 
-        response_youtube: Optional[List] = response_youtube.get("items", None)
+        return ResponseData(
+            message=parse_youtube_items(response_youtube.get("items") or []),
+            status=200,
+            method="GET",
+            url="https://www.youtube.com/",
+        )
 
-        if not response_youtube:
-            return ResponseData(
-                error="Не найденно ни одного видео",
-                status=200,
+    except QuotaExceededError as err:
+        error_logging.error(
+            settings.logging.ERROR_WEB_RESPONSE_MESSAGE.format(
                 method="GET",
+                status=429,
                 url="https://www.youtube.com/",
+                error_message=str(err),
             )
-
-        array_video_description: List = []
-        order: int = 0
-        # Проходимся по списку с ответами для youtube
-        for result in response_youtube:
-            order += 1  # Номер описания видео
-            video_id: str = result["id"].get("videoId", None)
-            channel_id: str = result["id"].get("channelId", None)
-
-            if video_id:
-                url: str = youtube_video_url.format(video_id)
-                template: str = f"Ссылка на видео\n{url}"
-
-            else:
-                url: str = youtube_channel_url.format(channel_id)
-                template: str = f"Ссылка на канал\n{url}"
-
-            # Формируем описание для видео
-            title: str = result["snippet"]["title"].replace("&quot;", " ")
-            description: str = result["snippet"]["description"].replace("&quot;", " ")
-
-            array_video_description.append(
-                f"{order}. {title}\n\n{description}\n\n{template}\n"
-            )
-
+        )
         return ResponseData(
-            message=array_video_description,
-            status=200,
+            error=str(err),
+            status=429,
             method="GET",
             url="https://www.youtube.com/",
         )
@@ -122,7 +262,6 @@ async def get_description_video_by_youtube(
                 error_message=f"Youtube API error: {err.reason}",
             )
         )
-        error_logging.error()
         return ResponseData(
             error="Ошибка при доступе к youtube",
             status=err.status_code,
@@ -146,3 +285,144 @@ async def get_description_video_by_youtube(
             url="<unknown>",
             method="<unknown>",
         )
+
+
+async def search_youtube_with_aiohttp(
+    name_video: str,
+    sort: str,
+    api_key: str,
+    max_results: int,
+    relevance_language: str,
+) -> ResponseData:
+    """Ищет видео запросом к REST методу search.list через общую сессию aiohttp,
+    не занимая потоков.
+
+    Returns:
+        ResponseData: Объект с результатом запроса, message - результаты
+        parse_youtube_items
+    """
+    params: Dict = get_search_params(
+        name_video=name_video,
+        sort=sort,
+        max_results=max_results,
+        relevance_language=relevance_language,
+    )
+    url: str = f"{settings.find_video.youtube.SEARCH_URL}?{urlencode(params)}"
+
+    # Ключ передается заголовком, чтобы не попадать в логи вместе с URL
+    response: ResponseData = await error_handler_for_the_website(
+        url=url,
+        timeout=settings.find_video.youtube.TIMEOUT,
+        headers={"X-Goog-Api-Key": api_key},
+    )
+    if response.error:
+        return response
+
+    try:
+        response.message = parse_youtube_items(response.message.get("items") or [])
+        return response
+    except Exception:
+        error_logging.error(
+            settings.logging.ERROR_WEB_RESPONSE_MESSAGE.format(
+                method="GET",
+                status=response.status,
+                url=settings.find_video.youtube.SEARCH_URL,
+                error_message=f"Unexpected error: {traceback.format_exc()}",
+            )
+        )
+        return ResponseData(
+            error="Ошибка на стороне сервера.Идет работа по исправлению...",
+            status=0,
+            url=settings.find_video.youtube.SEARCH_URL,
+            method="GET",
+        )
+
+
+async def fetch_youtube_videos(
+    name_video: str,
+    sort: str,
+    api_key: str,
+    max_results: int,
+    relevance_language: str,
+) -> ResponseData:
+    """Ищет видео без кэша способом из settings.find_video.youtube.BACKEND.
+
+    Returns:
+        ResponseData: Объект с результатом запроса, message - результаты
+        parse_youtube_items
+    """
+    search = (
+        search_youtube_with_aiohttp
+        if settings.find_video.youtube.BACKEND == "aiohttp"
+        else search_youtube_with_googleapiclient
+    )
+    return await search(
+        name_video=name_video,
+        sort=sort,
+        api_key=api_key,
+        max_results=max_results,
+        relevance_language=relevance_language,
+    )
+
+
+async def get_description_video_by_youtube(
+    name_video: str,
+    sort: str,
+    api_key: str,
+    max_results: int = 50,
+    relevance_language: str = "ru",
+) -> ResponseData:
+    """
+    Ищет видео по имени для сайта youtube. Возвращает обьект ResponseData содержащий
+    список с результатами поиска из parse_youtube_items. Для показа пользователю
+    результат форматируется через format_video_description.
+
+    Результаты поиска хранятся в youtube_search_cache, поэтому повторный запрос
+    с той же сортировкой и языком не тратит квоту API.
+
+    Args:
+        name_video (str): Имя видео
+        sort (str): тип сортировки
+        api_key (str): API ключ для youtube
+        max_results: int(): Количество результатов для поиска
+        relevance_language: (str): Язык наиболее релевантный для выдачи ответов
+
+    Returns:
+        ResponseData: Объект с результатом запроса.
+
+        Атрибуты ResponseData:
+            - message (Any | None): Данные успешного ответа (если запрос прошёл успешно).
+            - error (str | None): Описание ошибки, если запрос завершился неудачей.
+            - status (int): HTTP-код ответа. 0 — если ошибка возникла на клиентской стороне.
+            - url (str): URL, по которому выполнялся запрос.
+            - method (str): HTTP-метод, использованный при запросе.
+    """
+    response: ResponseData = await youtube_search_cache.get_or_fetch(
+        key=(
+            " ".join(name_video.casefold().split()),
+            sort,
+            relevance_language,
+            max_results,
+        ),
+        fetch=lambda: fetch_youtube_videos(
+            name_video=name_video,
+            sort=sort,
+            api_key=api_key,
+            max_results=max_results,
+            relevance_language=relevance_language,
+        ),
+        should_cache=lambda response: not response.error,
+    )
+    if response.error:
+        return response
+
+    if not response.message:
+        return ResponseData(
+            error="Не найденно ни одного видео",
+            status=200,
+            method="GET",
+            url="https://www.youtube.com/",
+        )
+
+    # Копия, чтобы изменения ответа не попали в кэш
+    return response.model_copy()
@@ -3,6 +3,7 @@ import traceback
 from typing import Dict
 
 from errors_handlers.main import error_handler_for_the_website
+from http_client.main import http_client
 from settings.response import ResponseData
 from logging_handler.main import error_logging
 from settings.config import settings
@@ -34,31 +35,31 @@ async def get_proxies_by_webshare(
     """
 
     try:
-        async with aiohttp.ClientSession() as session:
-            # Делаем запрос на получение токена
-            response_token: ResponseData = await error_handler_for_the_website(
-                session=session,
-                url=url_config,
-                headers={
-                    "Authorization": f"{api_key}",
-                },
-            )
+        session: aiohttp.ClientSession = http_client.session
+        # Делаем запрос на получение токена
+        response_token: ResponseData = await error_handler_for_the_website(
+            session=session,
+            url=url_config,
+            headers={
+                "Authorization": f"{api_key}",
+            },
+        )
 
-            if response_token.error:
-                return response_token
+        if response_token.error:
+            return response_token
 
-            token: Dict = response_token.message[
-                "proxy_list_download_token"
-            ]  # Получаем токен
+        token: Dict = response_token.message[
+            "proxy_list_download_token"
+        ]  # Получаем токен
 
-            # Делаем запрос на получение прокси адресов
-            response_proxies: ResponseData = await error_handler_for_the_website(
-                session=session,
-                url=url_proxeis_list.format(token=token),
-                data_type="TEXT",
-            )
-            if response_proxies.error:
-                return response_proxies
+        # Делаем запрос на получение прокси адресов
+        response_proxies: ResponseData = await error_handler_for_the_website(
+            session=session,
+            url=url_proxeis_list.format(token=token),
+            data_type="TEXT",
+        )
+        if response_proxies.error:
+            return response_proxies
         # Получаем список из адресо прокси
         proxies_list: str = response_proxies.message.split("\r\n")
         proxies_list.pop(-1)
@@ -1,15 +1,17 @@
-from typing import List, Optional
+from typing import List, Optional, Set
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
 import shutil
 from pathlib import Path
 import os
 import traceback
 import zipfile
-import aiohttp
 from aiogram.types import Message
 import time
 
 from logging_handler.main import error_logging
-from errors_handlers.main import error_handler_for_the_website
+from errors_handlers.main import download_file_for_the_website
 from settings.response import ResponseData
 from settings.config import settings
 
@@ -46,6 +48,9 @@ def delete_images_and_archive(
         deleter_folder: (Path): Флаг для удаления папки(True для удаления, False оставить)
     """
 
+    if not os.path.exists(path_folder):
+        return
+
     for filename in os.listdir(path_folder):
         filepath: str = os.path.join(path_folder, filename)
         try:
@@ -72,28 +77,145 @@ def delete_images_and_archive(
             error_logging.error(msg=f"Не удалось удалить - {path_folder}")
 
 
+# Потоки для упаковки архивов, чтобы не блокировать цикл событий
+archive_executor: ThreadPoolExecutor = ThreadPoolExecutor(
+    max_workers=settings.find_image.ARCHIVE_WORKERS,
+    thread_name_prefix="zip_archive",
+)
+
+
+def get_zip_entry_size(file_path: str, arcname: str) -> int:
+    """Возвращает размер, который файл займет в архиве без сжатия, вместе с
+    локальным заголовком, дескриптором данных и записью центрального каталога.
+
+    Args:
+        file_path (str): Путь до файла
+        arcname (str): Имя файла в архиве
+    """
+    name_size: int = len(arcname.encode("utf-8"))
+    return os.path.getsize(file_path) + 30 + 16 + 46 + 2 * name_size + 2 * 20
+
+
 def save_images_with_zip_archive(
     path_folder: Path,
     path_archive: Path,
     list_images_name: List,
-):
+    max_part_size: Optional[int] = None,
+    list_arcnames: Optional[List[str]] = None,
+) -> List[Path]:
     """Сохраняет изображения в zip архив.
 
+    Файлы пишутся в архив потоково, уже сжатые форматы сохраняются без сжатия.
+    Если архив получается больше max_part_size, он делится на несколько частей
+    с именами вида name_part1.zip, name_part2.zip
+
     Args:
         path_folder (Path): Путь до папки
         path_archive (Path): Путь до архива
         list_images_name (List): Список с путями изображений
+        max_part_size (int, optional): Максимальный размер одной части архива в байтах.
+            По умолчанию settings.find_image.ARCHIVE_PART_SIZE
+        list_arcnames (List[str], optional): Имена файлов в архиве.
+            По умолчанию имена файлов изображений
+
+    Returns:
+        List[Path]: Список путей до частей архива
     """
-    if not os.path.exists(path_folder):
-        os.mkdir(path_folder)
+    os.makedirs(path_folder, exist_ok=True)
 
-    with zipfile.ZipFile(path_archive, "w", zipfile.ZIP_DEFLATED) as file:
-        try:
-            for file_path in list_images_name:
-                file.write(file_path, arcname=os.path.basename(file_path))
-        except Exception:
-            error_logging.error(traceback.format_exc())
-            traceback.print_exc()
+    max_part_size = max_part_size or settings.find_image.ARCHIVE_PART_SIZE
+    stored_extensions: Set[str] = set(settings.find_image.STORED_EXTENSIONS)
+    path_archive = Path(path_archive)
+
+    list_path_parts: List[Path] = []
+    archive: Optional[zipfile.ZipFile] = None
+    # Оценка размера текущей части, включая центральный каталог
+    part_size: int = 0
+
+    try:
+        for index, file_path in enumerate(list_images_name):
+            try:
+                arcname: str = (
+                    list_arcnames[index]
+                    if list_arcnames
+                    else os.path.basename(file_path)
+                )
+                entry_size: int = get_zip_entry_size(
+                    file_path=file_path,
+                    arcname=arcname,
+                )
+                if entry_size + 22 > max_part_size:
+                    error_logging.error(
+                        msg=f"Файл {file_path} больше допустимого размера архива"
+                    )
+                    continue
+
+                if archive is not None and part_size + entry_size > max_part_size:
+                    archive.close()
+                    archive = None
+
+                if archive is None:
+                    path_part: Path = path_archive.with_name(
+                        f"{path_archive.stem}_part{len(list_path_parts) + 1}.zip"
+                    )
+                    archive = zipfile.ZipFile(path_part, "w")
+                    list_path_parts.append(path_part)
+                    # Запись конца центрального каталога
+                    part_size = 22
+
+                compress_type: int = (
+                    zipfile.ZIP_STORED
+                    if Path(file_path).suffix.lower() in stored_extensions
+                    else zipfile.ZIP_DEFLATED
+                )
+                # ZipFile.write копирует файл блоками, не читая его целиком
+                archive.write(file_path, arcname=arcname, compress_type=compress_type)
+                part_size += entry_size
+            except Exception:
+                error_logging.error(traceback.format_exc())
+                traceback.print_exc()
+    finally:
+        if archive is not None:
+            archive.close()
+
+    # Если часть одна, архив сохраняется под исходным именем
+    if len(list_path_parts) == 1:
+        list_path_parts[0].replace(path_archive)
+        list_path_parts = [path_archive]
+    return list_path_parts
+
+
+async def create_zip_archive(
+    path_folder: Path,
+    path_archive: Path,
+    list_images_name: List,
+    max_part_size: Optional[int] = None,
+    list_arcnames: Optional[List[str]] = None,
+) -> List[Path]:
+    """Упаковывает изображения в zip архив в отдельном потоке.
+
+    Args:
+        path_folder (Path): Путь до папки
+        path_archive (Path): Путь до архива
+        list_images_name (List): Список с путями изображений
+        max_part_size (int, optional): Максимальный размер одной части архива в байтах
+        list_arcnames (List[str], optional): Имена файлов в архиве
+
+    Returns:
+        List[Path]: Список путей до частей архива
+    """
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        archive_executor,
+        functools.partial(
+            save_images_with_zip_archive,
+            path_folder=path_folder,
+            path_archive=path_archive,
+            list_images_name=list_images_name,
+            max_part_size=max_part_size,
+            list_arcnames=list_arcnames,
+        ),
+    )
 
 
 async def save_images(
@@ -101,8 +223,11 @@ async def save_images(
     path: Path,
     message: Message,
 ) -> ResponseData:
-    """Сохраняет картинки из url в папку и возращает обьект класса ResponseData
-       содержащий списк путей к изображениям
+    """Параллельно скачивает картинки из url в папку и возращает обьект класса
+       ResponseData содержащий списк путей к изображениям
+
+       Каждая картинка пишется на диск по частям, одновременно скачивается не больше
+       settings.find_image.DOWNLOAD_CONCURRENCY картинок
 
     Args:
         list_url (List): Список содержащий URL ссылки на изображения и имя файла
@@ -120,63 +245,106 @@ async def save_images(
             - method (str): HTTP-метод, использованный при запросе.
     """
     try:
-        # Чтобы избежать UnboundLocalError
-        response: Optional[ResponseData] = None
+        msg: str = "📸 Скаченно изображений {} из {}..."
+        total_count: int = len(list_url)
+        # Скачанные картинки и все завершенные загрузки, в том числе неудачные
+        count: int = 0
+        done: int = 0
+        # Ответ последней неудачной загрузки, чтобы вернуть пользователю ошибку
+        last_error: Optional[ResponseData] = None
+        semaphore: asyncio.Semaphore = asyncio.Semaphore(
+            settings.find_image.DOWNLOAD_CONCURRENCY
+        )
+        progress_lock: asyncio.Lock = asyncio.Lock()
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        last_edit: float = 0.0
 
-        async with aiohttp.ClientSession() as session:
-            msg: str = "📸 Скаченно изображений {} из {}..."
-            total_count: int = len(list_url)
-            count: int = 0
-            final_list_path_img: List = []
+        status_message: Message = await message.answer(
+            text=msg.format(0, total_count)
+        )
 
-            status_message: Message = await message.answer(
-                text=msg.format(0, total_count)
-            )
+        # Папки find_image может еще не быть
+        os.makedirs(path, exist_ok=True)
+
+        async def update_progress(downloaded: bool) -> None:
+            """Обновляет сообщение о ходе скачивания по порядку завершения загрузок.
+
+            Сообщение меняется не чаще PROGRESS_EDIT_INTERVAL секунд и после
+            последней загрузки. Ошибка телеграм при изменении сообщения не
+            прерывает скачивание остальных картинок.
+            """
+            nonlocal count, done, last_edit
 
-            if not os.path.exists(path=path):
-                os.mkdir(path)
+            async with progress_lock:
+                count += downloaded
+                done += 1
+                if (
+                    done < total_count
+                    and loop.time() - last_edit
+                    < settings.find_image.PROGRESS_EDIT_INTERVAL
+                ):
+                    return
+                try:
+                    await status_message.edit_text(msg.format(count, total_count))
+                except Exception:
+                    traceback.print_exc()
+                last_edit = loop.time()
 
-            for url, name in list_url:
-                response: ResponseData = await error_handler_for_the_website(
-                    session=session,
+        async def download(url: str, path_img: Path) -> Optional[Path]:
+            """Скачивает одно изображение и возвращает путь до него."""
+            nonlocal last_error
+
+            async with semaphore:
+                response: ResponseData = await download_file_for_the_website(
                     url=url,
-                    data_type="BYTES",
+                    path=path_img,
+                    max_size=settings.find_image.MAX_IMAGE_SIZE,
+                    chunk_size=settings.find_image.DOWNLOAD_CHUNK_SIZE,
                 )
 
-                if response.error:
-                    continue
-                count += 1
-
-                path_img: Path = path / f"{name}.jpg"
-                with open(path_img, "wb") as file:
-                    file.write(response.message)
-                final_list_path_img.append(path_img)
-
-                if count % 2 == 0 or count == total_count:
-                    await status_message.edit_text(
-                        msg.format(
-                            count,
-                            total_count,
-                        )
-                    )
+            await update_progress(downloaded=not response.error)
+            if response.error:
+                last_error = response
+                return None
+            return path_img
+
+        # Одинаковые имена файлов при параллельной записи испортили бы друг друга
+        list_path_img: List[Path] = []
+        used_names: Set[str] = set()
+        for index, (_, name) in enumerate(list_url):
+            name: str = str(name).replace("/", "_").replace(os.sep, "_")
+            if name in used_names:
+                name = f"{name}_{index}"
+            used_names.add(name)
+            list_path_img.append(path / f"{name}.jpg")
+
+        results: List[Optional[Path]] = await asyncio.gather(
+            *(
+                download(url=url, path_img=path_img)
+                for (url, _), path_img in zip(list_url, list_path_img)
+            )
+        )
+        final_list_path_img: List[Path] = [
+            path_img for path_img in results if path_img is not None
+        ]
 
         if not final_list_path_img:
             return ResponseData(
                 error="Не удалось скачать ни одного изображения",
                 status=404,
-                url=getattr(response, "url", "<unknown>"),
-                method=getattr(response, "method", "BYTES"),
+                url=getattr(last_error, "url", "<unknown>"),
+                method=getattr(last_error, "method", "GET"),
             )
 
         return ResponseData(
             message=final_list_path_img,
             status=200,
-            url=response.url,
-            method=response.method,
+            url=list_url[0][0],
+            method="GET",
         )
     except Exception:
         error_logging.error(
-            settings.logging.ERROR_WEB_RESPONSE_MESSAGE(
+            settings.logging.ERROR_WEB_RESPONSE_MESSAGE.format(
                 method="<unknown>",
                 status=0,
                 url="<unknown>",
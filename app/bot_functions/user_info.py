@@ -8,6 +8,7 @@ import aiohttp
 from settings.response import ResponseData
 from settings.config import settings
 from errors_handlers.main import error_handler_for_the_website
+from http_client.main import http_client
 from logging_handler.main import error_logging
 
 
@@ -38,11 +39,11 @@ async def get_ip_info(
 
     try:
         # Получаем данные с сайта
-        async with aiohttp.ClientSession() as session:
-            response_ip: ResponseData = await error_handler_for_the_website(
-                session=session,
-                url=url,
-            )
+        session: aiohttp.ClientSession = http_client.session
+        response_ip: ResponseData = await error_handler_for_the_website(
+            session=session,
+            url=url,
+        )
 
         if response_ip.error:
             return response_ip
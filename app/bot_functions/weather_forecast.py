@@ -1,5 +1,4 @@
 from typing import List, Dict, Optional
-import json
 import traceback
 from pathlib import Path
 
@@ -7,9 +6,201 @@ import folium
 import aiohttp
 
 from errors_handlers.main import error_handler_for_the_website
+from http_client.main import http_client
 from logging_handler.main import error_logging
+from metrics.main import metrics, Counter, Gauge
 from settings.response import ResponseData
 from settings.config import settings
+from utils.cache import CoalescingTTLCache
+from utils.weather_translations import WeatherTranslations, get_weather_translations
+
+
+CITY_NOT_FOUND_ERROR: str = "Такого города не существует"
+
+# Кэш координат городов. Ключ - нормализованное название города
+geocoding_cache: CoalescingTTLCache = CoalescingTTLCache(
+    maxsize=settings.weather_cache.GEOCODING_MAXSIZE,
+    ttl=settings.weather_cache.GEOCODING_TTL,
+)
+
+
+# Кэши ответов сайта. Ключ - координаты, округленные до COORDINATES_PRECISION знаков
+current_weather_cache: CoalescingTTLCache = CoalescingTTLCache(
+    maxsize=settings.weather_cache.RESPONSE_MAXSIZE,
+    ttl=settings.weather_cache.CURRENT_TTL,
+)
+forecast_cache: CoalescingTTLCache = CoalescingTTLCache(
+    maxsize=settings.weather_cache.RESPONSE_MAXSIZE,
+    ttl=settings.weather_cache.FORECAST_TTL,
+)
+air_pollution_cache: CoalescingTTLCache = CoalescingTTLCache(
+    maxsize=settings.weather_cache.RESPONSE_MAXSIZE,
+    ttl=settings.weather_cache.AIR_POLLUTION_TTL,
+)
+
+
+def get_weather_cache_stats() -> Dict:
+    """Возвращает счетчики попаданий и промахов для всех кэшей прогноза погоды."""
+
+    return {
+        "geocoding": geocoding_cache.stats(),
+        "current_weather": current_weather_cache.stats(),
+        "forecast": forecast_cache.stats(),
+        "air_pollution": air_pollution_cache.stats(),
+    }
+
+
+weather_cache_hits_total: Counter = metrics.counter(
+    "weather_cache_hits_total", "Попадания в кэши прогноза погоды", ["cache"]
+)
+weather_cache_misses_total: Counter = metrics.counter(
+    "weather_cache_misses_total", "Промахи кэшей прогноза погоды", ["cache"]
+)
+weather_cache_coalesced_total: Counter = metrics.counter(
+    "weather_cache_coalesced_total",
+    "Запросы, дождавшиеся уже идущей загрузки того же ключа",
+    ["cache"],
+)
+weather_cache_size: Gauge = metrics.gauge(
+    "weather_cache_size", "Количество записей в кэшах прогноза погоды", ["cache"]
+)
+
+
+def collect_weather_cache_stats() -> None:
+    """Переносит счетчики кэшей в метрики. Доля попаданий считается в
+    Prometheus как hits / (hits + misses)."""
+
+    for cache, stats in get_weather_cache_stats().items():
+        weather_cache_hits_total.set(stats["hits"], cache=cache)
+        weather_cache_misses_total.set(stats["misses"], cache=cache)
+        weather_cache_coalesced_total.set(stats["coalesced"], cache=cache)
+        weather_cache_size.set(stats["size"], cache=cache)
+
+
+metrics.add_collector(collect_weather_cache_stats)
+
+
+def normalize_city_name(city: str) -> str:
+    """Приводит название города к виду для ключа кэша: без лишних пробелов и
+    без учета регистра."""
+    return " ".join(city.split()).casefold()
+
+
+async def get_geolocation_city(
+    city: str,
+    url_geolocated_openweathermap: str,
+    api_openweathermap: str,
+) -> ResponseData:
+    """Возвращает координаты города из данных сайта https://openweathermap.org.
+
+    Координаты и ответ о несуществующем городе сохраняются в geocoding_cache,
+    поэтому повторные запросы того же города не обращаются к сайту, а
+    одновременные запросы одного города выполняются одним запросом.
+
+    Args:
+        city (str): Название города
+        url_geolocated_openweathermap (str): URL для получения геолокации
+        api_openweathermap (str): API для сайта openweathermap
+
+    Returns:
+        ResponseData: Объект с результатом запроса.
+
+        Атрибуты ResponseData:
+            - message (Dict | None): Словарь вида {"lat": <широта>, "lon": <долгота>}.
+            - error (str | None): Описание ошибки, если запрос завершился неудачей.
+            - status (int): HTTP-код ответа. 0 — если ошибка возникла на клиентской стороне.
+            - url (str): URL, по которому выполнялся запрос.
+            - method (str): HTTP-метод, использованный при запросе.
+    """
+    return await geocoding_cache.get_or_fetch(
+        key=normalize_city_name(city),
+        fetch=lambda: fetch_geolocation_city(
+            city=city,
+            url_geolocated_openweathermap=url_geolocated_openweathermap,
+            api_openweathermap=api_openweathermap,
+        ),
+        # Ошибки сайта не кэшируем, они могут быть временными
+        should_cache=lambda response: response.error in (None, CITY_NOT_FOUND_ERROR),
+        ttl_for=lambda response: (
+            settings.weather_cache.GEOCODING_NEGATIVE_TTL if response.error else None
+        ),
+    )
+
+
+async def fetch_geolocation_city(
+    city: str,
+    url_geolocated_openweathermap: str,
+    api_openweathermap: str,
+) -> ResponseData:
+    """Запрашивает координаты города у сайта https://openweathermap.org без кэша.
+
+    Args:
+        city (str): Название города
+        url_geolocated_openweathermap (str): URL для получения геолокации
+        api_openweathermap (str): API для сайта openweathermap
+
+    Returns:
+        ResponseData: Объект с результатом запроса как в get_geolocation_city.
+    """
+    geolocated_response: ResponseData = await error_handler_for_the_website(
+        url=url_geolocated_openweathermap.format(city, api_openweathermap),
+    )
+    if geolocated_response.error:
+        return geolocated_response
+
+    if not geolocated_response.message:
+        return ResponseData(
+            error=CITY_NOT_FOUND_ERROR,
+            status=geolocated_response.status,
+            url=geolocated_response.url,
+            method=geolocated_response.method,
+        )
+
+    data_geolocated: Dict = geolocated_response.message[0]
+    return ResponseData(
+        message={
+            "lat": data_geolocated["lat"],
+            "lon": data_geolocated["lon"],
+        },
+        status=geolocated_response.status,
+        url=geolocated_response.url,
+        method=geolocated_response.method,
+    )
+
+
+async def get_weather_data_by_coordinates(
+    url_template: str,
+    lat: float,
+    lon: float,
+    api_openweathermap: str,
+    cache: CoalescingTTLCache,
+) -> ResponseData:
+    """Возвращает ответ сайта https://openweathermap.org для координат.
+
+    Успешные ответы сохраняются в cache по округленным координатам, а одновременные
+    запросы одних и тех же координат выполняются одним запросом к сайту.
+
+    Args:
+        url_template (str): URL сайта с местами для широты, долготы и API
+        lat (float): Широта
+        lon (float): Долгота
+        api_openweathermap (str): API для сайта openweathermap
+        cache (CoalescingTTLCache): Кэш ответов для этого URL
+
+    Returns:
+        ResponseData: Объект с результатом запроса из error_handler_for_the_website.
+    """
+    precision: int = settings.weather_cache.COORDINATES_PRECISION
+    lat: float = round(lat, precision)
+    lon: float = round(lon, precision)
+
+    return await cache.get_or_fetch(
+        key=(lat, lon),
+        fetch=lambda: error_handler_for_the_website(
+            url=url_template.format(lat, lon, api_openweathermap),
+        ),
+        should_cache=lambda response: not response.error,
+    )
 
 
 async def get_data_weather_forecast_with_openweathermap(
@@ -46,70 +237,50 @@ async def get_data_weather_forecast_with_openweathermap(
             - method (str): HTTP-метод, использованный при запросе.
     """
     try:
-        # Формируем url для запроса
-        url: str = url_geolocated_openweathermap.format(
-            city,
-            api_openweathermap,
+        # Получаем данные геолокации для города
+        geolocated_response: ResponseData = await get_geolocation_city(
+            city=city,
+            url_geolocated_openweathermap=url_geolocated_openweathermap,
+            api_openweathermap=api_openweathermap,
         )
-
-        async with aiohttp.ClientSession() as session:
-
-            # Получаем данные геолокации для города
-            geolocated_response: ResponseData = await error_handler_for_the_website(
-                session=session,
-                url=url,
+        if geolocated_response.error:
+            return geolocated_response
+
+        lat: float = geolocated_response.message["lat"]
+        lon: float = geolocated_response.message["lon"]
+
+        # Опредеям прогноз погоды на 5 дней или на текущий день
+        list_weather: List = []
+        if five_days:
+            future_response: ResponseData = await get_weather_data_by_coordinates(
+                url_template=url_future_openweathermap,
+                lat=lat,
+                lon=lon,
+                api_openweathermap=api_openweathermap,
+                cache=forecast_cache,
             )
-
-            if geolocated_response.error:
-                return geolocated_response
-
-            if not geolocated_response.message:
-                return ResponseData(
-                    error="Такого города не существует",
-                    status=geolocated_response.status,
-                    method=geolocated_response.method,
-                    url=geolocated_response.url,
-                )
-            data_geolocated: Dict = geolocated_response.message[0]
-
-            lat: float = data_geolocated["lat"]
-            lon: float = data_geolocated["lon"]
-
-            # Опредеям прогноз погоды на 5 дней или на текущий день
-            list_weather: List = []
-            if five_days:
-                future_urls: str = url_future_openweathermap.format(
-                    lat,
-                    lon,
-                    api_openweathermap,
-                )
-
-                future_response: ResponseData = await error_handler_for_the_website(
-                    session=session,
-                    url=future_urls,
-                )
-                if future_response.error:
-                    return future_response
-
-                for weather in future_response.message["list"]:
-                    if weather["dt_txt"].find("12:00:00") != -1:
-                        list_weather.append(weather)
-            else:
-                current_url: str = url_current_openweathermap.format(
-                    lat, lon, api_openweathermap
-                )
-                current_response: ResponseData = await error_handler_for_the_website(
-                    url=current_url,
-                    session=session,
-                )
-                if current_response.error:
-                    return current_response
-                list_weather.append(current_response.message)
+            if future_response.error:
+                return future_response
+
+            for weather in future_response.message["list"]:
+                if weather["dt_txt"].find("12:00:00") != -1:
+                    list_weather.append(weather)
+        else:
+            current_response: ResponseData = await get_weather_data_by_coordinates(
+                url_template=url_current_openweathermap,
+                lat=lat,
+                lon=lon,
+                api_openweathermap=api_openweathermap,
+                cache=current_weather_cache,
+            )
+            if current_response.error:
+                return current_response
+            list_weather.append(current_response.message)
 
         # Достаем словарь перевода описаний погоды
-
-        with open(path_to_weather_translation, "r", encoding="utf-8") as file:
-            translate_weather = json.load(file)
+        translate_weather: WeatherTranslations = get_weather_translations(
+            path=path_to_weather_translation,
+        )
 
         # if five_days:
         array_weather_forecast: List = []
@@ -119,7 +290,7 @@ async def get_data_weather_forecast_with_openweathermap(
             try:
                 weather_main: str = weather["weather"][0]["main"]
                 weather_desc: str = weather["weather"][0]["description"]
-                weather_description = translate_weather[weather_main][weather_desc]
+                weather_description = translate_weather.get(weather_main, weather_desc)
             except (KeyError, IndexError, TypeError):
                 weather_description = None
             # температура по цельсию
@@ -220,44 +391,28 @@ async def get_air_pollution_city(
             - method (str): HTTP-метод, использованный при запросе.
     """
     try:
-        # Получаем данные геолокации для города
-        # API = settings.API_OPENWEATHERMAP
-        url_geolocated: str = url_geolocated_openweathermap.format(
-            city, api_openweathermap
+        # Получаем геолокацию города
+        geolocated_response: ResponseData = await get_geolocation_city(
+            city=city,
+            url_geolocated_openweathermap=url_geolocated_openweathermap,
+            api_openweathermap=api_openweathermap,
         )
-        async with aiohttp.ClientSession() as session:
-
-            # Получаем геолокацию города
-            geolocated_response: ResponseData = await error_handler_for_the_website(
-                session=session,
-                url=url_geolocated,
-            )
-            if geolocated_response.error:
-                return geolocated_response
-
-            if not geolocated_response.message:
-                return ResponseData(
-                    error="Такого города не существует",
-                    status=geolocated_response.status,
-                    url=geolocated_response.url,
-                    method=geolocated_response.method,
-                )
-
-            data_geolocated: Dict = geolocated_response.message[0]
-            lat: float = data_geolocated["lat"]
-            lon: float = data_geolocated["lon"]
-
-            url_air_pollution: str = url_air_pollution.format(
-                lat, lon, api_openweathermap
-            )
-
-            # Делаем запрос на получения данных уровня загрязнения воздуха
-            aqi_response: ResponseData = await error_handler_for_the_website(
-                session=session,
-                url=url_air_pollution,
-            )
-            if aqi_response.error:
-                return aqi_response
+        if geolocated_response.error:
+            return geolocated_response
+
+        lat: float = geolocated_response.message["lat"]
+        lon: float = geolocated_response.message["lon"]
+
+        # Делаем запрос на получения данных уровня загрязнения воздуха
+        aqi_response: ResponseData = await get_weather_data_by_coordinates(
+            url_template=url_air_pollution,
+            lat=lat,
+            lon=lon,
+            api_openweathermap=api_openweathermap,
+            cache=air_pollution_cache,
+        )
+        if aqi_response.error:
+            return aqi_response
 
         # Получаем словарь с данными по уровню загрязнению воздуха для города
         data_aqii_city = aqi_response.message
@@ -370,15 +525,15 @@ async def get_weather_map(
 
     try:
         # Проверяем доступен ли сайт для получения погоды
-        async with aiohttp.ClientSession() as session:
-            weather_map: ResponseData = await error_handler_for_the_website(
-                session=session,
-                url=url_weather_map.format(api_openweathermap),
-                data_type="BYTES",
-            )
+        session: aiohttp.ClientSession = http_client.session
+        weather_map: ResponseData = await error_handler_for_the_website(
+            session=session,
+            url=url_weather_map.format(api_openweathermap),
+            data_type="BYTES",
+        )
 
-            if weather_map.error:
-                return weather_map
+        if weather_map.error:
+            return weather_map
 
         # Если нет стартовой локации добавляем ее
         if not location_weather:
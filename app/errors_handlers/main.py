@@ -1,9 +1,31 @@
 import aiohttp
 import asyncio
+import time
 import traceback
-from typing import Dict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+import aiofiles
+import aiofiles.os
 
 from logging_handler.main import error_logging
+from http_client.main import http_client
+from http_client.quota import quota_manager, QuotaExceededError
+from http_client.singleflight import get_request_key, upstream_single_flight
+from http_client.tracing import (
+    upstream_circuit_rejections_total,
+    upstream_coalesced_total,
+    upstream_request_duration_seconds,
+    upstream_retries_total,
+    upstream_timeouts_total,
+)
+from metrics.tracing import log_span
+from http_client.resilience import (
+    circuit_breakers,
+    CircuitBreaker,
+    get_retry_delay,
+    parse_retry_after,
+)
 from settings.response import ResponseData
 from settings.config import settings
 
@@ -27,48 +49,39 @@ async def safe_read_response(resp):
         return "<no body>"
 
 
-async def error_handler_for_the_website(
-    session,
+async def request_website_once(
+    session: aiohttp.ClientSession,
     url: str,
-    data_type="JSON",
-    timeout=20,
-    method="GET",
+    data_type: str,
+    timeout: aiohttp.ClientTimeout,
+    method: str,
     data=None,
     headers=None,
-) -> ResponseData:
-    """
-
-    Асинхронный запрос с обработками ошибок для сайтов
+    trace_request_ctx: Optional[Dict] = None,
+    read_body: Optional[
+        Callable[[aiohttp.ClientResponse], Awaitable[ResponseData]]
+    ] = None,
+) -> Tuple[ResponseData, bool, Optional[float]]:
+    """Выполняет одну попытку запроса для error_handler_for_the_website.
 
     Args:
-        session (_type_): асинхронная сессия запроса
-        url (_type_): URL сайта
-        data_type (str, optional): Тип возвращаемых данных.По умолчанию JSON('JSON', 'TEXT', 'BYTES')
-        timeout (int, optional): таймаут запроса в секундах
-        method (str, optional): Метод запроса. 'POST' или "GET"
-        data (_type_, optional): Данные для POST запроса
-        headers (dict): Заголовки запроса
+        trace_request_ctx (Dict, optional): Словарь, в который метрики сессии
+            записывают время соединения и время до заголовков ответа
+        read_body (Callable, optional): Читает тело успешного ответа вместо
+            data_type, например потоково записывает его в файл
 
     Returns:
-        ResponseData: Объект с результатом запроса.
-
-        Атрибуты ResponseData:
-            - message (Any | None): Данные успешного ответа (если запрос прошёл успешно).
-            - error (str | None): Описание ошибки, если запрос завершился неудачей.
-            - status (int): HTTP-код ответа. 0 — если ошибка возникла на клиентской стороне.
-            - url (str): URL, по которому выполнялся запрос.
-            - method (str): HTTP-метод, использованный при запросе.
+        Tuple[ResponseData, bool, float | None]: Результат запроса, можно ли
+        повторить запрос и задержка из заголовка Retry-After
     """
-    # Чтобы не ждать бесконечно при connect/read
-    timeout_cfg: aiohttp.ClientTimeout = aiohttp.ClientTimeout(total=timeout)
-
     try:
         async with session.request(
             method,
             url,
-            timeout=timeout_cfg,
+            timeout=timeout,
             data=data,
             headers=headers,
+            trace_request_ctx=trace_request_ctx,
         ) as resp:
             if resp.status in [403, 404]:
 
@@ -101,11 +114,15 @@ async def error_handler_for_the_website(
                     )
                 )
 
-                return ResponseData(
-                    status=resp.status,
-                    error=error_message_str,
-                    url=url,
-                    method=method,
+                return (
+                    ResponseData(
+                        status=resp.status,
+                        error=error_message_str,
+                        url=url,
+                        method=method,
+                    ),
+                    False,
+                    None,
                 )
 
             elif resp.status != 200:
@@ -122,37 +139,57 @@ async def error_handler_for_the_website(
                         error_message=logg_error_str,
                     )
                 )
-                return ResponseData(
-                    status=resp.status,
-                    error=f"Сайт вернул ошибку {resp.status}",
-                    url=url,
-                    method=method,
+                return (
+                    ResponseData(
+                        status=resp.status,
+                        error=f"Сайт вернул ошибку {resp.status}",
+                        url=url,
+                        method=method,
+                    ),
+                    resp.status in settings.http_client.RETRY_STATUSES,
+                    parse_retry_after(resp.headers.get("Retry-After")),
                 )
+            if read_body is not None:
+                return await read_body(resp), False, None
             if data_type.upper() == "JSON":
                 message_body = await resp.json()
-                return ResponseData(
-                    message=message_body,
-                    status=resp.status,
-                    url=url,
-                    method=method,
+                return (
+                    ResponseData(
+                        message=message_body,
+                        status=resp.status,
+                        url=url,
+                        method=method,
+                    ),
+                    False,
+                    None,
                 )
             elif data_type.upper() == "TEXT":
                 message_body = await resp.text()
-                return ResponseData(
-                    message=message_body,
-                    status=resp.status,
-                    url=url,
-                    method=method,
+                return (
+                    ResponseData(
+                        message=message_body,
+                        status=resp.status,
+                        url=url,
+                        method=method,
+                    ),
+                    False,
+                    None,
                 )
             else:
                 message_body = await resp.read()
-                return ResponseData(
-                    message=message_body,
-                    status=resp.status,
-                    url=url,
-                    method=method,
+                return (
+                    ResponseData(
+                        message=message_body,
+                        status=resp.status,
+                        url=url,
+                        method=method,
+                    ),
+                    False,
+                    None,
                 )
-    except aiohttp.ClientError:
+    except asyncio.TimeoutError:
+        # Таймауты соединения и чтения aiohttp тоже ClientError - ловим их раньше
+        upstream_timeouts_total.inc(host=settings.get_upstream_host(url))
         error_logging.error(
             settings.logging.ERROR_WEB_RESPONSE_MESSAGE.format(
                 method=method,
@@ -161,13 +198,17 @@ async def error_handler_for_the_website(
                 error_message=traceback.format_exc(),
             )
         )
-        return ResponseData(
-            error="Не удалось подлкючиться к сайту",
-            status=0,
-            url=url,
-            method=method,
+        return (
+            ResponseData(
+                error="Время ожидания истекло",
+                status=0,
+                url=url,
+                method=method,
+            ),
+            True,
+            None,
         )
-    except asyncio.TimeoutError:
+    except aiohttp.ClientError as error:
         error_logging.error(
             settings.logging.ERROR_WEB_RESPONSE_MESSAGE.format(
                 method=method,
@@ -176,11 +217,18 @@ async def error_handler_for_the_website(
                 error_message=traceback.format_exc(),
             )
         )
-        return ResponseData(
-            error="Время ожидания истекло",
-            status=0,
-            url=url,
-            method=method,
+        # Повторяем только сетевые ошибки, а не ошибки разбора ответа
+        return (
+            ResponseData(
+                error="Не удалось подлкючиться к сайту",
+                status=0,
+                url=url,
+                method=method,
+            ),
+            isinstance(
+                error, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError)
+            ),
+            None,
         )
     except Exception:
         error_logging.error(
@@ -191,12 +239,314 @@ async def error_handler_for_the_website(
                 error_message=traceback.format_exc(),
             )
         )
-        return ResponseData(
-            error="Ошибка на стороне сервера.Идет работа по исправлению...",
-            status=0,
+        return (
+            ResponseData(
+                error="Ошибка на стороне сервера.Идет работа по исправлению...",
+                status=0,
+                url=url,
+                method=method,
+            ),
+            False,
+            None,
+        )
+
+
+async def request_website_with_retries(
+    session: aiohttp.ClientSession,
+    url: str,
+    data_type: str,
+    timeout: Optional[float],
+    method: str,
+    data=None,
+    headers=None,
+    read_body: Optional[
+        Callable[[aiohttp.ClientResponse], Awaitable[ResponseData]]
+    ] = None,
+) -> ResponseData:
+    """Запрос к сайту с повторами, квотой и предохранителем.
+
+    Аргументы как у error_handler_for_the_website, session обязательна.
+    read_body как у request_website_once.
+
+    Returns:
+        ResponseData: Объект с результатом последней попытки
+    """
+    host: str = settings.get_upstream_host(url)
+    breaker: CircuitBreaker = circuit_breakers.get(host)
+    attempts: int = 1
+    if method.upper() == "GET":
+        attempts += settings.http_client.RETRIES
+    # Общий срок для всех попыток, отсчитывается после ожидания квоты
+    deadline: Optional[float] = None
+
+    for attempt in range(attempts):
+        # Сайт недавно не отвечал - не ждем таймаут, а сразу возвращаем ошибку
+        if not breaker.allow_request():
+            upstream_circuit_rejections_total.inc(host=host)
+            error_logging.error(
+                settings.logging.ERROR_WEB_RESPONSE_MESSAGE.format(
+                    method=method,
+                    status=503,
+                    url=url,
+                    error_message="Circuit breaker is open",
+                )
+            )
+            return ResponseData(
+                error="Сайт временно недоступен. Попробуйте позже",
+                status=503,
+                url=url,
+                method=method,
+            )
+
+        if deadline is None:
+            # Ждем своей очереди, если сервис ограничен по количеству запросов.
+            # Квота списывается один раз на запрос, повторы ее не расходуют
+            try:
+                await quota_manager.acquire(url=url)
+            except QuotaExceededError as error:
+                error_logging.error(
+                    settings.logging.ERROR_WEB_RESPONSE_MESSAGE.format(
+                        method=method,
+                        status=429,
+                        url=url,
+                        error_message=str(error),
+                    )
+                )
+                return ResponseData(
+                    error=str(error),
+                    status=429,
+                    url=url,
+                    method=method,
+                )
+            deadline = time.monotonic() + (timeout or settings.http_client.TIMEOUT)
+
+        # Чтобы не ждать бесконечно при connect/read. Повторы получают только
+        # оставшееся до общего срока время
+        remaining: float = deadline - time.monotonic()
+        timeout_cfg: aiohttp.ClientTimeout = aiohttp.ClientTimeout(
+            total=remaining,
+            connect=min(settings.http_client.CONNECT_TIMEOUT, remaining),
+        )
+
+        timings: Dict = {}
+        started: float = time.perf_counter()
+        response, retryable, retry_after = await request_website_once(
+            session=session,
+            url=url,
+            data_type=data_type,
+            timeout=timeout_cfg,
+            method=method,
+            data=data,
+            headers=headers,
+            trace_request_ctx=timings,
+            read_body=read_body,
+        )
+        duration: float = time.perf_counter() - started
+        upstream_request_duration_seconds.observe(duration, host=host)
+        log_span(
+            "upstream",
+            duration,
+            method=method,
+            host=host,
+            status=response.status,
+            attempt=attempt + 1,
+            connect_ms=f"{timings.get('connect', 0) * 1000:.1f}",
+            ttfb_ms=f"{timings.get('ttfb', 0) * 1000:.1f}",
+        )
+
+        # 429 значит, что сайт работает, но просит подождать
+        if retryable and response.status != 429:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+        if not retryable or attempt == attempts - 1:
+            return response
+
+        delay: float = get_retry_delay(attempt=attempt, retry_after=retry_after)
+        # Повтор не успеет завершиться до общего срока запроса
+        if time.monotonic() + delay >= deadline:
+            return response
+
+        upstream_retries_total.inc(host=host)
+        await asyncio.sleep(delay)
+
+
+async def error_handler_for_the_website(
+    session: Optional[aiohttp.ClientSession] = None,
+    url: str = "",
+    data_type="JSON",
+    timeout: Optional[float] = None,
+    method="GET",
+    data=None,
+    headers=None,
+) -> ResponseData:
+    """
+
+    Асинхронный запрос с обработками ошибок для сайтов
+
+    Args:
+        session (aiohttp.ClientSession, optional): асинхронная сессия запроса.
+            По умолчанию общая сессия приложения с пулом соединений
+        url (_type_): URL сайта
+        data_type (str, optional): Тип возвращаемых данных.По умолчанию JSON('JSON', 'TEXT', 'BYTES')
+        timeout (float, optional): таймаут запроса в секундах.
+            По умолчанию settings.http_client.TIMEOUT
+        method (str, optional): Метод запроса. 'POST' или "GET"
+        data (_type_, optional): Данные для POST запроса
+        headers (dict): Заголовки запроса
+
+    GET запросы при сетевой ошибке, таймауте или ответе из
+    settings.http_client.RETRY_STATUSES повторяются с задержкой, пока не истек
+    общий для всех попыток timeout. Если сайт
+    несколько раз подряд не отвечает, запросы к нему сразу завершаются ошибкой,
+    пока он не ответит на пробный запрос.
+
+    Одинаковые одновременные GET запросы через общую сессию (тот же URL и те же
+    заголовки) выполняются один раз, каждый вызов получает свою копию ответа.
+
+    Returns:
+        ResponseData: Объект с результатом запроса.
+
+        Атрибуты ResponseData:
+            - message (Any | None): Данные успешного ответа (если запрос прошёл успешно).
+            - error (str | None): Описание ошибки, если запрос завершился неудачей.
+            - status (int): HTTP-код ответа. 0 — если ошибка возникла на клиентской стороне.
+            - url (str): URL, по которому выполнялся запрос.
+            - method (str): HTTP-метод, использованный при запросе.
+    """
+    # У своей сессии могут быть свои cookies и прокси - ее ответ не общий
+    coalesce: bool = (
+        settings.http_client.COALESCE_REQUESTS
+        and (session is None or session is http_client.session)
+        and method.upper() == "GET"
+        and data is None
+    )
+    if session is None:
+        session = http_client.session
+
+    async def fetch() -> ResponseData:
+        return await request_website_with_retries(
+            session=session,
             url=url,
+            data_type=data_type,
+            timeout=timeout,
             method=method,
+            data=data,
+            headers=headers,
+        )
+
+    if not coalesce:
+        return await fetch()
+
+    # Одинаковые одновременные GET запросы выполняются один раз
+    key: Tuple = get_request_key(
+        method=method,
+        url=url,
+        data_type=data_type,
+        timeout=timeout,
+        headers=headers,
+    )
+    if upstream_single_flight.is_in_flight(key):
+        upstream_coalesced_total.inc(host=settings.get_upstream_host(url))
+    response: ResponseData = await upstream_single_flight.do(key=key, fetch=fetch)
+    # Своя копия для каждого - обработчики меняют message ответа
+    return response.model_copy(deep=True)
+
+
+async def remove_partial_file(path: Path) -> None:
+    """Удаляет недокачанный файл, если он существует."""
+
+    try:
+        await aiofiles.os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+async def download_file_for_the_website(
+    url: str,
+    path: Path,
+    session: Optional[aiohttp.ClientSession] = None,
+    max_size: Optional[int] = None,
+    chunk_size: int = 64 * 1024,
+    timeout: Optional[float] = None,
+    headers=None,
+) -> ResponseData:
+    """
+
+    Асинхронно скачивает файл по частям прямо на диск с обработками ошибок.
+    В памяти одновременно находится не больше одного блока файла.
+    Квота, предохранитель и повторы такие же, как у error_handler_for_the_website,
+    при повторе файл скачивается заново
+
+    Args:
+        url (str): URL файла
+        path (Path): Путь куда сохранить файл
+        session (aiohttp.ClientSession, optional): асинхронная сессия запроса.
+            По умолчанию общая сессия приложения с пулом соединений
+        max_size (int, optional): Максимальный размер файла в байтах.
+            Файл большего размера не сохраняется
+        chunk_size (int, optional): Размер блока при записи на диск в байтах
+        timeout (float, optional): таймаут запроса в секундах.
+            По умолчанию settings.http_client.TIMEOUT
+        headers (dict): Заголовки запроса
+
+    Returns:
+        ResponseData: Объект с результатом запроса.
+
+        Атрибуты ResponseData:
+            - message (Path | None): Путь до сохраненного файла.
+            - error (str | None): Описание ошибки, если запрос завершился неудачей.
+            - status (int): HTTP-код ответа. 0 — если ошибка возникла на клиентской стороне.
+            - url (str): URL, по которому выполнялся запрос.
+            - method (str): HTTP-метод, использованный при запросе.
+    """
+    if session is None:
+        session = http_client.session
+
+    async def write_file(resp: aiohttp.ClientResponse) -> ResponseData:
+        error_too_large: ResponseData = ResponseData(
+            status=413,
+            error="Файл превышает допустимый размер",
+            url=str(resp.url),
+            method="GET",
         )
+        # Сервер сам сообщил размер - не начинаем скачивание
+        if max_size and resp.content_length and resp.content_length > max_size:
+            return error_too_large
+
+        size: int = 0
+        async with aiofiles.open(path, "wb") as file:
+            async for chunk in resp.content.iter_chunked(chunk_size):
+                size += len(chunk)
+                if max_size and size > max_size:
+                    break
+                await file.write(chunk)
+
+        if max_size and size > max_size:
+            await remove_partial_file(path=path)
+            return error_too_large
+
+        return ResponseData(
+            message=path,
+            status=resp.status,
+            url=url,
+            method="GET",
+        )
+
+    # Квота, предохранитель и повторы как у остальных запросов к сайтам
+    response: ResponseData = await request_website_with_retries(
+        session=session,
+        url=url,
+        data_type="BYTES",
+        timeout=timeout,
+        method="GET",
+        headers=headers,
+        read_body=write_file,
+    )
+    if response.error:
+        await remove_partial_file(path=path)
+    return response
 
 
 def chek_number_is_positivity(number: str):
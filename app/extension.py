@@ -1,8 +1,20 @@
+from typing import Optional
+
 from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 
 from settings.config import settings
+from fsm_storage.main import get_fsm_storage
+
 
+session: Optional[AiohttpSession] = None
+if settings.TELEGRAM_API_SERVER:
+    # Например локальный сервер для нагрузочного тестирования
+    session = AiohttpSession(
+        api=TelegramAPIServer.from_base(settings.TELEGRAM_API_SERVER)
+    )
 
-bot = Bot(token=settings.TOKEN)
+bot = Bot(token=settings.TOKEN, session=session)
 
-dp = Dispatcher()
+dp = Dispatcher(storage=get_fsm_storage(config=settings.fsm_storage))
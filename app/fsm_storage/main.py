@@ -0,0 +1,277 @@
+from typing import Any, Dict, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+import asyncio
+import json
+import sqlite3
+import time
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import (
+    BaseStorage,
+    DefaultKeyBuilder,
+    KeyBuilder,
+    StateType,
+    StorageKey,
+)
+
+from settings.config import FSMStorageSettings
+
+
+@dataclass
+class BoundedMemoryStorageRecord:
+    """Запись состояния пользователя в BoundedMemoryStorage."""
+
+    data: Dict[str, Any] = field(default_factory=dict)
+    state: Optional[str] = None
+    expires_at: Optional[float] = None
+
+
+class BoundedMemoryStorage(BaseStorage):
+    """Хранилище FSM в памяти процесса с временем жизни брошенных диалогов и
+    ограничением количества диалогов.
+
+    При превышении max_keys вытесняются диалоги, к которым дольше всего не было
+    обращений.
+    """
+
+    def __init__(self, ttl: Optional[int] = None, max_keys: int = 100000):
+        """
+        Args:
+            ttl (int, optional): Время жизни диалога с последнего изменения в секундах
+            max_keys (int, optional): Максимальное количество хранимых диалогов
+        """
+        self.ttl: Optional[int] = ttl
+        self.max_keys: int = max_keys
+        self.storage: "OrderedDict[StorageKey, BoundedMemoryStorageRecord]" = (
+            OrderedDict()
+        )
+
+    def _get_record(self, key: StorageKey) -> BoundedMemoryStorageRecord:
+        """Возвращает запись диалога, удаляя ее если время жизни истекло."""
+
+        record: Optional[BoundedMemoryStorageRecord] = self.storage.get(key)
+        if record is not None and record.expires_at is not None:
+            if record.expires_at <= time.monotonic():
+                del self.storage[key]
+                record = None
+
+        if record is None:
+            return BoundedMemoryStorageRecord()
+        self.storage.move_to_end(key)
+        return record
+
+    def _save_record(self, key: StorageKey, record: BoundedMemoryStorageRecord) -> None:
+        """Сохраняет запись диалога и вытесняет старые записи."""
+
+        if record.state is None and not record.data:
+            self.storage.pop(key, None)
+            return
+
+        record.expires_at = time.monotonic() + self.ttl if self.ttl else None
+        self.storage[key] = record
+        self.storage.move_to_end(key)
+        while len(self.storage) > self.max_keys:
+            self.storage.popitem(last=False)
+
+    async def close(self) -> None:
+        pass
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record: BoundedMemoryStorageRecord = self._get_record(key)
+        record.state = state.state if isinstance(state, State) else state
+        self._save_record(key, record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return self._get_record(key).state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        record: BoundedMemoryStorageRecord = self._get_record(key)
+        record.data = data.copy()
+        self._save_record(key, record)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return self._get_record(key).data.copy()
+
+
+class SQLiteStorage(BaseStorage):
+    """Хранилище FSM в локальном файле SQLite.
+
+    Используется как локальная замена Redis: состояния переживают перезапуск
+    бота и доступны нескольким процессам на одной машине. Состояние и данные
+    диалога хранятся в одной строке. Все запросы к базе выполняются в
+    отдельном потоке, чтобы не блокировать цикл событий.
+    """
+
+    CLEANUP_EVERY: int = 100  # Через сколько записей удалять устаревшие диалоги
+
+    def __init__(
+        self,
+        path: Path,
+        ttl: Optional[int] = None,
+        max_keys: int = 100000,
+        key_builder: Optional[KeyBuilder] = None,
+    ):
+        """
+        Args:
+            path (Path): Путь до файла базы данных
+            ttl (int, optional): Время жизни диалога с последнего изменения в секундах
+            max_keys (int, optional): Максимальное количество хранимых диалогов
+            key_builder (KeyBuilder, optional): Построитель ключей как у RedisStorage
+        """
+        self.path: Path = Path(path)
+        self.ttl: Optional[int] = ttl
+        self.max_keys: int = max_keys
+        self.key_builder: KeyBuilder = key_builder or DefaultKeyBuilder(
+            with_destiny=True
+        )
+        # Один поток - последовательный доступ к одному соединению
+        self._executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="fsm_sqlite",
+        )
+        self._connection: Optional[sqlite3.Connection] = None
+        self._writes: int = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        """Открывает соединение с базой и создает таблицу при первом обращении."""
+
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            # Состояние и данные диалога в одной строке, поэтому лимит и
+            # вытеснение считают диалоги, а не отдельные значения
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS fsm_dialogs ("
+                "key TEXT PRIMARY KEY, "
+                "state TEXT, "
+                "data TEXT, "
+                "updated_at REAL NOT NULL, "
+                "expires_at REAL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS fsm_dialogs_updated_at "
+                "ON fsm_dialogs (updated_at)"
+            )
+            self._connection.commit()
+        return self._connection
+
+    async def _run(self, func, *args) -> Any:
+        """Выполняет функцию работы с базой в потоке хранилища."""
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _get(self, key: str, column: str) -> Optional[str]:
+        """Возвращает состояние ('state') или данные ('data') диалога."""
+
+        connection: sqlite3.Connection = self._connect()
+        row = connection.execute(
+            f"SELECT {column}, expires_at FROM fsm_dialogs WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            connection.execute("DELETE FROM fsm_dialogs WHERE key = ?", (key,))
+            connection.commit()
+            return None
+        return value
+
+    def _set(self, key: str, column: str, value: Optional[str]) -> None:
+        """Сохраняет состояние ('state') или данные ('data') диалога."""
+
+        connection: sqlite3.Connection = self._connect()
+        now: float = time.time()
+        # Истекший диалог начинается заново, без второй половины старой записи
+        connection.execute(
+            "DELETE FROM fsm_dialogs WHERE key = ? AND expires_at <= ?", (key, now)
+        )
+        connection.execute(
+            f"INSERT INTO fsm_dialogs (key, {column}, updated_at, expires_at) "
+            "VALUES (?, ?, ?, ?) "
+            f"ON CONFLICT(key) DO UPDATE SET {column} = excluded.{column}, "
+            "updated_at = excluded.updated_at, expires_at = excluded.expires_at",
+            (key, value, now, now + self.ttl if self.ttl else None),
+        )
+        # Диалог без состояния и данных не хранится
+        connection.execute(
+            "DELETE FROM fsm_dialogs WHERE key = ? "
+            "AND state IS NULL AND data IS NULL",
+            (key,),
+        )
+
+        # Периодически удаляем брошенные диалоги и вытесняем самые старые при
+        # превышении лимита
+        self._writes += 1
+        if self._writes % self.CLEANUP_EVERY == 0:
+            connection.execute(
+                "DELETE FROM fsm_dialogs WHERE expires_at <= ?", (now,)
+            )
+            connection.execute(
+                "DELETE FROM fsm_dialogs WHERE key IN (SELECT key FROM fsm_dialogs "
+                "ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_keys,),
+            )
+        connection.commit()
+
+    def _close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    async def close(self) -> None:
+        await self._run(self._close)
+        self._executor.shutdown(wait=True)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state = state.state if isinstance(state, State) else state
+        await self._run(self._set, self.key_builder.build(key), "state", state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return await self._run(self._get, self.key_builder.build(key), "state")
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        value: Optional[str] = json.dumps(data, ensure_ascii=False) if data else None
+        await self._run(self._set, self.key_builder.build(key), "data", value)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        value: Optional[str] = await self._run(
+            self._get, self.key_builder.build(key), "data"
+        )
+        return json.loads(value) if value else {}
+
+
+def get_fsm_storage(config: FSMStorageSettings) -> BaseStorage:
+    """Возвращает хранилище FSM по настройкам.
+
+    Args:
+        config (FSMStorageSettings): Настройки хранилища
+
+    Returns:
+        BaseStorage: Хранилище 'memory', 'redis' или 'sqlite'
+    """
+    backend: str = config.BACKEND.lower()
+
+    if backend == "redis":
+        # redis - необязательная зависимость, нужна только для этого варианта
+        from aiogram.fsm.storage.redis import RedisStorage
+
+        return RedisStorage.from_url(
+            url=config.REDIS_URL,
+            state_ttl=config.TTL,
+            data_ttl=config.TTL,
+        )
+    if backend == "sqlite":
+        return SQLiteStorage(
+            path=config.SQLITE_PATH,
+            ttl=config.TTL,
+            max_keys=config.MAX_KEYS,
+        )
+    if backend == "memory":
+        return BoundedMemoryStorage(ttl=config.TTL, max_keys=config.MAX_KEYS)
+    raise ValueError(f"Неизвестное хранилище FSM: {config.BACKEND}")
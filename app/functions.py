@@ -1,17 +1,62 @@
-from typing import List
+from typing import Dict, List, Tuple
+from urllib.parse import quote
 import random
 
-import requests
-
+from errors_handlers.main import error_handler_for_the_website
 from settings.config import settings
+from settings.response import ResponseData
+from utils.cache import CoalescingTTLCache
+
+
+# Кэш фильмов-кандидатов для рекомендаций. Ключ - (жанры, тип, рейтинг)
+recommender_candidates_cache: CoalescingTTLCache = CoalescingTTLCache(
+    maxsize=settings.recommender_system.kinopoisk.CANDIDATES_MAXSIZE,
+    ttl=settings.recommender_system.kinopoisk.CANDIDATES_TTL,
+)
+
+
+async def get_recommender_candidates(
+    genres: Tuple[str, ...],
+    type_video: str,
+    rating: str,
+) -> ResponseData:
+    """Возвращает фильмы-кандидаты для рекомендаций с сайта кинопоиск.
+
+    Фильмы загружаются один раз на набор (жанры, тип, рейтинг) и хранятся в
+    recommender_candidates_cache, повторные рекомендации выбираются из них.
 
+    Args:
+        genres (Tuple[str, ...]): Названия жанров
+        type_video (str): Тип видео
+        rating: (str): Рейтинг видео
 
-def get_recommender_video_for_kinopoisk(
+    Returns:
+        ResponseData: Объект с результатом запроса, message - ответ сайта
+    """
+    url: str = settings.recommender_system.kinopoisk.URL_SEARCH_UNIVERSAL_VIDEO.format(
+        settings.recommender_system.kinopoisk.CANDIDATES_LIMIT
+    )
+    for genre in genres:
+        url += f"&genres.name={quote(genre)}"
+    url += f"&type={type_video}"
+    url += f"&rating.kp={rating}"
+
+    headers: Dict = settings.recommender_system.kinopoisk.HEADERS.copy()
+    headers["X-API-KEY"] = settings.recommender_system.kinopoisk.ApiKey
+
+    return await recommender_candidates_cache.get_or_fetch(
+        key=(genres, type_video, rating),
+        fetch=lambda: error_handler_for_the_website(url=url, headers=headers),
+        should_cache=lambda response: not response.error,
+    )
+
+
+async def get_recommender_video_for_kinopoisk(
     list_genres: List,
     limit: int,
     type_video: str,
     rating: str,
-):
+) -> ResponseData:
     """Возвращает список из словарей рекомендованных фильмов для кинопоиска.
 
     Args:
@@ -21,39 +66,40 @@ def get_recommender_video_for_kinopoisk(
         rating: (str): Рейтинг видео
 
     Returns:
-        _type_: Возвращает список из словарей рекомендованных фильмов для кинопоиска
+        ResponseData: Объект с результатом запроса.
+
+        Атрибуты ResponseData:
+            - message (List[Dict] | None): Рекомендованные фильмы.
+            - error (str | None): Описание ошибки, если запрос завершился неудачей.
+            - status (int): HTTP-код ответа. 0 — если ошибка возникла на клиентской стороне.
+            - url (str): URL, по которому выполнялся запрос.
+            - method (str): HTTP-метод, использованный при запросе.
     """
     # Создает случайный список из двух жанров в которых снят фильм
-    array_genres = []
-    for genre in list_genres:
-        array_genres.append(genre.get("name"))
+    array_genres: List[str] = [genre.get("name") for genre in list_genres]
     if len(array_genres) > 1:
         array_genres = random.sample(array_genres, 2)
 
-    url: str = settings.recommender_system.kinopoisk.URL_SEARCH_UNIVERSAL_VIDEO.format(
-        250
+    response: ResponseData = await get_recommender_candidates(
+        genres=tuple(sorted(array_genres)),
+        type_video=type_video,
+        rating=rating,
     )
+    if response.error:
+        return response
 
-    for genre in array_genres:
-        url = url + f"&genres.name={genre}"
-
-    HEADERS = {
-        "accept": "application/json",
-        "X-API-KEY": settings.recommender_system.kinopoisk.ApiKey,
-    }
-
-    url += f"&type={type_video}"
-    url += f"&rating.kp={rating}"
-
-    array_recommender = (
-        requests.get(
-            url=url,
-            headers=HEADERS,
-            timeout=15,
+    candidates: List[Dict] = response.message.get("docs") or []
+    if not candidates:
+        return ResponseData(
+            error="Рекомендации не найдены",
+            status=404,
+            url=response.url,
+            method=response.method,
         )
-        .json()
-        .get("docs")
-    )
-    random.shuffle(array_recommender)
 
-    return array_recommender[:limit]
+    return ResponseData(
+        message=random.sample(candidates, min(limit, len(candidates))),
+        status=response.status,
+        url=response.url,
+        method=response.method,
+    )
@@ -0,0 +1,58 @@
+from typing import Optional
+
+import aiohttp
+
+from http_client.tracing import create_trace_config
+from settings.config import settings, HttpClientSettings
+
+
+class HttpClient:
+    """Общий HTTP клиент приложения.
+
+    Держит одну aiohttp.ClientSession с пулом соединений на все время работы бота,
+    чтобы запросы к сайтам не тратили время на DNS, TCP и TLS рукопожатия.
+    """
+
+    def __init__(self, config: HttpClientSettings):
+        self.config: HttpClientSettings = config
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Возвращает общую сессию. Создает ее при первом обращении или если она
+        была закрыта."""
+
+        if self._session is None or self._session.closed:
+            connector: aiohttp.TCPConnector = aiohttp.TCPConnector(
+                limit=self.config.LIMIT,
+                limit_per_host=self.config.LIMIT_PER_HOST,
+                keepalive_timeout=self.config.KEEPALIVE_TIMEOUT,
+                use_dns_cache=True,
+                ttl_dns_cache=self.config.TTL_DNS_CACHE,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(
+                    total=self.config.TIMEOUT,
+                    connect=self.config.CONNECT_TIMEOUT,
+                ),
+                # Метрики запросов по сайтам
+                trace_configs=(
+                    [create_trace_config()] if settings.metrics.ENABLED else None
+                ),
+            )
+        return self._session
+
+    async def start(self) -> None:
+        """Создает сессию при запуске бота."""
+        self.session
+
+    async def close(self) -> None:
+        """Закрывает сессию и все соединения при остановке бота."""
+
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+http_client: HttpClient = HttpClient(config=settings.http_client)
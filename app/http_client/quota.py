@@ -0,0 +1,167 @@
+from typing import Dict, Optional
+import asyncio
+import datetime
+import time
+
+from settings.config import settings, QuotaSettings
+
+
+class QuotaExceededError(Exception):
+    """Запрос к сервису не может быть выполнен из-за ограничения запросов."""
+
+
+class TokenBucket:
+    """Ограничитель запросов к одному сервису по алгоритму token bucket.
+
+    Запас из burst запросов пополняется со скоростью rate в секунду. Если запас
+    исчерпан, запрос ждет своей очереди, а не завершается ошибкой. Ошибка
+    возвращается, только если ждать пришлось бы дольше max_wait или исчерпана
+    суточная квота.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        daily_quota: Optional[int] = None,
+        max_wait: float = 30,
+    ):
+        """
+        Args:
+            rate (float): Сколько запросов в секунду разрешено в среднем
+            burst (int): Сколько запросов можно сделать подряд без ожидания
+            daily_quota (int, optional): Сколько запросов разрешено за сутки
+            max_wait (float, optional): Сколько секунд запрос может ждать очереди
+        """
+        self.rate: float = rate
+        self.burst: int = burst
+        self.daily_quota: Optional[int] = daily_quota
+        self.max_wait: float = max_wait
+        # Отрицательный запас - запросы, уже ожидающие своей очереди
+        self.tokens: float = burst
+        self.waiting: int = 0
+        self.used_today: int = 0
+        self.rejected: int = 0
+        self._updated_at: float = time.monotonic()
+        self._day: datetime.date = datetime.date.today()
+
+    def _refill(self) -> None:
+        now: float = time.monotonic()
+        self.tokens = min(
+            self.burst,
+            self.tokens + (now - self._updated_at) * self.rate,
+        )
+        self._updated_at = now
+
+        today: datetime.date = datetime.date.today()
+        if today != self._day:
+            self._day = today
+            self.used_today = 0
+
+    @property
+    def remaining_today(self) -> Optional[int]:
+        """Сколько запросов осталось на сегодня. None - без ограничения."""
+
+        if self.daily_quota is None:
+            return None
+        return max(0, self.daily_quota - self.used_today)
+
+    async def acquire(self) -> None:
+        """Ждет разрешения на запрос.
+
+        Raises:
+            QuotaExceededError: Если исчерпана суточная квота или ждать дольше max_wait
+        """
+        self._refill()
+        if self.remaining_today == 0:
+            self.rejected += 1
+            raise QuotaExceededError("Исчерпан суточный лимит запросов к сервису")
+
+        wait: float = (1 - self.tokens) / self.rate if self.tokens < 1 else 0
+        if wait > self.max_wait:
+            self.rejected += 1
+            raise QuotaExceededError("Сервис перегружен запросами. Попробуйте позже")
+
+        # Занимаем место в очереди сразу, поэтому запросы выполняются по порядку
+        self.tokens -= 1
+        self.used_today += 1
+        if not wait:
+            return
+
+        self.waiting += 1
+        try:
+            await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            # Запрос не выполнен - возвращаем его место
+            self.tokens += 1
+            self.used_today -= 1
+            raise
+        finally:
+            self.waiting -= 1
+
+    def stats(self) -> Dict:
+        """Возвращает счетчики ограничителя."""
+
+        self._refill()
+        return {
+            "tokens": max(0.0, self.tokens),
+            "waiting": self.waiting,
+            "used_today": self.used_today,
+            "remaining_today": self.remaining_today,
+            "rejected": self.rejected,
+        }
+
+
+class QuotaManager:
+    """Ограничители запросов ко всем внешним сервисам.
+
+    Сервис запроса определяется по адресу сайта из URL. Запросы к сайтам без
+    настроек не ограничиваются.
+    """
+
+    def __init__(self, config: QuotaSettings):
+        self.config: QuotaSettings = config
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.hosts: Dict[str, str] = {}
+
+        for name, service in config.SERVICES.items():
+            self.buckets[name] = TokenBucket(
+                rate=service.RATE,
+                burst=service.BURST,
+                daily_quota=service.DAILY_QUOTA,
+                max_wait=service.MAX_WAIT,
+            )
+            for host in service.HOSTS:
+                self.hosts[host.lower()] = name
+
+    def get_service(self, url: str) -> Optional[str]:
+        """Возвращает имя сервиса для URL или None."""
+
+        host: str = settings.get_upstream_host(url)
+        return self.hosts.get(host) if host else None
+
+    async def acquire(self, url: str = "", service: Optional[str] = None) -> None:
+        """Ждет разрешения на запрос к сервису.
+
+        Args:
+            url (str, optional): URL запроса, по нему определяется сервис
+            service (str, optional): Имя сервиса, если запрос идет не по URL
+
+        Raises:
+            QuotaExceededError: Если запрос к сервису сейчас выполнить нельзя
+        """
+        if not self.config.ENABLED:
+            return
+
+        service = service or self.get_service(url)
+        bucket: Optional[TokenBucket] = self.buckets.get(service) if service else None
+        if bucket is not None:
+            await bucket.acquire()
+
+    def stats(self) -> Dict[str, Dict]:
+        """Возвращает оставшиеся квоты и счетчики по сервисам."""
+
+        return {name: bucket.stats() for name, bucket in self.buckets.items()}
+
+
+quota_manager: QuotaManager = QuotaManager(config=settings.quota)
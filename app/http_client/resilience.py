@@ -0,0 +1,148 @@
+from typing import Dict, Optional
+from email.utils import parsedate_to_datetime
+import datetime
+import random
+import time
+
+from settings.config import settings, HttpClientSettings
+
+
+class CircuitBreaker:
+    """Предохранитель запросов к одному сайту.
+
+    После failure_threshold неудачных запросов подряд сайт считается
+    недоступным (open) и запросы к нему сразу завершаются ошибкой. Через
+    recovery_timeout секунд пропускается один пробный запрос (half_open): если
+    он успешен, запросы снова выполняются (closed), иначе ожидание повторяется.
+    """
+
+    CLOSED: str = "closed"
+    OPEN: str = "open"
+    HALF_OPEN: str = "half_open"
+
+    def __init__(self, failure_threshold: int, recovery_timeout: float):
+        """
+        Args:
+            failure_threshold (int): Сколько неудачных запросов подряд открывают предохранитель
+            recovery_timeout (float): Через сколько секунд пропустить пробный запрос
+        """
+        self.failure_threshold: int = failure_threshold
+        self.recovery_timeout: float = recovery_timeout
+        self.state: str = self.CLOSED
+        self.failures: int = 0
+        self.rejected: int = 0
+        self._opened_at: float = 0.0
+        self._probe_started_at: float = 0.0
+
+    def allow_request(self) -> bool:
+        """Возвращает True, если запрос к сайту можно выполнить."""
+
+        now: float = time.monotonic()
+        if self.state == self.CLOSED:
+            return True
+
+        if self.state == self.OPEN and now - self._opened_at >= self.recovery_timeout:
+            self.state = self.HALF_OPEN
+            self._probe_started_at = now
+            return True
+
+        # Пробный запрос пропал без результата (например, был отменен)
+        if (
+            self.state == self.HALF_OPEN
+            and now - self._probe_started_at >= self.recovery_timeout
+        ):
+            self._probe_started_at = now
+            return True
+
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "rejected": self.rejected,
+        }
+
+
+class CircuitBreakerRegistry:
+    """Предохранители по адресам сайтов."""
+
+    def __init__(self, config: HttpClientSettings):
+        self.config: HttpClientSettings = config
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, host: str) -> CircuitBreaker:
+        """Возвращает предохранитель сайта, создавая его при первом обращении."""
+
+        if host not in self.breakers:
+            self.breakers[host] = CircuitBreaker(
+                failure_threshold=self.config.CIRCUIT_FAILURE_THRESHOLD,
+                recovery_timeout=self.config.CIRCUIT_RECOVERY_TIMEOUT,
+            )
+        return self.breakers[host]
+
+    def stats(self) -> Dict[str, Dict]:
+        """Возвращает состояние предохранителей по сайтам."""
+
+        return {host: breaker.stats() for host, breaker in self.breakers.items()}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Возвращает задержку в секундах из заголовка Retry-After.
+
+    Args:
+        value (str, optional): Число секунд или HTTP дата
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at: datetime.datetime = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    now: datetime.datetime = datetime.datetime.now(tz=retry_at.tzinfo)
+    return max(0.0, (retry_at - now).total_seconds())
+
+
+def get_retry_delay(
+    attempt: int,
+    retry_after: Optional[float] = None,
+    config: HttpClientSettings = settings.http_client,
+) -> float:
+    """Возвращает задержку перед повтором запроса.
+
+    Если сайт прислал Retry-After, ждем столько, сколько он просит, но не больше
+    RETRY_AFTER_MAX. Иначе экспоненциальная задержка со случайным разбросом,
+    чтобы повторы разных пользователей не приходили на сайт одновременно.
+
+    Args:
+        attempt (int): Номер неудачной попытки начиная с 0
+        retry_after (float, optional): Задержка из заголовка Retry-After
+        config (HttpClientSettings, optional): Настройки повторов
+    """
+    if retry_after is not None:
+        return min(retry_after, config.RETRY_AFTER_MAX)
+    backoff: float = min(
+        config.RETRY_BACKOFF_MAX,
+        config.RETRY_BACKOFF_BASE * 2**attempt,
+    )
+    return random.uniform(0, backoff)
+
+
+circuit_breakers: CircuitBreakerRegistry = CircuitBreakerRegistry(
+    config=settings.http_client
+)
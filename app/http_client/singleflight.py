@@ -0,0 +1,76 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+import asyncio
+import hashlib
+import json
+
+
+class SingleFlight:
+    """Объединяет одновременные одинаковые запросы в один.
+
+    Пока запрос с ключом выполняется, остальные вызовы с тем же ключом не
+    запускают новый, а ждут результат уже идущего. Исключение запроса получают
+    все ожидающие. В отличие от CoalescingTTLCache результат не сохраняется:
+    следующий вызов после завершения запроса выполнит новый запрос.
+    """
+
+    def __init__(self):
+        self.coalesced: int = 0
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    def is_in_flight(self, key: Hashable) -> bool:
+        return key in self._in_flight
+
+    async def do(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Выполняет fetch или ждет результат уже идущего запроса с тем же ключом.
+
+        Args:
+            key (Hashable): Ключ запроса
+            fetch (Callable): Функция без аргументов, возвращающая корутину запроса
+
+        Returns:
+            Any: Результат fetch. Один и тот же объект для всех ожидающих
+        """
+        task: Optional[asyncio.Task] = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fetch())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+
+        # shield - чтобы отмена одного ожидающего не отменяла запрос для остальных
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Если все ожидающие отменены, исключение запроса некому получить
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+
+def get_request_key(
+    method: str,
+    url: str,
+    data_type: str,
+    timeout: Optional[float],
+    headers: Optional[Dict[str, str]],
+) -> Tuple[str, str, str, Optional[float], str]:
+    """Возвращает ключ запроса для SingleFlight.
+
+    В ключ входят все заголовки, поэтому запросы с разными ключами API или
+    авторизацией никогда не получают ответ друг друга. Заголовки хранятся в
+    ключе только в виде хэша.
+    """
+    normalized: list = sorted(
+        (str(name).lower(), str(value)) for name, value in (headers or {}).items()
+    )
+    headers_hash: str = hashlib.sha256(json.dumps(normalized).encode()).hexdigest()
+    return method.upper(), url, data_type.upper(), timeout, headers_hash
+
+
+# Одновременные одинаковые GET запросы error_handler_for_the_website
+upstream_single_flight: SingleFlight = SingleFlight()
@@ -0,0 +1,207 @@
+from types import SimpleNamespace
+from typing import Dict, Optional
+import asyncio
+
+import aiohttp
+
+from http_client.quota import quota_manager
+from http_client.resilience import circuit_breakers, CircuitBreaker
+from metrics.main import metrics, Counter, Gauge, Histogram
+from settings.config import settings
+
+
+upstream_requests_total: Counter = metrics.counter(
+    "upstream_requests_total",
+    "Количество ответов внешних сайтов по статусу",
+    ["host", "status"],
+)
+upstream_errors_total: Counter = metrics.counter(
+    "upstream_errors_total",
+    "Количество запросов к сайтам, завершившихся исключением",
+    ["host", "error"],
+)
+upstream_timeouts_total: Counter = metrics.counter(
+    "upstream_timeouts_total",
+    "Количество запросов с истекшим таймаутом, в том числе при чтении тела",
+    ["host"],
+)
+upstream_retries_total: Counter = metrics.counter(
+    "upstream_retries_total", "Количество повторов запросов", ["host"]
+)
+upstream_coalesced_total: Counter = metrics.counter(
+    "upstream_coalesced_total",
+    "Количество запросов, получивших ответ уже идущего одинакового запроса",
+    ["host"],
+)
+upstream_circuit_rejections_total: Counter = metrics.counter(
+    "upstream_circuit_rejections_total",
+    "Количество запросов, отклоненных предохранителем без обращения к сайту",
+    ["host"],
+)
+upstream_request_bytes_total: Counter = metrics.counter(
+    "upstream_request_bytes_total", "Отправлено байт тела запросов", ["host"]
+)
+upstream_response_bytes_total: Counter = metrics.counter(
+    "upstream_response_bytes_total", "Получено байт тела ответов", ["host"]
+)
+upstream_connect_duration_seconds: Histogram = metrics.histogram(
+    "upstream_connect_duration_seconds",
+    "Время установки нового соединения (DNS, TCP, TLS)",
+    ["host"],
+)
+upstream_ttfb_seconds: Histogram = metrics.histogram(
+    "upstream_ttfb_seconds",
+    "Время от начала запроса до получения заголовков ответа",
+    ["host"],
+)
+upstream_request_duration_seconds: Histogram = metrics.histogram(
+    "upstream_request_duration_seconds",
+    "Время попытки запроса вместе с чтением тела ответа",
+    ["host"],
+)
+
+upstream_quota_tokens: Gauge = metrics.gauge(
+    "upstream_quota_tokens",
+    "Сколько запросов к сервису можно сделать сейчас без ожидания",
+    ["service"],
+)
+upstream_quota_waiting: Gauge = metrics.gauge(
+    "upstream_quota_waiting",
+    "Количество запросов, ожидающих своей очереди к сервису",
+    ["service"],
+)
+upstream_quota_remaining_today: Gauge = metrics.gauge(
+    "upstream_quota_remaining_today",
+    "Сколько запросов к сервису осталось на сегодня",
+    ["service"],
+)
+upstream_circuit_state: Gauge = metrics.gauge(
+    "upstream_circuit_state",
+    "Состояние предохранителя сайта: 1 у текущего состояния, 0 у остальных",
+    ["host", "state"],
+)
+upstream_circuit_failures: Gauge = metrics.gauge(
+    "upstream_circuit_failures",
+    "Количество ошибок сайта подряд",
+    ["host"],
+)
+
+
+def collect_upstream_state() -> None:
+    """Переносит оставшиеся квоты и состояния предохранителей в метрики."""
+
+    for service, stats in quota_manager.stats().items():
+        upstream_quota_tokens.set(stats["tokens"], service=service)
+        upstream_quota_waiting.set(stats["waiting"], service=service)
+        # Без суточной квоты оставшееся количество не ограничено
+        if stats["remaining_today"] is not None:
+            upstream_quota_remaining_today.set(
+                stats["remaining_today"], service=service
+            )
+
+    for host, stats in circuit_breakers.stats().items():
+        for state in (
+            CircuitBreaker.CLOSED,
+            CircuitBreaker.HALF_OPEN,
+            CircuitBreaker.OPEN,
+        ):
+            upstream_circuit_state.set(
+                int(stats["state"] == state), host=host, state=state
+            )
+        upstream_circuit_failures.set(stats["failures"], host=host)
+
+
+metrics.add_collector(collect_upstream_state)
+
+
+def get_timings(context: SimpleNamespace) -> Optional[Dict]:
+    """Возвращает словарь для времен запроса, переданный в trace_request_ctx."""
+
+    timings = context.trace_request_ctx
+    return timings if isinstance(timings, dict) else None
+
+
+async def on_request_start(
+    session: aiohttp.ClientSession,
+    context: SimpleNamespace,
+    params: aiohttp.TraceRequestStartParams,
+) -> None:
+    context.host = settings.get_upstream_host(str(params.url))
+    context.started = asyncio.get_running_loop().time()
+
+
+async def on_connection_create_start(
+    session: aiohttp.ClientSession,
+    context: SimpleNamespace,
+    params: aiohttp.TraceConnectionCreateStartParams,
+) -> None:
+    context.connect_started = asyncio.get_running_loop().time()
+
+
+async def on_connection_create_end(
+    session: aiohttp.ClientSession,
+    context: SimpleNamespace,
+    params: aiohttp.TraceConnectionCreateEndParams,
+) -> None:
+    duration: float = asyncio.get_running_loop().time() - context.connect_started
+    upstream_connect_duration_seconds.observe(duration, host=context.host)
+    timings: Optional[Dict] = get_timings(context)
+    if timings is not None:
+        timings["connect"] = duration
+
+
+async def on_request_chunk_sent(
+    session: aiohttp.ClientSession,
+    context: SimpleNamespace,
+    params: aiohttp.TraceRequestChunkSentParams,
+) -> None:
+    upstream_request_bytes_total.inc(len(params.chunk), host=context.host)
+
+
+async def on_request_end(
+    session: aiohttp.ClientSession,
+    context: SimpleNamespace,
+    params: aiohttp.TraceRequestEndParams,
+) -> None:
+    # Вызывается после получения заголовков ответа, тело еще не прочитано
+    duration: float = asyncio.get_running_loop().time() - context.started
+    upstream_ttfb_seconds.observe(duration, host=context.host)
+    upstream_requests_total.inc(host=context.host, status=str(params.response.status))
+    timings: Optional[Dict] = get_timings(context)
+    if timings is not None:
+        timings["ttfb"] = duration
+
+
+async def on_response_chunk_received(
+    session: aiohttp.ClientSession,
+    context: SimpleNamespace,
+    params: aiohttp.TraceResponseChunkReceivedParams,
+) -> None:
+    upstream_response_bytes_total.inc(len(params.chunk), host=context.host)
+
+
+async def on_request_exception(
+    session: aiohttp.ClientSession,
+    context: SimpleNamespace,
+    params: aiohttp.TraceRequestExceptionParams,
+) -> None:
+    upstream_errors_total.inc(
+        host=context.host, error=type(params.exception).__name__
+    )
+
+
+def create_trace_config() -> aiohttp.TraceConfig:
+    """Возвращает TraceConfig, собирающий метрики запросов по сайтам.
+
+    Если в session.request передан trace_request_ctx={}, в него записываются
+    время соединения ('connect') и время до заголовков ответа ('ttfb').
+    """
+    trace_config: aiohttp.TraceConfig = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_connection_create_start.append(on_connection_create_start)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_request_chunk_sent.append(on_request_chunk_sent)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_response_chunk_received.append(on_response_chunk_received)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
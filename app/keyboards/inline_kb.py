@@ -1,5 +1,3 @@
-from typing import List
-
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
@@ -186,40 +184,33 @@ def get_button_recommender_system_by_kinopoisk():
 
 
 def get_button_for_forward_or_back(
-    video_search_list: List,
+    search_id: str,
+    total: int,
     count: int = 0,
     step: int = 1,
 ):
-    """Возвращает инлайн кнопки для прoлистывания назад или вперед."""
+    """Возвращает инлайн кнопки для прoлистывания назад или вперед.
+
+    Args:
+        search_id (str): Id поиска в хранилище результатов
+        total (int): Количество результатов поиска
+        count (int, optional): Номер текущего результата начиная с 0
+        step (int, optional): Шаг листания
+    """
 
     inline_kb = InlineKeyboardBuilder()
-    if count == 0:
-        if len(video_search_list) == 1:
-            pass
-        else:
-            inline_kb.add(
-                InlineKeyboardButton(
-                    text="Вперед 👉", callback_data=f"fb forward {count+step}"
-                )
+    if count - step >= 0:
+        inline_kb.add(
+            InlineKeyboardButton(
+                text="👈 Назад", callback_data=f"fb back {search_id} {count-step}"
             )
-    else:
-        if len(video_search_list) - count == step:
-            inline_kb.add(
-                InlineKeyboardButton(
-                    text="👈 Назад", callback_data=f"fb back {count-step}"
-                )
-            )
-        elif len(video_search_list) - count >= step:
-            inline_kb.add(
-                InlineKeyboardButton(
-                    text="👈 Назад", callback_data=f"fb back {count-step}"
-                )
-            )
-            inline_kb.add(
-                InlineKeyboardButton(
-                    text="Вперед 👉", callback_data=f"fb forward {count+step}"
-                )
+        )
+    if count + step < total:
+        inline_kb.add(
+            InlineKeyboardButton(
+                text="Вперед 👉", callback_data=f"fb forward {search_id} {count+step}"
             )
+        )
     return inline_kb.as_markup(resize_keyboard=True)
 
 
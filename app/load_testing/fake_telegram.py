@@ -0,0 +1,231 @@
+"""Локальный сервер, отвечающий вместо Bot API телеграм.
+
+Принимает getUpdates, sendMessage, editMessageText, sendDocument, sendPhoto и
+остальные вызываемые ботом методы, запоминает отправленные ботом сообщения и
+отдает боту обновления, добавленные через push_update или POST /fake/updates.
+
+Запуск из папки app:
+
+    python -m load_testing.fake_telegram --port 8081
+
+после чего бот запускается с переменной окружения
+TELEGRAM_API_SERVER=http://127.0.0.1:8081. Обычно сервер запускает
+load_testing.load_generator, отдельный запуск нужен для ручной проверки.
+"""
+from typing import Any, Dict, List, Optional
+from collections import Counter
+import argparse
+import asyncio
+import json
+import time
+
+from aiohttp import web
+
+from settings.config import settings, FakeTelegramSettings
+
+
+# Пользователь бота, которого возвращает getMe
+BOT_USER: Dict = {
+    "id": 1,
+    "is_bot": True,
+    "first_name": "FunctionalStoreBot",
+    "username": "functional_store_bot",
+}
+
+# Методы, которые возвращают отправленное сообщение
+MESSAGE_METHODS: List[str] = [
+    "sendmessage",
+    "sendphoto",
+    "senddocument",
+    "editmessagetext",
+    "editmessagereplymarkup",
+    "editmessagecaption",
+]
+
+
+class FakeTelegram:
+    """Состояние сервера: очередь обновлений для бота и сообщения бота по чатам."""
+
+    def __init__(self, config: FakeTelegramSettings):
+        """
+        Args:
+            config (FakeTelegramSettings): Настройки сервера
+        """
+        self.config: FakeTelegramSettings = config
+        self.updates: List[Dict] = []
+        self.calls: Counter = Counter()
+        self._update_id: int = 0
+        self._message_id: int = 0
+        self._file_id: int = 0
+        self._new_updates: asyncio.Event = asyncio.Event()
+        # Очереди сообщений бота по чатам для тех, кто ждет ответа
+        self._inboxes: Dict[int, asyncio.Queue] = {}
+
+    def push_update(self, update: Dict) -> int:
+        """Добавляет обновление для бота и возвращает его update_id.
+
+        Args:
+            update (Dict): Обновление телеграм. update_id назначается сервером
+        """
+        self._update_id += 1
+        update["update_id"] = self._update_id
+        self.updates.append(update)
+        self._new_updates.set()
+        return self._update_id
+
+    def subscribe(self, chat_id: int) -> asyncio.Queue:
+        """Возвращает очередь сообщений, которые бот отправит в чат."""
+
+        return self._inboxes.setdefault(chat_id, asyncio.Queue())
+
+    def unsubscribe(self, chat_id: int) -> None:
+        self._inboxes.pop(chat_id, None)
+
+    async def get_updates(self, offset: int, timeout: float) -> List[Dict]:
+        """Возвращает обновления начиная с offset, ожидая их до timeout секунд."""
+
+        # Обновления до offset бот уже обработал
+        self.updates = [
+            update for update in self.updates if update["update_id"] >= offset
+        ]
+        if not self.updates and timeout:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.updates[:100]
+
+    def build_message(self, method: str, fields: Dict[str, Any]) -> Dict:
+        """Возвращает сообщение бота в формате Bot API и передает его ожидающим."""
+
+        chat_id: int = int(fields.get("chat_id") or 0)
+        if method.startswith("edit") and fields.get("message_id"):
+            message_id: int = int(fields["message_id"])
+        else:
+            self._message_id += 1
+            message_id = self._message_id
+
+        message: Dict = {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+        }
+        if "text" in fields:
+            message["text"] = fields["text"]
+        if "caption" in fields:
+            message["caption"] = fields["caption"]
+        if fields.get("reply_markup"):
+            reply_markup: Dict = json.loads(fields["reply_markup"])
+            # Обычная клавиатура в ответе Bot API не возвращается
+            if "inline_keyboard" in reply_markup:
+                message["reply_markup"] = reply_markup
+
+        self._file_id += 1
+        file: Dict = {
+            "file_id": f"fake-file-{self._file_id}",
+            "file_unique_id": f"fake-unique-{self._file_id}",
+        }
+        if method == "sendphoto":
+            message["photo"] = [{**file, "width": 100, "height": 100}]
+        elif method == "senddocument":
+            message["document"] = file
+
+        inbox: Optional[asyncio.Queue] = self._inboxes.get(chat_id)
+        if inbox is not None:
+            inbox.put_nowait({"method": method, **message})
+        return message
+
+    def stats(self) -> Dict:
+        """Возвращает количество вызовов методов Bot API."""
+
+        return dict(self.calls)
+
+
+FAKE_TELEGRAM_KEY: web.AppKey = web.AppKey("fake_telegram", FakeTelegram)
+
+
+async def read_fields(request: web.Request) -> Dict[str, Any]:
+    """Возвращает параметры метода из json, формы или строки запроса."""
+
+    if request.content_type == "application/json":
+        return await request.json()
+    if request.method == "POST":
+        form = await request.post()
+        # Файлы не нужны, важен только факт отправки
+        return {
+            key: value for key, value in form.items() if isinstance(value, str)
+        }
+    return dict(request.query)
+
+
+async def bot_api_handler(request: web.Request) -> web.Response:
+    fake: FakeTelegram = request.app[FAKE_TELEGRAM_KEY]
+    method: str = request.match_info["method"].lower()
+    fields: Dict[str, Any] = await read_fields(request)
+    fake.calls[method] += 1
+
+    if method == "getupdates":
+        result: Any = await fake.get_updates(
+            offset=int(fields.get("offset") or 0),
+            timeout=float(fields.get("timeout") or 0),
+        )
+        return web.json_response({"ok": True, "result": result})
+
+    if fake.config.LATENCY:
+        await asyncio.sleep(fake.config.LATENCY)
+
+    if method == "getme":
+        result = BOT_USER
+    elif method in MESSAGE_METHODS:
+        result = fake.build_message(method=method, fields=fields)
+    else:
+        # setMyCommands, deleteWebhook, answerCallbackQuery и остальные
+        result = True
+    return web.json_response({"ok": True, "result": result})
+
+
+async def push_update_handler(request: web.Request) -> web.Response:
+    update_id: int = request.app[FAKE_TELEGRAM_KEY].push_update(await request.json())
+    return web.json_response({"update_id": update_id})
+
+
+async def stats_handler(request: web.Request) -> web.Response:
+    return web.json_response(request.app[FAKE_TELEGRAM_KEY].stats())
+
+
+def create_app(fake: FakeTelegram) -> web.Application:
+    """Создает приложение сервера.
+
+    Args:
+        fake (FakeTelegram): Состояние сервера
+    """
+    app: web.Application = web.Application(client_max_size=100 * 1024 * 1024)
+    app[FAKE_TELEGRAM_KEY] = fake
+    app.router.add_route("*", "/bot{token}/{method}", bot_api_handler)
+    app.router.add_post("/fake/updates", push_update_handler)
+    app.router.add_get("/fake/stats", stats_handler)
+    return app
+
+
+def main() -> None:
+    config: FakeTelegramSettings = settings.fake_telegram
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default=config.HOST)
+    parser.add_argument("--port", type=int, default=config.PORT)
+    parser.add_argument("--latency", type=float, default=config.LATENCY)
+    args: argparse.Namespace = parser.parse_args()
+
+    config = config.model_copy(
+        update={"HOST": args.host, "PORT": args.port, "LATENCY": args.latency}
+    )
+
+    async def create() -> web.Application:
+        return create_app(FakeTelegram(config=config))
+
+    web.run_app(create(), host=config.HOST, port=config.PORT)
+
+
+if __name__ == "__main__":
+    main()
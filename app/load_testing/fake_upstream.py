@@ -0,0 +1,296 @@
+"""Локальный сервер, отвечающий вместо внешних API записанными ответами из
+static/files.
+
+Отвечает как OpenWeatherMap, kinopoisk.dev, ipapi, webshare, YouTube Data API,
+google (проверка доступности перед поиском картинок) и сайты с картинками.
+Адрес сайта передается первой частью пути, так их подставляет профиль
+PROFILE=fake_upstream:
+
+    http://127.0.0.1:8090/api.kinopoisk.dev/v1.4/movie/search?...
+
+Запуск из папки app:
+
+    python -m load_testing.fake_upstream --latency 0.2 --error-rate 0.05 --max-rps 50
+
+после чего бот запускается с переменной окружения PROFILE=fake_upstream.
+"""
+from typing import Any, Dict, List, Optional
+from pathlib import Path
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+
+from aiohttp import web
+
+from settings.config import settings, FakeUpstreamSettings
+from settings.path_settings import path_settings
+
+
+PATH_FILES: Path = path_settings.APP_DIR / "static" / "files"
+PATH_IMAGE: Path = path_settings.APP_DIR / "static" / "img" / "none.png"
+
+# Ключи приложения aiohttp
+CONFIG_KEY: web.AppKey = web.AppKey("config", FakeUpstreamSettings)
+FIXTURES_KEY: web.AppKey = web.AppKey("fixtures", dict)
+
+
+def load_json(name: str) -> Any:
+    with open(PATH_FILES / name, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def rewrite_posters(data: Any, base_url: str) -> Any:
+    """Заменяет ссылки на постеры kinopoisk ссылками на картинки этого сервера.
+
+    Args:
+        data (Any): Ответ kinopoisk
+        base_url (str): Адрес сервера
+    """
+    if isinstance(data, dict):
+        result: Dict = {}
+        for key, value in data.items():
+            if key in ("url", "previewUrl") and isinstance(value, str):
+                name: str = hashlib.sha1(value.encode()).hexdigest()
+                value = f"{base_url}/images/{name}.jpg"
+            result[key] = rewrite_posters(value, base_url)
+        return result
+    if isinstance(data, list):
+        return [rewrite_posters(value, base_url) for value in data]
+    return data
+
+
+def load_fixtures(config: FakeUpstreamSettings) -> Dict[str, Any]:
+    """Загружает записанные ответы и приводит их к формату настоящих API."""
+
+    # В файле прокси уже в формате бота, webshare отдает ip:port:username:password
+    proxies: List[str] = []
+    path_proxies: Path = PATH_FILES / "webshare" / "proxies_list.txt"
+    with open(path_proxies, "r", encoding="utf-8") as file:
+        for line in file.read().split():
+            credentials, address = line.split("@")
+            proxies.append(f"{address}:{credentials}")
+
+    if config.IMAGE_SIZE is None:
+        image: bytes = PATH_IMAGE.read_bytes()
+    else:
+        image = os.urandom(config.IMAGE_SIZE)
+
+    return {
+        "geo": load_json("openweathermap/weather.json"),
+        "weather": load_json("openweathermap/weather_current.json"),
+        "forecast": load_json("openweathermap/feature_weather.json"),
+        "air_pollution": load_json("openweathermap/air_pollution.json"),
+        "ipapi": load_json("ipapi/ipapi.json"),
+        "movies": rewrite_posters(
+            load_json("kinopoisk/search_video_name.json"), config.URL
+        ),
+        "youtube": load_json("youtube/youtube.json"),
+        "proxies": "".join(f"{proxy}\r\n" for proxy in proxies).encode(),
+        "image": image,
+    }
+
+
+class RateLimiter:
+    """Ограничивает количество обслуживаемых запросов в секунду."""
+
+    def __init__(self, rate: Optional[float]):
+        self.rate: Optional[float] = rate
+        self.tokens: float = rate or 0
+        self._updated_at: float = time.monotonic()
+
+    def allow(self) -> bool:
+        if not self.rate:
+            return True
+        now: float = time.monotonic()
+        self.tokens = min(
+            self.rate,
+            self.tokens + (now - self._updated_at) * self.rate,
+        )
+        self._updated_at = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+def create_middleware(config: FakeUpstreamSettings):
+    """Возвращает middleware с задержкой, ошибками и ограничением запросов."""
+
+    limiter: RateLimiter = RateLimiter(rate=config.MAX_RPS)
+
+    @web.middleware
+    async def upstream_conditions(
+        request: web.Request, handler
+    ) -> web.StreamResponse:
+        if not limiter.allow():
+            return web.json_response(
+                {"message": "Too Many Requests"},
+                status=429,
+                headers={"Retry-After": "1"},
+            )
+
+        await asyncio.sleep(config.LATENCY + random.uniform(0, config.LATENCY_JITTER))
+
+        if random.random() < config.ERROR_RATE:
+            return web.json_response({"message": "Service Unavailable"}, status=503)
+        return await handler(request)
+
+    return upstream_conditions
+
+
+async def send_body(
+    request: web.Request,
+    body: bytes,
+    content_type: str,
+) -> web.StreamResponse:
+    """Отдает тело ответа со скоростью не больше BANDWIDTH байт в секунду."""
+
+    config: FakeUpstreamSettings = request.app[CONFIG_KEY]
+    if not config.BANDWIDTH:
+        return web.Response(body=body, content_type=content_type)
+
+    response: web.StreamResponse = web.StreamResponse(
+        headers={"Content-Type": content_type}
+    )
+    response.content_length = len(body)
+    await response.prepare(request)
+
+    # Отдаем тело частями по десятой доле секунды
+    chunk_size: int = max(1, config.BANDWIDTH // 10)
+    for start in range(0, len(body), chunk_size):
+        chunk: bytes = body[start : start + chunk_size]
+        await response.write(chunk)
+        await asyncio.sleep(len(chunk) / config.BANDWIDTH)
+    await response.write_eof()
+    return response
+
+
+async def send_json(request: web.Request, data: Any) -> web.StreamResponse:
+    return await send_body(
+        request=request,
+        body=json.dumps(data, ensure_ascii=False).encode(),
+        content_type="application/json",
+    )
+
+
+def fixture_handler(name: str):
+    """Возвращает обработчик, отдающий записанный json ответ."""
+
+    async def handler(request: web.Request) -> web.StreamResponse:
+        return await send_json(request, request.app[FIXTURES_KEY][name])
+
+    return handler
+
+
+async def ipapi_handler(request: web.Request) -> web.StreamResponse:
+    data: Dict = dict(request.app[FIXTURES_KEY]["ipapi"])
+    data["ip"] = request.match_info["ip"]
+    return await send_json(request, data)
+
+
+async def webshare_config_handler(request: web.Request) -> web.StreamResponse:
+    if not request.headers.get("Authorization"):
+        return web.json_response({"detail": "Invalid token."}, status=401)
+    return await send_json(request, {"proxy_list_download_token": "fake-upstream"})
+
+
+async def webshare_proxies_handler(request: web.Request) -> web.StreamResponse:
+    return await send_body(
+        request=request,
+        body=request.app[FIXTURES_KEY]["proxies"],
+        content_type="text/plain",
+    )
+
+
+async def google_handler(request: web.Request) -> web.StreamResponse:
+    # Поиск картинок только проверяет, что google отвечает
+    return await send_body(
+        request=request,
+        body=b"<!doctype html><title>Google</title>",
+        content_type="text/html",
+    )
+
+
+async def image_handler(request: web.Request) -> web.StreamResponse:
+    return await send_body(
+        request=request,
+        body=request.app[FIXTURES_KEY]["image"],
+        content_type="image/png",
+    )
+
+
+def create_app(config: FakeUpstreamSettings) -> web.Application:
+    """Создает приложение сервера.
+
+    Args:
+        config (FakeUpstreamSettings): Настройки задержек, ошибок и ограничений
+    """
+    app: web.Application = web.Application(middlewares=[create_middleware(config)])
+    app[CONFIG_KEY] = config
+    app[FIXTURES_KEY] = load_fixtures(config)
+
+    openweathermap: str = "/api.openweathermap.org"
+    kinopoisk: str = "/api.kinopoisk.dev/v1.4"
+    webshare: str = "/proxy.webshare.io/api/v2/proxy"
+    app.router.add_get(f"{openweathermap}/geo/1.0/direct", fixture_handler("geo"))
+    app.router.add_get(
+        f"{openweathermap}/data/2.5/weather", fixture_handler("weather")
+    )
+    app.router.add_get(
+        f"{openweathermap}/data/2.5/forecast", fixture_handler("forecast")
+    )
+    app.router.add_get(
+        f"{openweathermap}/data/2.5/air_pollution", fixture_handler("air_pollution")
+    )
+    app.router.add_get("/tile.openweathermap.org/map/{tail:.+}", image_handler)
+    app.router.add_get(f"{kinopoisk}/movie", fixture_handler("movies"))
+    app.router.add_get(f"{kinopoisk}/movie/search", fixture_handler("movies"))
+    app.router.add_get("/api.ipapi.com/api/{ip}", ipapi_handler)
+    app.router.add_get(f"{webshare}/config/", webshare_config_handler)
+    app.router.add_get(
+        f"{webshare}/list/download/{{tail:.+}}", webshare_proxies_handler
+    )
+    app.router.add_get(
+        "/www.googleapis.com/youtube/v3/search", fixture_handler("youtube")
+    )
+    app.router.add_get("/www.google.com/", google_handler)
+    app.router.add_get("/images/{name}", image_handler)
+    return app
+
+
+def main() -> None:
+    config: FakeUpstreamSettings = settings.fake_upstream
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default=config.HOST)
+    parser.add_argument("--port", type=int, default=config.PORT)
+    parser.add_argument("--latency", type=float, default=config.LATENCY)
+    parser.add_argument(
+        "--latency-jitter", type=float, default=config.LATENCY_JITTER
+    )
+    parser.add_argument("--error-rate", type=float, default=config.ERROR_RATE)
+    parser.add_argument("--max-rps", type=float, default=config.MAX_RPS)
+    parser.add_argument("--bandwidth", type=int, default=config.BANDWIDTH)
+    parser.add_argument("--image-size", type=int, default=config.IMAGE_SIZE)
+    args: argparse.Namespace = parser.parse_args()
+
+    config = config.model_copy(
+        update={
+            "HOST": args.host,
+            "PORT": args.port,
+            "LATENCY": args.latency,
+            "LATENCY_JITTER": args.latency_jitter,
+            "ERROR_RATE": args.error_rate,
+            "MAX_RPS": args.max_rps,
+            "BANDWIDTH": args.bandwidth,
+            "IMAGE_SIZE": args.image_size,
+        }
+    )
+    web.run_app(create_app(config), host=config.HOST, port=config.PORT)
+
+
+if __name__ == "__main__":
+    main()
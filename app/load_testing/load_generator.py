@@ -0,0 +1,411 @@
+"""Проигрывает диалоги пользователей с ботом через локальный Bot API сервер и
+измеряет пропускную способность диспетчера.
+
+Каждый виртуальный пользователь проходит сценарии (пароли, погода, поиск
+обложек, информация по ip, прокси): отправляет обновление и ждет, пока бот не
+пришлет ожидаемое сообщение. В конце печатается количество обновлений в
+секунду, перцентили времени прохождения каждого сценария и количество ошибок.
+
+Запуск из папки app. Сначала генератор, он поднимает load_testing.fake_telegram:
+
+    python -m load_testing.load_generator --users 1000 --ramp-up 10
+
+затем бот с переменными окружения TELEGRAM_API_SERVER=http://127.0.0.1:8081 и
+PROFILE=fake_upstream (и запущенным load_testing.fake_upstream). Для режима
+webhook обновления отправляются боту через --webhook-url.
+"""
+from typing import Awaitable, Callable, Dict, List, Optional
+from dataclasses import dataclass, field
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import time
+
+import aiohttp
+from aiohttp import web
+
+from load_testing.fake_telegram import FakeTelegram, create_app
+from load_testing.stats import latency_summary, format_summary
+from load_testing.webhook_harness import PATH_UPDATES, build_update
+from settings.config import settings, FakeTelegramSettings
+
+
+@dataclass
+class Step:
+    """Шаг сценария: что отправляет пользователь и какого ответа ждет."""
+
+    kind: str  # 'text' - сообщение, 'callback' - нажатие инлайн кнопки
+    value: str  # Текст сообщения или callback data
+    expect: str  # Часть текста сообщения бота, завершающего шаг
+
+
+# Сценарии диалогов пользователя с ботом
+SCENARIOS: Dict[str, List[Step]] = {
+    "password": [
+        Step("text", "/start", "Главное меню бота"),
+        Step("text", "Генерация паролей", "Доступные варианты"),
+        Step("callback", "password simple", "Главное меню бота"),
+    ],
+    "weather": [
+        Step("text", "Прогноз Погоды", "Выберите варианты прогноза погоды"),
+        Step("callback", "current_weather", "Введите название города"),
+        Step("text", "Москва", "Главное меню бота"),
+    ],
+    "image_search": [
+        Step("text", "Поиск Изображений", "Варианты выбора"),
+        Step("callback", "find_image poster", "Введите названия фильмов"),
+        Step("text", "матрица", "Главное меню бота"),
+    ],
+    "ip_info": [
+        Step("text", "Информация по ip", "Доступные варианты"),
+        Step("callback", "ip ip_info", "Введите номер ip"),
+        Step("text", "8.8.8.8", "Главное меню бота"),
+    ],
+    "proxies": [
+        Step("text", "Получить список прокси", "Доступные варианты"),
+        Step("callback", "proxies webshare", "Главное меню бота"),
+    ],
+}
+
+# Части сообщений бота, по которым шаг считается завершенным с ошибкой
+ERROR_MARKERS: List[str] = [
+    "снова",
+    "cнова",
+    "ошибк",
+    "не удалось",
+    "недоступен",
+    "истекло",
+]
+
+
+class FlowError(Exception):
+    """Бот ответил ошибкой или не ответил вовремя."""
+
+
+@dataclass
+class LoadResult:
+    """Результаты нагрузочного теста."""
+
+    updates: int = 0
+    latencies: Dict[str, List[float]] = field(default_factory=dict)
+    errors: Dict[str, int] = field(default_factory=dict)
+
+
+class LoadGenerator:
+    """Виртуальные пользователи, проходящие сценарии через FakeTelegram."""
+
+    def __init__(
+        self,
+        fake: FakeTelegram,
+        templates: List[Dict],
+        timeout: float,
+        send: Optional[Callable[[Dict], Awaitable[None]]] = None,
+    ):
+        """
+        Args:
+            fake (FakeTelegram): Bot API сервер, через который бот отвечает
+            templates (List[Dict]): Записанные обновления для сообщений и кнопок
+            timeout (float): Сколько секунд ждать ответ бота на один шаг
+            send (Callable, optional): Доставка обновления боту. По умолчанию
+                через getUpdates сервера
+        """
+        self.fake: FakeTelegram = fake
+        self.timeout: float = timeout
+        self.send: Callable[[Dict], Awaitable[None]] = send or self.push_update
+        self.result: LoadResult = LoadResult()
+        self.message_template: Dict = next(
+            update for update in templates if "message" in update
+        )
+        self.callback_template: Dict = next(
+            update for update in templates if "callback_query" in update
+        )
+        self._update_id: int = 0
+
+    async def push_update(self, update: Dict) -> None:
+        self.fake.push_update(update)
+
+    def build_step_update(self, step: Step, user_id: int, message_id: int) -> Dict:
+        """Возвращает обновление для шага сценария.
+
+        Args:
+            step (Step): Шаг сценария
+            user_id (int): Id пользователя и чата
+            message_id (int): Id последнего сообщения бота с инлайн кнопками
+        """
+        self._update_id += 1
+        if step.kind == "callback":
+            update: Dict = build_update(
+                template=self.callback_template,
+                update_id=self._update_id,
+                user_id=user_id,
+            )
+            update["callback_query"]["id"] = str(self._update_id)
+            update["callback_query"]["data"] = step.value
+            update["callback_query"]["message"]["message_id"] = message_id
+        else:
+            update = build_update(
+                template=self.message_template,
+                update_id=self._update_id,
+                user_id=user_id,
+            )
+            update["message"]["message_id"] = self._update_id
+            update["message"]["date"] = int(time.time())
+            update["message"]["text"] = step.value
+        return update
+
+    async def wait_reply(self, inbox: asyncio.Queue, step: Step) -> int:
+        """Ждет сообщение бота, завершающее шаг.
+
+        Returns:
+            int: Id последнего сообщения бота с инлайн кнопками или 0
+
+        Raises:
+            FlowError: Если бот ответил ошибкой или не ответил за timeout секунд
+        """
+        message_id: int = 0
+        deadline: float = time.monotonic() + self.timeout
+        while True:
+            try:
+                message: Dict = await asyncio.wait_for(
+                    inbox.get(), timeout=deadline - time.monotonic()
+                )
+            except asyncio.TimeoutError:
+                raise FlowError(f"Нет ответа на '{step.value}'")
+
+            text: str = message.get("text") or message.get("caption") or ""
+            if "reply_markup" in message:
+                message_id = message["message_id"]
+            if any(marker in text.lower() for marker in ERROR_MARKERS):
+                raise FlowError(text[:100])
+            if step.expect in text:
+                return message_id
+
+    async def run_flow(self, name: str, user_id: int) -> bool:
+        """Проходит сценарий name от лица пользователя.
+
+        Returns:
+            bool: True если сценарий пройден без ошибок
+        """
+        inbox: asyncio.Queue = self.fake.subscribe(chat_id=user_id)
+        message_id: int = 0
+        started: float = time.perf_counter()
+        try:
+            for step in SCENARIOS[name]:
+                await self.send(
+                    self.build_step_update(
+                        step=step, user_id=user_id, message_id=message_id
+                    )
+                )
+                self.result.updates += 1
+                message_id = await self.wait_reply(inbox=inbox, step=step)
+        except (FlowError, aiohttp.ClientError):
+            self.result.errors[name] = self.result.errors.get(name, 0) + 1
+            return False
+        finally:
+            self.fake.unsubscribe(chat_id=user_id)
+
+        self.result.latencies.setdefault(name, []).append(
+            time.perf_counter() - started
+        )
+        return True
+
+    async def run_user(
+        self,
+        number: int,
+        users: int,
+        scenarios: List[str],
+        iterations: int,
+        delay: float,
+    ) -> None:
+        """Проходит iterations сценариев от лица одного пользователя по очереди."""
+
+        await asyncio.sleep(delay)
+        user_id: int = 1_000_000 + number
+        for iteration in range(iterations):
+            name: str = scenarios[(number + iteration) % len(scenarios)]
+            if not await self.run_flow(name=name, user_id=user_id):
+                # После ошибки пользователь может остаться в состоянии FSM,
+                # поэтому дальше выступаем от лица нового пользователя
+                user_id += users
+
+    async def run(
+        self,
+        users: int,
+        scenarios: List[str],
+        iterations: int,
+        ramp_up: float,
+    ) -> Dict:
+        """Запускает users пользователей, равномерно за ramp_up секунд.
+
+        Returns:
+            Dict: Количество обновлений в секунду, задержки и ошибки по сценариям
+        """
+        started: float = time.perf_counter()
+        await asyncio.gather(
+            *(
+                self.run_user(
+                    number=number,
+                    users=users,
+                    scenarios=scenarios,
+                    iterations=iterations,
+                    delay=ramp_up * number / users,
+                )
+                for number in range(users)
+            )
+        )
+        elapsed: float = time.perf_counter() - started
+
+        return {
+            "updates": self.result.updates,
+            "elapsed_s": elapsed,
+            "updates_per_s": self.result.updates / elapsed if elapsed else 0.0,
+            "flows": {
+                name: {
+                    "completed": len(self.result.latencies.get(name, [])),
+                    "errors": self.result.errors.get(name, 0),
+                    "latency": latency_summary(self.result.latencies.get(name, [])),
+                }
+                for name in scenarios
+            },
+            "bot_api_calls": self.fake.stats(),
+        }
+
+
+async def run_load_test(
+    config: FakeTelegramSettings,
+    templates: List[Dict],
+    users: int,
+    scenarios: List[str],
+    iterations: int,
+    ramp_up: float,
+    timeout: float,
+    wait_bot: float,
+    webhook_url: Optional[str] = None,
+    secret_token: Optional[str] = None,
+) -> Dict:
+    """Поднимает FakeTelegram, ждет подключения бота и запускает пользователей.
+
+    Args:
+        config (FakeTelegramSettings): Настройки Bot API сервера
+        templates (List[Dict]): Записанные обновления
+        users (int): Количество пользователей
+        scenarios (List[str]): Имена сценариев из SCENARIOS
+        iterations (int): Сколько сценариев проходит каждый пользователь
+        ramp_up (float): За сколько секунд запустить всех пользователей
+        timeout (float): Сколько секунд ждать ответ бота на один шаг
+        wait_bot (float): Сколько секунд ждать первого запроса бота к серверу
+        webhook_url (str, optional): Адрес webhook бота. Если не указан,
+            бот забирает обновления через getUpdates
+        secret_token (str, optional): Секретный токен webhook
+    """
+    fake: FakeTelegram = FakeTelegram(config=config)
+    runner: web.AppRunner = web.AppRunner(create_app(fake))
+    await runner.setup()
+    await web.TCPSite(runner, host=config.HOST, port=config.PORT).start()
+    print(f"Bot API сервер слушает {config.URL}, ожидание бота...")
+
+    session: Optional[aiohttp.ClientSession] = None
+    try:
+        # Бот при запуске вызывает setMyCommands
+        deadline: float = time.monotonic() + wait_bot
+        while not fake.calls and time.monotonic() < deadline:
+            await asyncio.sleep(0.5)
+        if not fake.calls:
+            raise RuntimeError("Бот не подключился к Bot API серверу")
+
+        send: Optional[Callable[[Dict], Awaitable[None]]] = None
+        if webhook_url:
+            session = aiohttp.ClientSession()
+            headers: Dict = {}
+            if secret_token:
+                headers["X-Telegram-Bot-Api-Secret-Token"] = secret_token
+
+            async def send(update: Dict) -> None:
+                async with session.post(
+                    webhook_url, json=update, headers=headers
+                ) as resp:
+                    await resp.read()
+                    resp.raise_for_status()
+
+        generator: LoadGenerator = LoadGenerator(
+            fake=fake,
+            templates=templates,
+            timeout=timeout,
+            send=send,
+        )
+        return await generator.run(
+            users=users,
+            scenarios=scenarios,
+            iterations=iterations,
+            ramp_up=ramp_up,
+        )
+    finally:
+        if session is not None:
+            await session.close()
+        await runner.cleanup()
+
+
+def main() -> None:
+    config: FakeTelegramSettings = settings.fake_telegram
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default=config.HOST)
+    parser.add_argument("--port", type=int, default=config.PORT)
+    parser.add_argument("--latency", type=float, default=config.LATENCY)
+    parser.add_argument("--updates", type=Path, default=PATH_UPDATES)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=1)
+    parser.add_argument(
+        "--scenarios", default=",".join(SCENARIOS), help="Сценарии через запятую"
+    )
+    parser.add_argument("--ramp-up", type=float, default=0)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--wait-bot", type=float, default=60)
+    parser.add_argument("--webhook-url", default=None)
+    parser.add_argument("--secret-token", default=None)
+    args: argparse.Namespace = parser.parse_args()
+
+    scenarios: List[str] = args.scenarios.split(",")
+    unknown: List[str] = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Неизвестные сценарии: {', '.join(unknown)}")
+
+    with open(args.updates, "r", encoding="utf-8") as file:
+        templates: List[Dict] = json.load(file)
+
+    result: Dict = asyncio.run(
+        run_load_test(
+            config=config.model_copy(
+                update={
+                    "HOST": args.host,
+                    "PORT": args.port,
+                    "LATENCY": args.latency,
+                }
+            ),
+            templates=templates,
+            users=args.users,
+            scenarios=scenarios,
+            iterations=args.iterations,
+            ramp_up=args.ramp_up,
+            timeout=args.timeout,
+            wait_bot=args.wait_bot,
+            webhook_url=args.webhook_url,
+            secret_token=args.secret_token,
+        )
+    )
+    print(
+        f"Отправлено {result['updates']} обновлений за {result['elapsed_s']:.2f} c, "
+        f"{result['updates_per_s']:.1f} обновлений/c"
+    )
+    for name, flow in result["flows"].items():
+        print(
+            format_summary(
+                f"{name} (пройдено {flow['completed']}, ошибок {flow['errors']})",
+                flow["latency"],
+            )
+        )
+    print(f"Вызовы Bot API: {result['bot_api_calls']}")
+
+
+if __name__ == "__main__":
+    main()
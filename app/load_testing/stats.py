@@ -0,0 +1,40 @@
+from typing import Dict, List
+import math
+
+
+def percentile(values: List[float], percent: float) -> float:
+    """Возвращает перцентиль списка значений.
+
+    Args:
+        values (List[float]): Значения
+        percent (float): Перцентиль от 0 до 100
+
+    Returns:
+        float: Значение перцентиля или 0 если список пустой
+    """
+    if not values:
+        return 0.0
+    ordered: List[float] = sorted(values)
+    index: int = max(0, math.ceil(percent / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    """Возвращает p50, p95, p99 и максимум задержек в миллисекундах.
+
+    Args:
+        latencies (List[float]): Задержки в секундах
+    """
+    return {
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+    }
+
+
+def format_summary(name: str, summary: Dict[str, float]) -> str:
+    """Возвращает строку отчета вида 'name: p50_ms=1.0 p95_ms=2.0 ...'."""
+
+    values: str = " ".join(f"{key}={value:.1f}" for key, value in summary.items())
+    return f"{name}: {values}"
@@ -0,0 +1,133 @@
+"""Отправляет записанные обновления телеграм на webhook бота и измеряет пропускную
+способность.
+
+Запуск из папки app при запущенном боте в режиме webhook (RUN_MODE=webhook):
+
+    python -m load_testing.webhook_harness --requests 5000 --concurrency 100
+
+По умолчанию webhook отвечает до обработки обновления, и тогда замер показывает
+только скорость приема запросов. Чтобы измерить скорость обработки обновлений,
+запустите бота с WEBHOOK__HANDLE_IN_BACKGROUND=false.
+"""
+from typing import Dict, List, Optional
+from pathlib import Path
+import argparse
+import asyncio
+import copy
+import json
+import time
+
+import aiohttp
+
+from load_testing.stats import latency_summary, format_summary
+from settings.path_settings import path_settings
+
+
+PATH_UPDATES: Path = path_settings.APP_DIR / "static" / "files" / "telegram" / "updates.json"
+
+
+def build_update(template: Dict, update_id: int, user_id: int) -> Dict:
+    """Возвращает копию записанного обновления с новым update_id и пользователем.
+
+    Args:
+        template (Dict): Записанное обновление
+        update_id (int): Номер обновления
+        user_id (int): Id пользователя и чата
+    """
+    update: Dict = copy.deepcopy(template)
+    update["update_id"] = update_id
+    event: Dict = update.get("message") or update["callback_query"]
+    event["from"]["id"] = user_id
+    chat: Dict = event["chat"] if "chat" in event else event["message"]["chat"]
+    chat["id"] = user_id
+    return update
+
+
+async def post_updates(
+    url: str,
+    updates: List[Dict],
+    total: int,
+    concurrency: int,
+    users: int,
+    secret_token: Optional[str] = None,
+) -> Dict:
+    """Отправляет total обновлений на url не более concurrency одновременно.
+
+    Returns:
+        Dict: Количество ошибок, обновлений в секунду и задержки ответа webhook
+    """
+    headers: Dict = {}
+    if secret_token:
+        headers["X-Telegram-Bot-Api-Secret-Token"] = secret_token
+
+    latencies: List[float] = []
+    errors: int = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for number in range(total):
+        queue.put_nowait(number)
+
+    async def worker(session: aiohttp.ClientSession) -> None:
+        nonlocal errors
+        while not queue.empty():
+            number: int = queue.get_nowait()
+            update: Dict = build_update(
+                template=updates[number % len(updates)],
+                update_id=number + 1,
+                user_id=1_000_000 + number % users,
+            )
+            started: float = time.perf_counter()
+            try:
+                async with session.post(url, json=update, headers=headers) as resp:
+                    await resp.read()
+                    if resp.status != 200:
+                        errors += 1
+            except aiohttp.ClientError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started: float = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+    elapsed: float = time.perf_counter() - started
+
+    return {
+        "total": total,
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "updates_per_s": total / elapsed if elapsed else 0.0,
+        "latency": latency_summary(latencies),
+    }
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="http://127.0.0.1:8080/webhook")
+    parser.add_argument("--updates", type=Path, default=PATH_UPDATES)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--secret-token", default=None)
+    args: argparse.Namespace = parser.parse_args()
+
+    with open(args.updates, "r", encoding="utf-8") as file:
+        updates: List[Dict] = json.load(file)
+
+    result: Dict = asyncio.run(
+        post_updates(
+            url=args.url,
+            updates=updates,
+            total=args.requests,
+            concurrency=args.concurrency,
+            users=args.users,
+            secret_token=args.secret_token,
+        )
+    )
+    print(
+        f"Отправлено {result['total']} обновлений за {result['elapsed_s']:.2f} c, "
+        f"{result['updates_per_s']:.1f} обновлений/c, ошибок: {result['errors']}"
+    )
+    print(format_summary("latency", result["latency"]))
+
+
+if __name__ == "__main__":
+    main()
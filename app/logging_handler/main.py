@@ -1,56 +1,187 @@
+import atexit
 import logging
-from logging import FileHandler, Logger, Formatter, StreamHandler
+import queue
+from logging import Filter, Formatter, Handler, StreamHandler
+from logging.handlers import (
+    QueueHandler,
+    QueueListener,
+    RotatingFileHandler,
+    TimedRotatingFileHandler,
+)
 from pathlib import Path
 import sys
-from typing import Tuple
+from typing import Dict, Optional, Tuple
 
+from metrics.main import metrics, Counter, Gauge
 from settings.config import settings
 
 
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler, который не блокирует поток при переполненной очереди, а
+    отбрасывает запись и считает количество отброшенных записей."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped: int = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Кладет запись в очередь без ожидания."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+# Обработчик очереди и фоновый поток записи логов
+queue_handler: Optional[DroppingQueueHandler] = None
+queue_listener: Optional[QueueListener] = None
+
+
+def create_file_handler(
+    path: Path,
+    rotation: str,
+    max_bytes: int,
+    rotation_when: str,
+    backup_count: int,
+) -> Handler:
+    """Возвращает обработчик записи в файл с ротацией по размеру или по времени.
+
+    Args:
+        path (Path): Путь до файла лога
+        rotation (str): 'size' - ротация по размеру, 'time' - по времени
+        max_bytes (int): Размер файла для ротации по размеру
+        rotation_when (str): Интервал для ротации по времени
+        backup_count (int): Количество хранимых старых файлов
+    """
+    if rotation == "time":
+        return TimedRotatingFileHandler(
+            filename=str(path),
+            when=rotation_when,
+            backupCount=backup_count,
+            encoding="utf-8",
+        )
+    return RotatingFileHandler(
+        filename=str(path),
+        maxBytes=max_bytes,
+        backupCount=backup_count,
+        encoding="utf-8",
+    )
+
+
 def configure_logging(
     path_data_logging: Path,
     path_errors_logging: Path,
     format_file: str,
     date_format: str,
     level=logging.INFO,
+    queue_size: int = 10000,
+    rotation: str = "size",
+    max_bytes: int = 10 * 1024 * 1024,
+    rotation_when: str = "midnight",
+    backup_count: int = 5,
 ) -> Tuple[logging.Logger, logging.Logger]:
-    """Конфигурация базового логгера."""
+    """Конфигурация базового логгера.
+
+    Логгеры только кладут записи в ограниченную очередь, а запись в файлы и в
+    консоль выполняет фоновый поток QueueListener. Поэтому вызов логгера из
+    асинхронного обработчика не ждет записи на диск.
+    """
+    global queue_handler, queue_listener
 
     # Если папка для логгирования не была создана, то создаем ее
     path_data_logging.parent.mkdir(parents=True, exist_ok=True)
     path_errors_logging.parent.mkdir(parents=True, exist_ok=True)
 
-    file_handler: FileHandler = FileHandler(
-        filename=str(path_data_logging), encoding="utf-8"
-    )
-    error_handler: FileHandler = FileHandler(
-        filename=str(path_errors_logging), encoding="utf-8"
-    )
-    stream_handler: StreamHandler = StreamHandler(stream=sys.stdout)
+    root_logging: logging.Logger = logging.getLogger(name="main_logger")
+    error_logging: logging.Logger = logging.getLogger(name="error_logger")
 
-    fmt: Formatter = Formatter(fmt=format_file, datefmt=date_format)
-    for handler in [file_handler, error_handler, stream_handler]:
-        handler.setFormatter(fmt)
+    if queue_listener is None:
+        file_handler: Handler = create_file_handler(
+            path=path_data_logging,
+            rotation=rotation,
+            max_bytes=max_bytes,
+            rotation_when=rotation_when,
+            backup_count=backup_count,
+        )
+        error_handler: Handler = create_file_handler(
+            path=path_errors_logging,
+            rotation=rotation,
+            max_bytes=max_bytes,
+            rotation_when=rotation_when,
+            backup_count=backup_count,
+        )
+        stream_handler: StreamHandler = StreamHandler(stream=sys.stdout)
 
-    root_logging: logging.Logger = logging.getLogger(name="main_logger")
+        fmt: Formatter = Formatter(fmt=format_file, datefmt=date_format)
+        for handler in [file_handler, error_handler, stream_handler]:
+            handler.setFormatter(fmt)
+
+        # Записи каждого логгера попадают только в свой файл
+        file_handler.addFilter(Filter(name=root_logging.name))
+        error_handler.addFilter(Filter(name=error_logging.name))
+
+        queue_handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+        queue_listener = QueueListener(
+            queue_handler.queue,
+            file_handler,
+            error_handler,
+            stream_handler,
+            respect_handler_level=True,
+        )
+        queue_listener.start()
+        # Дописываем оставшиеся в очереди записи при выходе из программы
+        atexit.register(queue_listener.stop)
 
     if not root_logging.handlers:
-        root_logging.setLevel(level=logging.INFO)
-        root_logging.addHandler(file_handler)
-        root_logging.addHandler(stream_handler)
+        root_logging.setLevel(level=level)
+        root_logging.addHandler(queue_handler)
 
-    error_logging: logging.Logger = logging.getLogger(name="error_logger")
     if not error_logging.handlers:
         error_logging.setLevel(level=logging.ERROR)
-        error_logging.addHandler(error_handler)
-        error_logging.addHandler(stream_handler)
+        error_logging.addHandler(queue_handler)
 
     return root_logging, error_logging
 
 
+def get_logging_stats() -> Dict:
+    """Возвращает размер очереди логгирования и количество отброшенных записей."""
+
+    if queue_handler is None:
+        return {"queued": 0, "dropped": 0}
+    return {
+        "queued": queue_handler.queue.qsize(),
+        "dropped": queue_handler.dropped,
+    }
+
+
+logging_dropped_total: Counter = metrics.counter(
+    "logging_dropped_total",
+    "Количество записей логов, отброшенных из-за переполненной очереди",
+)
+logging_queue_size: Gauge = metrics.gauge(
+    "logging_queue_size", "Количество записей логов, ожидающих записи"
+)
+
+
+def collect_logging_stats() -> None:
+    """Переносит счетчики очереди логгирования в метрики."""
+
+    stats: Dict = get_logging_stats()
+    logging_dropped_total.set(stats["dropped"])
+    logging_queue_size.set(stats["queued"])
+
+
+metrics.add_collector(collect_logging_stats)
+
+
 rout_logging, error_logging = configure_logging(
     path_errors_logging=settings.logging.PATH_ERRORS_LOGGING,
     path_data_logging=settings.logging.PATH_DATA_LOGGING,
     format_file=settings.logging.FORMAT_FILE,
     date_format=settings.logging.DATE_FORMAT,
+    queue_size=settings.logging.QUEUE_SIZE,
+    rotation=settings.logging.ROTATION,
+    max_bytes=settings.logging.MAX_BYTES,
+    rotation_when=settings.logging.ROTATION_WHEN,
+    backup_count=settings.logging.BACKUP_COUNT,
 )
@@ -0,0 +1,232 @@
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import bisect
+
+from aiohttp import web
+
+from settings.config import settings, MetricsSettings
+
+
+def escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(labels: Dict[str, str]) -> str:
+    """Возвращает метки в формате Prometheus: {name="value",...}."""
+
+    if not labels:
+        return ""
+    pairs: str = ",".join(
+        f'{name}="{escape_label_value(str(value))}"' for name, value in labels.items()
+    )
+    return "{" + pairs + "}"
+
+
+class Metric:
+    """Метрика с метками. Значения хранятся по кортежу значений меток."""
+
+    TYPE: str = ""
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        """
+        Args:
+            name (str): Имя метрики
+            description (str): Описание для строки HELP
+            labelnames (Sequence[str], optional): Имена меток
+        """
+        self.name: str = name
+        self.description: str = description
+        self.labelnames: Tuple[str, ...] = tuple(labelnames)
+
+    def get_key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        """Возвращает значения меток в порядке labelnames."""
+
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"Метрика {self.name} ожидает метки {self.labelnames}, "
+                f"переданы {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        """Возвращает строки значений метрики."""
+
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines: List[str] = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.TYPE}",
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """Счетчик, который только растет."""
+
+    TYPE: str = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key: Tuple[str, ...] = self.get_key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self.values.get(self.get_key(labels), 0)
+
+    def set(self, value: float, **labels) -> None:
+        """Задает значение, посчитанное вне метрики, например в collector."""
+
+        self.values[self.get_key(labels)] = value
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{format_labels(dict(zip(self.labelnames, key)))} {value}"
+            for key, value in self.values.items()
+        ]
+
+
+class Gauge(Counter):
+    """Значение, которое может расти и уменьшаться."""
+
+    TYPE: str = "gauge"
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """Распределение значений по корзинам, например длительности обработки."""
+
+    TYPE: str = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        buckets: Optional[Sequence[float]] = None,
+    ):
+        """
+        Args:
+            buckets (Sequence[float], optional): Верхние границы корзин.
+                По умолчанию settings.metrics.BUCKETS
+        """
+        super().__init__(name, description, labelnames)
+        self.buckets: List[float] = sorted(buckets or settings.metrics.BUCKETS)
+        # Количество значений в каждой корзине (последняя - больше всех границ),
+        # сумма и количество значений
+        self.counts: Dict[Tuple[str, ...], List[int]] = {}
+        self.sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key: Tuple[str, ...] = self.get_key(labels)
+        if key not in self.counts:
+            self.counts[key] = [0] * (len(self.buckets) + 1)
+            self.sums[key] = 0.0
+        self.counts[key][bisect.bisect_left(self.buckets, value)] += 1
+        self.sums[key] += value
+
+    def get_count(self, **labels) -> int:
+        return sum(self.counts.get(self.get_key(labels), []))
+
+    def samples(self) -> List[str]:
+        lines: List[str] = []
+        for key, counts in self.counts.items():
+            labels: Dict[str, str] = dict(zip(self.labelnames, key))
+            total: int = 0
+            for bound, count in zip(self.buckets + [float("inf")], counts):
+                total += count
+                le: str = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(
+                    f"{self.name}_bucket{format_labels({**labels, 'le': le})} {total}"
+                )
+            lines.append(f"{self.name}_sum{format_labels(labels)} {self.sums[key]}")
+            lines.append(f"{self.name}_count{format_labels(labels)} {total}")
+        return lines
+
+
+class MetricsRegistry:
+    """Все метрики приложения. Повторная регистрация возвращает ту же метрику."""
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+        self.collectors: List[Callable[[], None]] = []
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Добавляет функцию, которая обновляет метрики перед каждой выдачей.
+
+        Нужна для значений, которые проще прочитать в момент запроса, чем
+        отслеживать при каждом изменении, например оставшихся квот.
+        """
+        self.collectors.append(collector)
+
+    def register(self, metric: Metric) -> Metric:
+        return self.metrics.setdefault(metric.name, metric)
+
+    def counter(
+        self, name: str, description: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        return self.register(Counter(name, description, labelnames))
+
+    def gauge(
+        self, name: str, description: str, labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        return self.register(Gauge(name, description, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        labelnames: Sequence[str] = (),
+        buckets: Optional[Sequence[float]] = None,
+    ) -> Histogram:
+        return self.register(Histogram(name, description, labelnames, buckets))
+
+    def render(self) -> str:
+        """Возвращает все метрики в текстовом формате Prometheus."""
+
+        for collector in self.collectors:
+            collector()
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+
+class MetricsServer:
+    """HTTP сервер, отдающий метрики для Prometheus."""
+
+    def __init__(self, registry: MetricsRegistry, config: MetricsSettings):
+        self.registry: MetricsRegistry = registry
+        self.config: MetricsSettings = config
+        self._runner: Optional[web.AppRunner] = None
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text=self.registry.render(),
+            content_type="text/plain",
+            headers={"X-Content-Type-Options": "nosniff"},
+        )
+
+    async def start(self) -> None:
+        """Запускает сервер, если метрики включены."""
+
+        if not self.config.ENABLED or self._runner is not None:
+            return
+        app: web.Application = web.Application()
+        app.router.add_get(self.config.PATH, self.handle_metrics)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(
+            self._runner, host=self.config.HOST, port=self.config.PORT
+        ).start()
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+metrics: MetricsRegistry = MetricsRegistry()
+metrics_server: MetricsServer = MetricsServer(registry=metrics, config=settings.metrics)
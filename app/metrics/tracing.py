@@ -0,0 +1,33 @@
+from contextvars import ContextVar
+from typing import Optional
+
+from logging_handler.main import rout_logging
+from settings.config import settings
+
+
+# Id обновления телеграм, которое сейчас обрабатывается. Задается middleware
+# обновлений и наследуется задачами, созданными обработчиком
+current_update_id: ContextVar[Optional[int]] = ContextVar(
+    "current_update_id", default=None
+)
+
+
+def log_span(name: str, duration: float, **attributes) -> None:
+    """Пишет в лог длительность участка обработки обновления.
+
+    По записям с одним update можно посчитать, сколько из ожидания пользователя
+    заняли запросы к сайтам, а сколько код бота.
+
+    Args:
+        name (str): Название участка, например 'handler' или 'upstream'
+        duration (float): Длительность в секундах
+        **attributes: Дополнительные поля записи
+    """
+    if not settings.metrics.TRACE_SPANS:
+        return
+
+    fields: str = " ".join(f"{key}={value}" for key, value in attributes.items())
+    rout_logging.info(
+        f"span update={current_update_id.get()} {name} "
+        f"duration_ms={duration * 1000:.1f} {fields}".rstrip()
+    )
@@ -0,0 +1,121 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+from contextvars import Token
+import time
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.types import TelegramObject, Update
+
+from metrics.main import metrics, Counter, Gauge, Histogram
+from metrics.tracing import current_update_id, log_span
+
+
+updates_total: Counter = metrics.counter(
+    "bot_updates_total", "Количество полученных обновлений", ["type"]
+)
+updates_unhandled_total: Counter = metrics.counter(
+    "bot_updates_unhandled_total",
+    "Количество обновлений, для которых не нашлось обработчика",
+    ["type"],
+)
+update_duration_seconds: Histogram = metrics.histogram(
+    "bot_update_duration_seconds",
+    "Время обработки обновления со всеми middleware",
+    ["type"],
+)
+updates_in_flight: Gauge = metrics.gauge(
+    "bot_updates_in_flight", "Количество обновлений в обработке"
+)
+handler_calls_total: Counter = metrics.counter(
+    "bot_handler_calls_total",
+    "Количество вызовов обработчиков по роутерам и состояниям FSM",
+    ["router", "handler", "state"],
+)
+handler_errors_total: Counter = metrics.counter(
+    "bot_handler_errors_total",
+    "Количество исключений в обработчиках",
+    ["router", "handler"],
+)
+handler_duration_seconds: Histogram = metrics.histogram(
+    "bot_handler_duration_seconds",
+    "Время работы обработчика",
+    ["router", "handler"],
+)
+handlers_in_flight: Gauge = metrics.gauge(
+    "bot_handlers_in_flight", "Количество выполняющихся обработчиков", ["router"]
+)
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Outer middleware обновлений: считает обновления и время их обработки."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        update_type: str = event.event_type
+        updates_total.inc(type=update_type)
+        updates_in_flight.inc()
+        # Запросы к сайтам из обработчиков попадут в лог с id этого обновления
+        token: Token = current_update_id.set(event.update_id)
+        started: float = time.perf_counter()
+        try:
+            result: Any = await handler(event, data)
+        finally:
+            duration: float = time.perf_counter() - started
+            updates_in_flight.dec()
+            update_duration_seconds.observe(duration, type=update_type)
+            log_span("update", duration, type=update_type)
+            current_update_id.reset(token)
+
+        if result is UNHANDLED:
+            updates_unhandled_total.inc(type=update_type)
+        return result
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """Inner middleware событий: время работы каждого обработчика по роутерам."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        handler_object: Optional[HandlerObject] = data.get("handler")
+        router: str = data["event_router"].name if "event_router" in data else ""
+        handler_name: str = (
+            handler_object.callback.__name__ if handler_object else "<unknown>"
+        )
+        state: str = data.get("raw_state") or "none"
+
+        handler_calls_total.inc(router=router, handler=handler_name, state=state)
+        handlers_in_flight.inc(router=router)
+        started: float = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            handler_errors_total.inc(router=router, handler=handler_name)
+            raise
+        finally:
+            duration: float = time.perf_counter() - started
+            handlers_in_flight.dec(router=router)
+            handler_duration_seconds.observe(
+                duration, router=router, handler=handler_name
+            )
+            log_span("handler", duration, router=router, handler=handler_name)
+
+
+def setup_metrics_middlewares(dispatcher: Dispatcher) -> None:
+    """Подключает middleware метрик к диспетчеру.
+
+    Inner middleware диспетчера вызываются для обработчиков всех вложенных
+    роутеров.
+    """
+    dispatcher.update.outer_middleware(UpdateMetricsMiddleware())
+    handler_middleware: HandlerMetricsMiddleware = HandlerMetricsMiddleware()
+    dispatcher.message.middleware(handler_middleware)
+    dispatcher.callback_query.middleware(handler_middleware)
@@ -1,10 +1,12 @@
-from typing import List, Dict
+from typing import Any, Iterator, List, Dict, Tuple
 from pathlib import Path
+from urllib.parse import urlsplit, SplitResult
+import re
 from typing import Optional
 
 from pydantic_settings import SettingsConfigDict, BaseSettings
 from aiogram.types import BotCommand
-from pydantic import BaseModel
+from pydantic import BaseModel, model_validator
 
 from settings import path_settings
 
@@ -18,12 +20,23 @@ class YoutubeAPI(BaseModel):
     YoutubeApiKey: Optional[str] = None
     VIDEO_URL: str = "https://www.youtube.com/watch?v={}"
     CHANNEL_URL: str = "https://www.youtube.com/channel/{}"
+    # Способ поиска: 'googleapiclient' - клиент google в пуле потоков,
+    # 'aiohttp' - прямые запросы к SEARCH_URL через общую сессию
+    BACKEND: str = "googleapiclient"
+    SEARCH_URL: str = "https://www.googleapis.com/youtube/v3/search"
+    WORKERS: int = 4  # Сколько запросов к API выполняется одновременно
+    TIMEOUT: int = 10  # Таймаут запроса к API в секундах
+    CACHE_TTL: int = 3600  # Время жизни результатов поиска в кэше в секундах
+    CACHE_MAXSIZE: int = 512  # Максимальное количество результатов поиска в кэше
 
 
 class FindVideo(BaseModel):
     """Источники поиска видео."""
 
     youtube: YoutubeAPI = YoutubeAPI()
+    RESULT_TTL: int = 3600  # Сколько секунд можно листать результаты поиска (в памяти процесса)
+    RESULT_MAX_SEARCHES: int = 10000  # Максимальное количество хранимых поисков
+    RESULT_MAX_ITEMS: int = 50  # Максимальное количество результатов в одном поиске
 
 
 # Модели для получения прокси
@@ -84,6 +97,10 @@ class KinopoiskRecommenderSystem(BaseModel):
         "accept": "application/json",
         "X-API-KEY": None,
     }
+    POSTER_CONCURRENCY: int = 5  # Количество одновременных запросов при поиске постеров
+    CANDIDATES_LIMIT: int = 250  # Сколько фильмов загружать для рекомендаций за один запрос
+    CANDIDATES_TTL: int = 6 * 60 * 60  # Время жизни загруженных фильмов в секундах
+    CANDIDATES_MAXSIZE: int = 256  # Сколько наборов (жанры, тип, рейтинг) хранить в кэше
 
 
 class RecommenderSystem(BaseModel):
@@ -125,6 +142,158 @@ class LoggingSettings(BaseModel):
     DATE_FORMAT: str = "%Y-%m-%d %H:%M:%S"
     ERROR_WEB_RESPONSE_MESSAGE: str = "[{method}] {status} {url} -> {error_message}"  # Формат сообщения для ошибки в запросах.
     # method, status, url, error_message
+    QUEUE_SIZE: int = 10000  # Максимальное количество записей в очереди логгирования
+    ROTATION: str = "size"  # Ротация файлов логов: 'size' - по размеру, 'time' - по времени
+    MAX_BYTES: int = 10 * 1024 * 1024  # Размер файла лога для ротации по размеру
+    ROTATION_WHEN: str = "midnight"  # Интервал для ротации по времени (как в TimedRotatingFileHandler)
+    BACKUP_COUNT: int = 5  # Количество хранимых старых файлов лога
+
+
+# Модель для кэширования прогноза погоды
+class WeatherCache(BaseModel):
+    """Модель для кэширования данных сайта https://openweathermap.org."""
+
+    GEOCODING_TTL: int = 24 * 60 * 60  # Время жизни координат города в секундах
+    GEOCODING_NEGATIVE_TTL: int = 10 * 60  # Время жизни записи о несуществующем городе в секундах
+    GEOCODING_MAXSIZE: int = 1000  # Максимальное количество городов в кэше
+    CURRENT_TTL: int = 10 * 60  # Время жизни текущего прогноза погоды в секундах
+    FORECAST_TTL: int = 30 * 60  # Время жизни прогноза погоды на 5 дней в секундах
+    AIR_POLLUTION_TTL: int = 30 * 60  # Время жизни данных о загрязнении воздуха в секундах
+    RESPONSE_MAXSIZE: int = 500  # Максимальное количество ответов в кэше каждого вида
+    COORDINATES_PRECISION: int = 2  # Количество знаков после запятой для координат в ключе кэша
+
+
+# Модель для хранилища состояний FSM
+class FSMStorageSettings(BaseModel):
+    """Модель для хранилища состояний FSM."""
+
+    BACKEND: str = "memory"  # Хранилище: 'memory', 'redis' или 'sqlite'
+    REDIS_URL: str = "redis://localhost:6379/0"  # Для 'redis'. Вытеснение задается maxmemory-policy сервера
+    SQLITE_PATH: Path = (
+        path_settings.APP_DIR / "fsm_storage" / "fsm.sqlite3"
+    )  # Путь до файла базы для 'sqlite'
+    TTL: Optional[int] = 24 * 60 * 60  # Время жизни брошенного диалога в секундах
+    MAX_KEYS: int = 100000  # Максимальное количество диалогов для 'memory' и 'sqlite'
+
+
+# Модель для работы бота через webhook
+class WebhookSettings(BaseModel):
+    """Модель для работы бота через webhook."""
+
+    BASE_URL: Optional[str] = None  # Публичный адрес бота (https://example.com). Если не указан, webhook в телеграм не устанавливается
+    HOST: str = "0.0.0.0"  # Адрес на котором слушает веб сервер
+    PORT: int = 8080  # Порт веб сервера
+    PATH: str = "/webhook"  # Путь по которому телеграм отправляет обновления
+    SECRET_TOKEN: Optional[str] = None  # Секретный токен из заголовка X-Telegram-Bot-Api-Secret-Token
+    HANDLE_IN_BACKGROUND: bool = True  # Отвечать телеграм сразу, а обновление обрабатывать после ответа
+
+
+# Модель для метрик
+class MetricsSettings(BaseModel):
+    """Модель для метрик бота в формате Prometheus."""
+
+    ENABLED: bool = True  # Собирать метрики и отдавать их по HTTP
+    HOST: str = "127.0.0.1"  # Адрес на котором отдаются метрики
+    PORT: int = 9100  # Порт сервера метрик
+    PATH: str = "/metrics"  # Путь по которому отдаются метрики
+    BUCKETS: List[float] = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]  # Границы корзин гистограмм в секундах
+    TRACE_SPANS: bool = False  # Писать в лог длительности обработки обновлений, обработчиков и запросов к сайтам с id обновления
+
+
+# Модель для нагрузочного тестирования без сети
+class FakeUpstreamSettings(BaseModel):
+    """Модель для локального сервера load_testing/fake_upstream.py."""
+
+    HOST: str = "127.0.0.1"  # Адрес на котором слушает сервер
+    PORT: int = 8090  # Порт сервера
+    LATENCY: float = 0.05  # Задержка перед каждым ответом в секундах
+    LATENCY_JITTER: float = 0.0  # Случайная добавка к задержке от 0 до LATENCY_JITTER секунд
+    ERROR_RATE: float = 0.0  # Доля ответов 503 от 0 до 1
+    MAX_RPS: Optional[float] = None  # Сколько запросов в секунду обслуживать. Остальным 429 с Retry-After
+    BANDWIDTH: Optional[int] = None  # Скорость отдачи тела ответа в байтах в секунду. None - без ограничения
+    IMAGE_SIZE: Optional[int] = None  # Размер отдаваемых картинок в байтах. None - static/img/none.png
+
+    @property
+    def URL(self) -> str:
+        return f"http://{self.HOST}:{self.PORT}"
+
+
+class FakeTelegramSettings(BaseModel):
+    """Модель для локального Bot API сервера load_testing/fake_telegram.py."""
+
+    HOST: str = "127.0.0.1"  # Адрес на котором слушает сервер
+    PORT: int = 8081  # Порт сервера
+    LATENCY: float = 0.0  # Задержка перед каждым ответом Bot API в секундах
+
+    @property
+    def URL(self) -> str:
+        return f"http://{self.HOST}:{self.PORT}"
+
+
+# Модель для общего HTTP клиента
+class HttpClientSettings(BaseModel):
+    """Модель для общего HTTP клиента приложения."""
+
+    LIMIT: int = 100  # Общее количество одновременных соединений
+    LIMIT_PER_HOST: int = 20  # Количество одновременных соединений к одному сайту
+    KEEPALIVE_TIMEOUT: float = 30  # Сколько секунд держать открытым неактивное соединение
+    TTL_DNS_CACHE: int = 300  # Время жизни DNS кэша в секундах
+    TIMEOUT: float = 20  # Общий таймаут запроса вместе с повторами в секундах
+    CONNECT_TIMEOUT: float = 10  # Таймаут на установку соединения в секундах
+    RETRIES: int = 2  # Сколько раз повторять GET запрос при сетевой ошибке или ответе RETRY_STATUSES
+    RETRY_STATUSES: List[int] = [429, 500, 502, 503, 504]  # Ответы сайта, после которых запрос повторяется
+    RETRY_BACKOFF_BASE: float = 0.5  # Начальная задержка перед повтором в секундах
+    RETRY_BACKOFF_MAX: float = 8  # Максимальная задержка перед повтором в секундах
+    RETRY_AFTER_MAX: float = 30  # Сколько максимум ждать по заголовку Retry-After в секундах
+    CIRCUIT_FAILURE_THRESHOLD: int = 5  # Сколько ошибок сайта подряд считать его недоступным
+    CIRCUIT_RECOVERY_TIMEOUT: float = 30  # Через сколько секунд проверить недоступный сайт снова
+    COALESCE_REQUESTS: bool = True  # Выполнять одинаковые одновременные GET запросы один раз
+
+
+class QuotaServiceSettings(BaseModel):
+    """Ограничение запросов к одному сервису."""
+
+    HOSTS: List[str]  # Адреса сервиса
+    RATE: float  # Сколько запросов в секунду разрешено в среднем
+    BURST: int  # Сколько запросов можно сделать подряд без ожидания
+    DAILY_QUOTA: Optional[int] = None  # Сколько запросов разрешено за сутки. None - без ограничения
+    MAX_WAIT: float = 30  # Сколько секунд запрос может ждать своей очереди
+
+
+class QuotaSettings(BaseModel):
+    """Ограничения запросов к внешним сервисам."""
+
+    ENABLED: bool = True
+    SERVICES: Dict[str, QuotaServiceSettings] = {
+        "openweathermap": QuotaServiceSettings(
+            HOSTS=["api.openweathermap.org", "tile.openweathermap.org"],
+            RATE=1,
+            BURST=10,
+        ),
+        "kinopoisk": QuotaServiceSettings(
+            HOSTS=["api.kinopoisk.dev"],
+            RATE=5,
+            BURST=10,
+            DAILY_QUOTA=200,
+        ),
+        "ipapi": QuotaServiceSettings(
+            HOSTS=["api.ipapi.com"],
+            RATE=1,
+            BURST=5,
+        ),
+        "webshare": QuotaServiceSettings(
+            HOSTS=["proxy.webshare.io"],
+            RATE=2,
+            BURST=5,
+        ),
+        # Поиск стоит 100 единиц из 10000 суточной квоты YouTube Data API
+        "youtube": QuotaServiceSettings(
+            HOSTS=["www.googleapis.com", "youtube.googleapis.com"],
+            RATE=5,
+            BURST=10,
+            DAILY_QUOTA=100,
+        ),
+    }
 
 
 # Модель для поиска картинок
@@ -132,6 +301,22 @@ class FindImage(BaseModel):
     """Модель для поиска картинок"""
 
     PATH_FIND_IMAGE: Path = path_settings.APP_DIR / "static" / "img" / "find_image"
+    URL_CHECK_CONNECTION: str = "https://www.google.com/"  # url для проверки доступности google перед поиском
+    DOWNLOAD_CONCURRENCY: int = 8  # Сколько изображений скачивается одновременно
+    MAX_IMAGE_SIZE: int = 10 * 1024 * 1024  # Максимальный размер изображения в байтах
+    DOWNLOAD_CHUNK_SIZE: int = 64 * 1024  # Размер блока при записи на диск в байтах
+    CRAWLER_WORKERS: int = 2  # Сколько поисков картинок выполняется одновременно
+    CRAWLER_MAX_USER_QUEUE: int = 1  # Сколько поисков пользователя может ждать в очереди
+    CRAWLER_MAX_QUEUE: int = 50  # Сколько поисков всех пользователей может ждать в очереди
+    PROGRESS_EDIT_INTERVAL: float = 1.0  # Как часто обновлять сообщение о загрузке в секундах
+    CACHE_ENABLED: bool = True  # Кэшировать найденные изображения и архивы на диске
+    CACHE_PATH: Path = path_settings.APP_DIR / "static" / "img" / "image_cache"
+    CACHE_MAX_BYTES: int = 500 * 1024 * 1024  # Максимальный размер кэша в байтах
+    ARCHIVE_WORKERS: int = 2  # Сколько архивов упаковывается одновременно
+    # Максимальный размер части архива. Телеграм принимает документы до 50 МБ
+    ARCHIVE_PART_SIZE: int = 49 * 1024 * 1024
+    # Уже сжатые форматы кладутся в архив без повторного сжатия
+    STORED_EXTENSIONS: List[str] = [".jpg", ".jpeg", ".png", ".gif", ".webp", ".zip"]
 
 
 class Settings(BaseSettings):
@@ -145,6 +330,9 @@ class Settings(BaseSettings):
     BASE_DIR: Path = Path(__file__).resolve().parent
 
     TOKEN: str
+    PROFILE: str = "default"  # 'fake_upstream' - запросы ко всем внешним API идут на load_testing/fake_upstream.py
+    TELEGRAM_API_SERVER: Optional[str] = None  # Адрес Bot API сервера, например http://127.0.0.1:8081 для load_testing/fake_telegram.py. None - api.telegram.org
+    RUN_MODE: str = "polling"  # Режим получения обновлений: 'polling' или 'webhook'
     BOT_COMMAND: List[BotCommand] = [
         BotCommand(
             command="/start",
@@ -164,6 +352,8 @@ class Settings(BaseSettings):
         / "openweathermap"
         / "weather_translations.json"
     )  # Путь для файла с переводами описаний прогноза погоды на русский язык
+    WEATHER_TRANSLATION_HOT_RELOAD: bool = False  # Перечитывать файл с переводами при его изменении
+    WEATHER_TRANSLATION_RELOAD_INTERVAL: int = 60  # Как часто проверять файл с переводами в секундах
     PATH_TO_WEATHER_MAP: Path = (
         path_settings.APP_DIR / "static" / "files" / "openweathermap"
     )  # Путь до папки для сохранения карты прогноза погоды
@@ -307,6 +497,9 @@ class Settings(BaseSettings):
     VIDEO_GENERATE_VIDEO_PATH: str = (
         "static\\video\\generate_video\\"  # Путь для сохранения сгенерируемого видео
     )
+    PATH_FILE_ID_REGISTRY: Path = (
+        path_settings.APP_DIR / "static" / "files" / "telegram" / "file_ids.json"
+    )  # Путь до файла с file_id уже загруженных в телеграм статических файлов
 
     find_image: FindImage = FindImage()
     find_video: FindVideo = FindVideo()
@@ -315,6 +508,65 @@ class Settings(BaseSettings):
     recommender_system: RecommenderSystem = RecommenderSystem()
     password_generation: PasswordGeneration = PasswordGeneration()
     logging: LoggingSettings = LoggingSettings()
+    http_client: HttpClientSettings = HttpClientSettings()
+    quota: QuotaSettings = QuotaSettings()
+    weather_cache: WeatherCache = WeatherCache()
+    fsm_storage: FSMStorageSettings = FSMStorageSettings()
+    webhook: WebhookSettings = WebhookSettings()
+    metrics: MetricsSettings = MetricsSettings()
+    fake_upstream: FakeUpstreamSettings = FakeUpstreamSettings()
+    fake_telegram: FakeTelegramSettings = FakeTelegramSettings()
+
+    @model_validator(mode="after")
+    def use_fake_upstream(self) -> "Settings":
+        """Для профиля fake_upstream направляет URL внешних API на локальный сервер.
+
+        https://api.kinopoisk.dev/v1.4/movie превращается в
+        http://127.0.0.1:8090/api.kinopoisk.dev/v1.4/movie, сервер отвечает по
+        адресу сайта из пути. Клиент google не использует SEARCH_URL, поэтому
+        поиск видео переключается на запросы через aiohttp.
+        """
+        if self.PROFILE == "fake_upstream":
+            self.find_video.youtube.BACKEND = "aiohttp"
+            for model, name in iter_upstream_urls(self):
+                url: str = getattr(model, name)
+                setattr(
+                    model,
+                    name,
+                    re.sub(r"^https?://", f"{self.fake_upstream.URL}/", url),
+                )
+        return self
+
+    def get_upstream_host(self, url: str) -> str:
+        """Возвращает адрес сайта из URL.
+
+        Для профиля fake_upstream это адрес настоящего сайта из первой части
+        пути, а не адрес локального сервера, поэтому квоты, предохранители и
+        метрики разделяются по сервисам так же, как без него.
+        """
+        parts: SplitResult = urlsplit(url)
+        if (
+            self.PROFILE == "fake_upstream"
+            and f"{parts.scheme}://{parts.netloc}" == self.fake_upstream.URL
+        ):
+            return parts.path.lstrip("/").split("/", 1)[0].lower()
+        return parts.hostname or ""
+
+
+def iter_upstream_urls(model: BaseModel) -> Iterator[Tuple[BaseModel, str]]:
+    """Возвращает модели настроек и имена полей с URL внешних API.
+
+    Это поля URL_* (и ULR_*) и SEARCH_URL. Ссылки для пользователя, например
+    VIDEO_URL, не меняются.
+    """
+    for name in type(model).model_fields:
+        value: Any = getattr(model, name)
+        if isinstance(value, BaseModel):
+            yield from iter_upstream_urls(value)
+        elif isinstance(value, str) and (
+            name.startswith(("URL_", "ULR_")) or name == "SEARCH_URL"
+        ):
+            yield model, name
 
 
 settings = Settings()
@@ -0,0 +1,166 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import time
+
+
+# Признак отсутствия записи в кэше, чтобы можно было кэшировать None
+_MISSING: object = object()
+
+
+class TTLCache:
+    """Кэш в памяти с временем жизни записей и вытеснением давно не
+    использованных записей (LRU) при превышении размера.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+    ):
+        """
+        Args:
+            maxsize (int): Максимальное количество записей в кэше
+            ttl (float): Время жизни записи по умолчанию в секундах
+        """
+        self.maxsize: int = maxsize
+        self.ttl: float = ttl
+        self.hits: int = 0
+        self.misses: int = 0
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Возвращает значение по ключу или default если записи нет или ее время
+        жизни истекло."""
+
+        item: Optional[Tuple[float, Any]] = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        # Помечаем запись как недавно использованную
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Сохраняет значение по ключу.
+
+        Args:
+            key (Hashable): Ключ записи
+            value (Any): Значение записи
+            ttl (float, optional): Время жизни записи в секундах. По умолчанию self.ttl
+        """
+
+        expires_at: float = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+
+        # Вытесняем давно не использованные записи
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """Удаляет запись по ключу если она есть."""
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Очищает кэш."""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        """Возвращает счетчики попаданий и промахов кэша."""
+
+        total: int = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._data),
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+class CoalescingTTLCache(TTLCache):
+    """TTLCache, который объединяет одновременные запросы одного ключа.
+
+    Пока значение для ключа загружается, остальные запросы этого ключа не
+    запускают новую загрузку, а ждут результат уже идущей.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+    ):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.coalesced: int = 0
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    async def get_or_fetch(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+        should_cache: Callable[[Any], bool] = lambda value: True,
+        ttl_for: Optional[Callable[[Any], Optional[float]]] = None,
+    ) -> Any:
+        """Возвращает значение из кэша, а если его нет - загружает через fetch.
+
+        Args:
+            key (Hashable): Ключ записи
+            fetch (Callable): Функция без аргументов, возвращающая корутину загрузки
+            should_cache (Callable, optional): Проверка, нужно ли сохранять
+                загруженное значение в кэш (например, не кэшировать ошибки)
+            ttl_for (Callable, optional): Возвращает время жизни для загруженного
+                значения. None - время жизни кэша по умолчанию
+
+        Returns:
+            Any: Значение из кэша или результат fetch
+        """
+
+        value: Any = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        task: Optional[asyncio.Task] = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._fetch_and_store(key, fetch, should_cache, ttl_for)
+            )
+            self._in_flight[key] = task
+        else:
+            self.coalesced += 1
+
+        # shield - чтобы отмена одного ожидающего не отменяла загрузку для остальных
+        return await asyncio.shield(task)
+
+    async def _fetch_and_store(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+        should_cache: Callable[[Any], bool],
+        ttl_for: Optional[Callable[[Any], Optional[float]]],
+    ) -> Any:
+        """Загружает значение и сохраняет его в кэш."""
+        try:
+            value: Any = await fetch()
+            if should_cache(value):
+                self.set(key, value, ttl=ttl_for(value) if ttl_for else None)
+            return value
+        finally:
+            self._in_flight.pop(key, None)
+
+    def stats(self) -> Dict:
+        """Возвращает счетчики кэша и количество объединенных запросов."""
+
+        data: Dict = super().stats()
+        data["coalesced"] = self.coalesced
+        return data
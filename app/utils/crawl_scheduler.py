@@ -0,0 +1,227 @@
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Set
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import asyncio
+import traceback
+
+from logging_handler.main import error_logging
+from settings.config import settings
+
+
+class CrawlQueueFullError(Exception):
+    """Очередь краулера переполнена, запрос не принят."""
+
+
+@dataclass(eq=False)
+class CrawlJob:
+    """Задача краулера в очереди пользователя."""
+
+    user_id: Hashable
+    func: Callable[[], Any]
+    future: asyncio.Future
+    on_position: Optional[Callable[[int], Awaitable[None]]] = None
+    position: int = 0  # Последняя сообщенная позиция в очереди, 0 - не в очереди
+
+
+class CrawlScheduler:
+    """Общий для процесса планировщик задач краулера.
+
+    Задачи выполняются в пуле из фиксированного числа потоков. Очередь у каждого
+    пользователя своя, пользователи обслуживаются по кругу, поэтому один
+    пользователь с несколькими запросами не задерживает остальных.
+    """
+
+    def __init__(self, workers: int, max_user_queue: int, max_queue: int):
+        """
+        Args:
+            workers (int): Количество одновременно работающих краулеров
+            max_user_queue (int): Сколько задач пользователя может ждать в очереди
+            max_queue (int): Сколько задач всех пользователей может ждать в очереди
+        """
+        self.workers: int = workers
+        self.max_user_queue: int = max_user_queue
+        self.max_queue: int = max_queue
+        self.running: int = 0
+        self._queues: "OrderedDict[Hashable, Deque[CrawlJob]]" = OrderedDict()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._closed: bool = False
+
+    @property
+    def queued(self) -> int:
+        """Количество задач, ожидающих в очереди."""
+        return sum(len(jobs) for jobs in self._queues.values())
+
+    async def submit(
+        self,
+        user_id: Hashable,
+        func: Callable[[], Any],
+        on_position: Optional[Callable[[int], Awaitable[None]]] = None,
+    ) -> Any:
+        """Ставит задачу в очередь пользователя и возвращает ее результат.
+
+        Args:
+            user_id (Hashable): Id пользователя
+            func (Callable): Блокирующая функция, выполняемая в потоке краулера
+            on_position (Callable, optional): Корутина, получающая позицию задачи в
+                общей очереди при каждом ее изменении и 0 когда задача запущена
+
+        Raises:
+            CrawlQueueFullError: Если очередь пользователя или общая очередь заполнены
+        """
+        if self._closed:
+            raise RuntimeError("Планировщик краулера остановлен")
+
+        jobs: Deque[CrawlJob] = self._queues.get(user_id, deque())
+        if len(jobs) >= self.max_user_queue:
+            raise CrawlQueueFullError(
+                "У вас уже есть запросы в очереди. Дождитесь их выполнения"
+            )
+        if self.queued >= self.max_queue:
+            raise CrawlQueueFullError("Сервер перегружен. Попробуйте позже")
+
+        job: CrawlJob = CrawlJob(
+            user_id=user_id,
+            func=func,
+            future=asyncio.get_running_loop().create_future(),
+            on_position=on_position,
+        )
+        jobs.append(job)
+        self._queues.setdefault(user_id, jobs)
+        self._dispatch()
+
+        try:
+            return await job.future
+        except asyncio.CancelledError:
+            # Пользователь больше не ждет - убираем задачу, если она не запущена
+            self._remove(job)
+            raise
+
+    def _remove(self, job: CrawlJob) -> None:
+        """Удаляет задачу из очереди пользователя."""
+
+        jobs: Optional[Deque[CrawlJob]] = self._queues.get(job.user_id)
+        if jobs is None or job not in jobs:
+            return
+        jobs.remove(job)
+        if not jobs:
+            del self._queues[job.user_id]
+        self._report_positions()
+
+    def _dispatch(self) -> None:
+        """Запускает задачи, пока есть свободные потоки, выбирая пользователей по
+        кругу."""
+
+        while self.running < self.workers and self._queues:
+            user_id, jobs = self._queues.popitem(last=False)
+            job: CrawlJob = jobs.popleft()
+            # Пользователь с оставшимися задачами встает в конец круга
+            if jobs:
+                self._queues[user_id] = jobs
+
+            self.running += 1
+            self._spawn(self._run(job))
+        self._report_positions()
+
+    async def _run(self, job: CrawlJob) -> None:
+        """Выполняет задачу в пуле потоков и передает результат ожидающему."""
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="crawler",
+            )
+        try:
+            if job.position:
+                self._notify(job, 0)
+            result: Any = await asyncio.get_running_loop().run_in_executor(
+                self._executor, job.func
+            )
+            if not job.future.done():
+                job.future.set_result(result)
+        except asyncio.CancelledError:
+            job.future.cancel()
+            raise
+        except Exception as error:
+            if not job.future.done():
+                job.future.set_exception(error)
+        finally:
+            self.running -= 1
+            if not self._closed:
+                self._dispatch()
+
+    def _report_positions(self) -> None:
+        """Сообщает ожидающим задачам их новые позиции в очереди."""
+
+        queues: List[List[CrawlJob]] = [list(jobs) for jobs in self._queues.values()]
+        depth: int = max((len(jobs) for jobs in queues), default=0)
+        position: int = 0
+        # Позиция повторяет порядок обслуживания по кругу
+        for round_number in range(depth):
+            for jobs in queues:
+                if round_number >= len(jobs):
+                    continue
+                position += 1
+                job: CrawlJob = jobs[round_number]
+                if job.position != position:
+                    job.position = position
+                    self._notify(job, position)
+
+    def _notify(self, job: CrawlJob, position: int) -> None:
+        """Вызывает обработчик позиции задачи, не дожидаясь его завершения."""
+
+        if job.on_position is not None:
+            self._spawn(self._call_on_position(job.on_position, position))
+
+    async def _call_on_position(
+        self,
+        on_position: Callable[[int], Awaitable[None]],
+        position: int,
+    ) -> None:
+        try:
+            await on_position(position)
+        except Exception:
+            error_logging.error(traceback.format_exc())
+
+    def _spawn(self, coroutine: Awaitable) -> None:
+        """Создает фоновую задачу и хранит ссылку на нее до завершения."""
+
+        task: asyncio.Task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> Dict[str, int]:
+        """Возвращает количество работающих и ожидающих задач."""
+
+        return {
+            "running": self.running,
+            "queued": self.queued,
+            "users": len(self._queues),
+        }
+
+    async def shutdown(self) -> None:
+        """Отменяет ожидающие задачи и останавливает пул потоков.
+
+        Уже запущенные краулеры прервать нельзя, их потоки завершатся сами.
+        """
+        self._closed = True
+        for jobs in self._queues.values():
+            for job in jobs:
+                job.future.cancel()
+        self._queues.clear()
+
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+crawl_scheduler: CrawlScheduler = CrawlScheduler(
+    workers=settings.find_image.CRAWLER_WORKERS,
+    max_user_queue=settings.find_image.CRAWLER_MAX_USER_QUEUE,
+    max_queue=settings.find_image.CRAWLER_MAX_QUEUE,
+)
@@ -0,0 +1,158 @@
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from pathlib import Path
+import asyncio
+import hashlib
+import json
+import os
+import traceback
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, Message
+
+from logging_handler.main import error_logging
+from settings.config import settings
+
+
+class FileIdRegistry:
+    """Хранит file_id статических файлов, уже загруженных в телеграм.
+
+    Ключ записи - id бота, путь до файла и хэш его содержимого, поэтому
+    измененный файл загружается заново. После первой отправки файла телеграм
+    возвращает file_id, и следующие отправки передают только его без повторной
+    загрузки байтов. Записи сохраняются в json файл и переживают перезапуск.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path (Path): Путь до json файла с file_id
+        """
+        self.path: Path = Path(path)
+        self._file_ids: Optional[Dict[str, str]] = None
+        # Хэши файлов по (путь, размер, время изменения), чтобы не читать файл
+        # при каждой отправке
+        self._hashes: Dict[Tuple[str, int, int], str] = {}
+        self._lock: asyncio.Lock = asyncio.Lock()
+
+    def _load(self) -> Dict[str, str]:
+        if self._file_ids is None:
+            self._file_ids = {}
+            if self.path.exists():
+                try:
+                    with open(self.path, "r", encoding="utf-8") as file:
+                        self._file_ids = json.load(file)
+                except Exception:
+                    error_logging.error(traceback.format_exc())
+        return self._file_ids
+
+    def _save(self, file_ids: Dict[str, str]) -> None:
+        """Атомарно записывает file_id на диск."""
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        path_tmp: Path = self.path.with_suffix(".tmp")
+        with open(path_tmp, "w", encoding="utf-8") as file:
+            json.dump(file_ids, file, ensure_ascii=False, indent=4)
+        os.replace(path_tmp, self.path)
+
+    def _get_hash(self, path: Path) -> str:
+        stat: os.stat_result = path.stat()
+        hash_key: Tuple[str, int, int] = (str(path), stat.st_size, stat.st_mtime_ns)
+        if hash_key not in self._hashes:
+            with open(path, "rb") as file:
+                self._hashes[hash_key] = hashlib.sha256(file.read()).hexdigest()
+        return self._hashes[hash_key]
+
+    async def get_key(self, bot_id: int, path: Path) -> str:
+        """Возвращает ключ записи для файла.
+
+        Args:
+            bot_id (int): Id бота. file_id действительны только для своего бота
+            path (Path): Путь до файла
+        """
+        path = Path(path).resolve()
+        file_hash: str = await asyncio.to_thread(self._get_hash, path)
+        return f"{bot_id}:{path}:{file_hash}"
+
+    @staticmethod
+    def get_file_id(message: Message, media_field: str) -> Optional[str]:
+        """Возвращает file_id отправленного файла из ответа телеграм."""
+
+        media: Any = getattr(message, media_field, None)
+        # Для фото телеграм возвращает список размеров, берем самый большой
+        if isinstance(media, list):
+            media = media[-1] if media else None
+        return getattr(media, "file_id", None)
+
+    async def send(
+        self,
+        send_method: Callable[..., Awaitable[Message]],
+        media_field: str,
+        path: Path,
+        bot_id: int,
+        **kwargs,
+    ) -> Message:
+        """Отправляет статический файл, используя сохраненный file_id если он есть.
+
+        Args:
+            send_method (Callable): Метод бота, например bot.send_photo
+            media_field (str): Имя аргумента с файлом, например 'photo' или 'document'
+            path (Path): Путь до файла
+            bot_id (int): Id бота
+            **kwargs: Остальные аргументы метода бота
+
+        Returns:
+            Message: Отправленное сообщение
+        """
+        key: str = await self.get_key(bot_id=bot_id, path=path)
+        file_id: Optional[str] = self._load().get(key)
+
+        if file_id is not None:
+            try:
+                return await send_method(**{media_field: file_id}, **kwargs)
+            except TelegramBadRequest:
+                # file_id больше недействителен - загружаем файл заново
+                error_logging.error(traceback.format_exc())
+
+        message: Message = await send_method(
+            **{media_field: FSInputFile(path=str(path))}, **kwargs
+        )
+
+        new_file_id: Optional[str] = self.get_file_id(message, media_field)
+        if new_file_id is not None and new_file_id != file_id:
+            async with self._lock:
+                file_ids: Dict[str, str] = self._load()
+                file_ids[key] = new_file_id
+                await asyncio.to_thread(self._save, dict(file_ids))
+        return message
+
+    async def send_photo(
+        self, bot: Bot, chat_id: int, path: Path, **kwargs
+    ) -> Message:
+        """Отправляет статическую картинку через bot.send_photo."""
+
+        return await self.send(
+            send_method=bot.send_photo,
+            media_field="photo",
+            path=path,
+            bot_id=bot.id,
+            chat_id=chat_id,
+            **kwargs,
+        )
+
+    async def send_document(
+        self, bot: Bot, chat_id: int, path: Path, **kwargs
+    ) -> Message:
+        """Отправляет статический файл через bot.send_document."""
+
+        return await self.send(
+            send_method=bot.send_document,
+            media_field="document",
+            path=path,
+            bot_id=bot.id,
+            chat_id=chat_id,
+            **kwargs,
+        )
+
+
+file_id_registry: FileIdRegistry = FileIdRegistry(path=settings.PATH_FILE_ID_REGISTRY)
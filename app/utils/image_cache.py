@@ -0,0 +1,374 @@
+from typing import Dict, Iterable, List, Optional, Set
+from pathlib import Path
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import traceback
+
+from logging_handler.main import error_logging
+from settings.config import settings
+
+
+class ImageCache:
+    """Кэш найденных изображений на диске.
+
+    Запрос определяется ключевым словом и фильтрами поиска. Изображения
+    хранятся в папке blobs под именем из хэша содержимого, поэтому одинаковые
+    картинки разных запросов занимают место один раз. Готовые архивы хранятся
+    в папке archives и отдаются повторно без упаковки. Описание запросов лежит
+    в manifest.json. При превышении max_bytes удаляются запросы, к которым
+    дольше всего не обращались.
+
+    Вызывающий получает не сами файлы кэша, а жесткие ссылки на них в своей
+    папке запроса. Поэтому вытеснение файла из кэша не мешает отправке архива
+    другому пользователю, а ссылки удаляются вместе с папкой запроса.
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        """
+        Args:
+            root (Path): Папка кэша
+            max_bytes (int): Максимальный размер кэша в байтах
+        """
+        self.root: Path = Path(root)
+        self.max_bytes: int = max_bytes
+        self.path_blobs: Path = self.root / "blobs"
+        self.path_archives: Path = self.root / "archives"
+        self.path_manifest: Path = self.root / "manifest.json"
+        self._lock: threading.Lock = threading.Lock()
+        self._manifest: Optional[Dict] = None
+        # Время последнего обращения к запросам, еще не записанное на диск
+        self._dirty: bool = False
+
+    @staticmethod
+    def get_query_key(keyword: str, filters: Optional[Dict] = None) -> str:
+        """Возвращает ключ запроса по ключевому слову и фильтрам.
+
+        Регистр и лишние пробелы в ключевом слове не учитываются.
+        """
+        normalized: str = " ".join(keyword.casefold().split())
+        raw_key: str = json.dumps([normalized, filters or {}], sort_keys=True)
+        return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+    def _load(self) -> Dict:
+        """Возвращает manifest, читая его с диска при первом обращении."""
+
+        if self._manifest is None:
+            self._manifest = {"queries": {}, "files": {}}
+            if self.path_manifest.exists():
+                try:
+                    with open(self.path_manifest, "r", encoding="utf-8") as file:
+                        self._manifest = json.load(file)
+                except Exception:
+                    error_logging.error(traceback.format_exc())
+        return self._manifest
+
+    def _save(self) -> None:
+        """Атомарно записывает manifest на диск."""
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        path_tmp: Path = self.path_manifest.with_suffix(".tmp")
+        with open(path_tmp, "w", encoding="utf-8") as file:
+            json.dump(self._manifest, file, ensure_ascii=False)
+        os.replace(path_tmp, self.path_manifest)
+        self._dirty = False
+
+    def _touch(self, query: Dict) -> None:
+        # Попадание в кэш не переписывает manifest, время сохранится при
+        # следующем изменении кэша или в flush
+        query["last_used"] = time.time()
+        self._dirty = True
+
+    def _link(self, names: List[str], folder: Path) -> List[Path]:
+        """Возвращает жесткие ссылки на файлы кэша в папке запроса.
+
+        Если жесткую ссылку создать нельзя (другой диск), файл копируется.
+        """
+        folder.mkdir(parents=True, exist_ok=True)
+        links: List[Path] = []
+        for name in names:
+            link: Path = folder / Path(name).name
+            link.unlink(missing_ok=True)
+            try:
+                os.link(self.root / name, link)
+            except OSError:
+                shutil.copyfile(self.root / name, link)
+            links.append(link)
+        return links
+
+    def _files_exist(self, names: List[str]) -> bool:
+        return all((self.root / name).exists() for name in names)
+
+    def _get_images(
+        self,
+        keyword: str,
+        filters: Optional[Dict],
+        count: int,
+        folder: Path,
+    ) -> Optional[List[Path]]:
+        with self._lock:
+            manifest: Dict = self._load()
+            query: Optional[Dict] = manifest["queries"].get(
+                self.get_query_key(keyword, filters)
+            )
+            # Хватает картинок или такое количество уже искали и больше не нашли
+            if query is None or (
+                count > len(query["images"]) and count > query["requested"]
+            ):
+                return None
+            images: List[str] = query["images"][:count]
+            if not self._files_exist(images):
+                return None
+            self._touch(query)
+            return self._link(images, folder)
+
+    def _get_archives(
+        self,
+        keyword: str,
+        filters: Optional[Dict],
+        count: int,
+        folder: Path,
+    ) -> Optional[List[Path]]:
+        with self._lock:
+            manifest: Dict = self._load()
+            query: Optional[Dict] = manifest["queries"].get(
+                self.get_query_key(keyword, filters)
+            )
+            if query is None:
+                return None
+            archives: Optional[List[str]] = query["archives"].get(str(count))
+            if not archives or not self._files_exist(archives):
+                return None
+            self._touch(query)
+            return self._link(archives, folder)
+
+    def _put_images(
+        self,
+        keyword: str,
+        filters: Optional[Dict],
+        count: int,
+        list_images_name: List,
+        folder: Path,
+    ) -> List[Path]:
+        self.path_blobs.mkdir(parents=True, exist_ok=True)
+        key: str = self.get_query_key(keyword, filters)
+
+        images: List[str] = []
+        sources: Dict[str, Path] = {}
+        for path_image in list_images_name:
+            path_image = Path(path_image)
+            if not path_image.exists():
+                continue
+            digest = hashlib.sha256()
+            with open(path_image, "rb") as file:
+                for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            name: str = f"blobs/{digest.hexdigest()}{path_image.suffix.lower()}"
+            images.append(name)
+            sources[name] = path_image
+
+        with self._lock:
+            manifest: Dict = self._load()
+            # Файлы копируются под блокировкой, иначе вытеснение в другом потоке
+            # может удалить уже существующий файл до записи в manifest
+            for name, path_image in sources.items():
+                if not (self.root / name).exists():
+                    shutil.copyfile(path_image, self.root / name)
+                manifest["files"][name] = path_image.stat().st_size
+            old_query: Optional[Dict] = manifest["queries"].get(key)
+            # Старые архивы собраны из прежнего набора картинок
+            if old_query is not None:
+                self._drop_files(old_query["archives"].values())
+            manifest["queries"][key] = {
+                "keyword": keyword,
+                "filters": filters or {},
+                "images": images,
+                "requested": count,
+                "archives": {},
+                "last_used": time.time(),
+            }
+            if old_query is not None:
+                self._drop_unused_images(old_query["images"])
+            links: List[Path] = self._link(images, folder)
+            self._evict(keep=key)
+            self._save()
+        return links
+
+    def _put_archives(
+        self,
+        keyword: str,
+        filters: Optional[Dict],
+        count: int,
+        list_path_archive: List[Path],
+        folder: Path,
+    ) -> List[Path]:
+        key: str = self.get_query_key(keyword, filters)
+        archive_folder: str = f"archives/{key}_{count}"
+
+        with self._lock:
+            manifest: Dict = self._load()
+            query: Optional[Dict] = manifest["queries"].get(key)
+            # Запрос уже вытеснен из кэша - архив остается у вызывающего
+            if query is None:
+                return list_path_archive
+
+            (self.root / archive_folder).mkdir(parents=True, exist_ok=True)
+            archives: List[str] = []
+            for path_archive in list_path_archive:
+                name: str = f"{archive_folder}/{Path(path_archive).name}"
+                shutil.move(str(path_archive), str(self.root / name))
+                archives.append(name)
+                manifest["files"][name] = (self.root / name).stat().st_size
+
+            query["archives"][str(count)] = archives
+            self._touch(query)
+            links: List[Path] = self._link(archives, folder)
+            self._evict(keep=key)
+            self._save()
+        return links
+
+    def _drop_files(self, groups: Iterable[List[str]]) -> None:
+        """Удаляет файлы архивов из кэша и manifest."""
+
+        manifest: Dict = self._load()
+        for names in groups:
+            for name in names:
+                manifest["files"].pop(name, None)
+                try:
+                    (self.root / name).unlink()
+                except FileNotFoundError:
+                    pass
+            if names:
+                shutil.rmtree(self.root / Path(names[0]).parent, ignore_errors=True)
+
+    def _evict(self, keep: str) -> None:
+        """Удаляет давно не использованные запросы, пока кэш больше max_bytes."""
+
+        manifest: Dict = self._load()
+        queries: Dict = manifest["queries"]
+        files: Dict[str, int] = manifest["files"]
+
+        while sum(files.values()) > self.max_bytes:
+            candidates: List[str] = [key for key in queries if key != keep]
+            if not candidates:
+                break
+            oldest: str = min(candidates, key=lambda key: queries[key]["last_used"])
+            query: Dict = queries.pop(oldest)
+            self._drop_files(query["archives"].values())
+            self._drop_unused_images(query["images"])
+
+    def _drop_unused_images(self, names: List[str]) -> None:
+        """Удаляет картинки, которые не нужны ни одному запросу в кэше."""
+
+        manifest: Dict = self._load()
+        used: Set[str] = {
+            name for query in manifest["queries"].values() for name in query["images"]
+        }
+        for name in names:
+            if name in used or name not in manifest["files"]:
+                continue
+            manifest["files"].pop(name)
+            try:
+                (self.root / name).unlink()
+            except FileNotFoundError:
+                pass
+
+    async def get_images(
+        self,
+        keyword: str,
+        filters: Optional[Dict],
+        count: int,
+        folder: Path,
+    ) -> Optional[List[Path]]:
+        """Возвращает ссылки на закэшированные картинки запроса или None.
+
+        Args:
+            keyword (str): Ключевое слово поиска
+            filters (Dict, optional): Фильтры поиска
+            count (int): Количество картинок
+            folder (Path): Папка запроса, в которой создаются ссылки
+        """
+        return await asyncio.to_thread(
+            self._get_images, keyword, filters, count, folder
+        )
+
+    async def get_archives(
+        self,
+        keyword: str,
+        filters: Optional[Dict],
+        count: int,
+        folder: Path,
+    ) -> Optional[List[Path]]:
+        """Возвращает ссылки на части готового архива запроса или None.
+
+        Args:
+            keyword (str): Ключевое слово поиска
+            filters (Dict, optional): Фильтры поиска
+            count (int): Количество картинок в архиве
+            folder (Path): Папка запроса, в которой создаются ссылки
+        """
+        return await asyncio.to_thread(
+            self._get_archives, keyword, filters, count, folder
+        )
+
+    async def put_images(
+        self,
+        keyword: str,
+        filters: Optional[Dict],
+        count: int,
+        list_images_name: List,
+        folder: Path,
+    ) -> List[Path]:
+        """Копирует скачанные картинки в кэш и возвращает ссылки на них.
+
+        Args:
+            keyword (str): Ключевое слово поиска
+            filters (Dict, optional): Фильтры поиска
+            count (int): Сколько картинок искали
+            list_images_name (List): Пути до скачанных картинок
+            folder (Path): Папка запроса, в которой создаются ссылки
+        """
+        return await asyncio.to_thread(
+            self._put_images, keyword, filters, count, list_images_name, folder
+        )
+
+    async def put_archives(
+        self,
+        keyword: str,
+        filters: Optional[Dict],
+        count: int,
+        list_path_archive: List[Path],
+        folder: Path,
+    ) -> List[Path]:
+        """Переносит части архива в кэш и возвращает ссылки на них.
+
+        Args:
+            keyword (str): Ключевое слово поиска
+            filters (Dict, optional): Фильтры поиска
+            count (int): Количество картинок в архиве
+            list_path_archive (List[Path]): Пути до частей архива
+            folder (Path): Папка запроса, в которой создаются ссылки
+        """
+        return await asyncio.to_thread(
+            self._put_archives, keyword, filters, count, list_path_archive, folder
+        )
+
+    def _flush(self) -> None:
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    async def flush(self) -> None:
+        """Записывает на диск время обращения к запросам после попаданий в кэш."""
+
+        await asyncio.to_thread(self._flush)
+
+
+image_cache: ImageCache = ImageCache(
+    root=settings.find_image.CACHE_PATH,
+    max_bytes=settings.find_image.CACHE_MAX_BYTES,
+)
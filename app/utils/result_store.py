@@ -0,0 +1,69 @@
+from typing import Any, Optional, Sequence, Tuple
+import secrets
+
+from settings.config import settings
+from utils.cache import TTLCache
+
+
+class ResultStore:
+    """Хранилище результатов поиска для постраничного просмотра.
+
+    Результаты одного поиска сохраняются под коротким id, который передается в
+    callback data кнопок, поэтому в FSM ничего не хранится, а при листании
+    достается только одна запись. Количество поисков и записей в поиске
+    ограничено, поиски удаляются по времени жизни или когда к ним дольше всего
+    не обращались.
+
+    Результаты хранятся в памяти процесса и не попадают в хранилище FSM, поэтому
+    листать их можно только когда все обновления обрабатывает один процесс бота.
+    Если запущено несколько процессов с общим redis или sqlite хранилищем,
+    кнопка, попавшая в другой процесс, покажет, что результаты устарели.
+    """
+
+    def __init__(self, ttl: float, max_searches: int, max_items: int):
+        """
+        Args:
+            ttl (float): Время жизни результатов поиска в секундах
+            max_searches (int): Максимальное количество хранимых поисков
+            max_items (int): Максимальное количество записей в одном поиске
+        """
+        self.max_items: int = max_items
+        self._searches: TTLCache = TTLCache(maxsize=max_searches, ttl=ttl)
+
+    def put(self, records: Sequence[Any]) -> str:
+        """Сохраняет результаты поиска и возвращает id поиска.
+
+        Args:
+            records (Sequence): Компактные записи результатов
+        """
+        search_id: str = secrets.token_urlsafe(6)
+        self._searches.set(search_id, tuple(records[: self.max_items]))
+        return search_id
+
+    def get_page(self, search_id: str, page: int) -> Optional[Tuple[Any, int]]:
+        """Возвращает запись страницы и общее количество записей.
+
+        Args:
+            search_id (str): Id поиска
+            page (int): Номер страницы начиная с 0
+
+        Returns:
+            Tuple[Any, int] | None: None если поиск устарел или страницы нет
+        """
+        records: Optional[Tuple] = self._searches.get(search_id)
+        if records is None or not 0 <= page < len(records):
+            return None
+        return records[page], len(records)
+
+    def delete(self, search_id: str) -> None:
+        self._searches.delete(search_id)
+
+    def __len__(self) -> int:
+        return len(self._searches)
+
+
+video_result_store: ResultStore = ResultStore(
+    ttl=settings.find_video.RESULT_TTL,
+    max_searches=settings.find_video.RESULT_MAX_SEARCHES,
+    max_items=settings.find_video.RESULT_MAX_ITEMS,
+)
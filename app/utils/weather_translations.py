@@ -0,0 +1,124 @@
+from typing import Dict, Mapping, Optional, Tuple
+from types import MappingProxyType
+from pathlib import Path
+import asyncio
+import json
+import os
+import traceback
+
+from logging_handler.main import error_logging
+from settings.config import settings
+
+
+class WeatherTranslations:
+    """Переводы описаний погоды сайта https://openweathermap.org на русский язык.
+
+    Файл с переводами читается один раз, после чего поиск перевода идет по
+    неизменяемому словарю в памяти без обращений к диску. При включенной
+    горячей перезагрузке фоновая задача следит за временем изменения файла и
+    подменяет словарь целиком, если файл изменился.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        hot_reload: bool = False,
+        reload_interval: float = 60,
+    ):
+        """
+        Args:
+            path (Path): Путь до файла с переводами
+            hot_reload (bool, optional): Перечитывать файл при его изменении
+            reload_interval (float, optional): Как часто проверять файл в секундах
+        """
+        self.path: Path = Path(path)
+        self.hot_reload: bool = hot_reload
+        self.reload_interval: float = reload_interval
+        self._lookup: Optional[Mapping[Tuple[str, str], Tuple[str, str]]] = None
+        self._mtime: Optional[float] = None
+        self._watch_task: Optional[asyncio.Task] = None
+
+    def load(self) -> None:
+        """Читает файл с переводами и заменяет словарь в памяти."""
+
+        mtime: float = os.stat(self.path).st_mtime
+        with open(self.path, "r", encoding="utf-8") as file:
+            data: Dict = json.load(file)
+
+        lookup: Dict[Tuple[str, str], Tuple[str, str]] = {}
+        for weather_main, descriptions in data.items():
+            for weather_desc, (text, emoji) in descriptions.items():
+                lookup[(weather_main, weather_desc)] = (text, emoji)
+
+        self._lookup = MappingProxyType(lookup)
+        self._mtime = mtime
+
+    def get(self, weather_main: str, weather_desc: str) -> Optional[Tuple[str, str]]:
+        """Возвращает перевод и эмоджи описания погоды или None если перевода нет.
+
+        Args:
+            weather_main (str): Группа погоды, например 'Clouds'
+            weather_desc (str): Описание погоды, например 'broken clouds'
+
+        Returns:
+            Optional[Tuple[str, str]]: Кортеж (перевод, эмоджи)
+        """
+        if self._lookup is None:
+            self.load()
+        return self._lookup.get((weather_main, weather_desc))
+
+    async def start(self) -> None:
+        """Загружает переводы вне цикла событий и запускает слежение за файлом."""
+
+        await asyncio.to_thread(self.load)
+        if self.hot_reload and self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        """Останавливает слежение за файлом."""
+
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+    async def _watch(self) -> None:
+        """Перечитывает файл с переводами если изменилось время его изменения."""
+
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                mtime: float = (await asyncio.to_thread(os.stat, self.path)).st_mtime
+                if mtime != self._mtime:
+                    await asyncio.to_thread(self.load)
+            except Exception:
+                # Оставляем прежние переводы, если новый файл не удалось прочитать
+                error_logging.error(traceback.format_exc())
+
+
+# Загруженные переводы. Ключ - путь до файла с переводами
+_registries: Dict[Path, WeatherTranslations] = {}
+
+
+def get_weather_translations(path: Path) -> WeatherTranslations:
+    """Возвращает переводы описаний погоды для файла.
+
+    Args:
+        path (Path): Путь до файла с переводами
+
+    Returns:
+        WeatherTranslations: Переводы описаний погоды
+    """
+    path: Path = Path(path)
+    registry: Optional[WeatherTranslations] = _registries.get(path)
+    if registry is None:
+        registry = WeatherTranslations(
+            path=path,
+            hot_reload=settings.WEATHER_TRANSLATION_HOT_RELOAD,
+            reload_interval=settings.WEATHER_TRANSLATION_RELOAD_INTERVAL,
+        )
+        _registries[path] = registry
+    return registry
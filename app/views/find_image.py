@@ -1,6 +1,7 @@
 from pathlib import Path
 from typing import Dict
 from typing import List
+from typing import Optional
 import uuid
 
 from aiogram import Router, F
@@ -12,13 +13,12 @@ from aiogram.fsm.state import State, StatesGroup
 from extension import bot
 from errors_handlers.main import chek_number_is_positivity
 from bot_functions.find_image import (
-    find_image_with_goole_and_save_image,
+    find_image_archives,
     get_url_link_posters_for_kinopoisk,
 )
 from bot_functions.total import (
-    get_list_images_name,
     delete_images_and_archive,
-    save_images_with_zip_archive,
+    create_zip_archive,
     save_images,
 )
 from settings.config import settings
@@ -40,6 +40,39 @@ class FindImage(StatesGroup):
     count: State = State()
 
 
+async def send_archive_parts(
+    chat_id: int,
+    list_path_archive: List[Path],
+    reply_markup: Optional[ReplyKeyboardRemove] = None,
+):
+    """Отправляет пользователю все части архива с изображениями.
+
+    Args:
+        chat_id (int): Id чата
+        list_path_archive (List[Path]): Список путей до частей архива
+        reply_markup (ReplyKeyboardRemove, optional): Клавиатура для сообщения
+    """
+    if not list_path_archive:
+        await bot.send_message(
+            chat_id=chat_id,
+            text="Не удалось упаковать изображения в архив",
+            reply_markup=reply_markup,
+        )
+        return
+
+    count_parts: int = len(list_path_archive)
+    for number, path_archive in enumerate(list_path_archive, start=1):
+        caption: str = "Скаченные изображения"
+        if count_parts > 1:
+            caption = f"{caption} (часть {number} из {count_parts})"
+        await bot.send_document(
+            chat_id=chat_id,
+            document=FSInputFile(path=str(path_archive)),
+            caption=caption,
+            reply_markup=reply_markup,
+        )
+
+
 @router.message(StateFilter(None), F.text == "Поиск Изображений")
 async def handler_find_image(message: Message):
     """Отправляет пользователю клавиатуру с выринтами выбора поиска изображений."""
@@ -162,16 +195,15 @@ async def finish_find_image(message: Message, state: FSMContext):
 
                 await message.answer(text="Идет упаковка в архив")
 
-                save_images_with_zip_archive(
+                list_path_archive: List[Path] = await create_zip_archive(
                     path_folder=path_folder,
                     path_archive=path_archive,
                     list_images_name=data.message,
                 )
 
-                await bot.send_document(
+                await send_archive_parts(
                     chat_id=message.chat.id,
-                    document=FSInputFile(path=str(path_archive)),
-                    caption="Скаченные изображения",
+                    list_path_archive=list_path_archive,
                 )
                 # Удаляем изображения и архив
                 delete_images_and_archive(
@@ -222,11 +254,8 @@ async def finish_find_image(message: Message, state: FSMContext):
                 message.from_user.id
             )
 
-            # Путь до архива с картинками
-            path_archive: Path = path_image / f"{name}.zip"
-
             filters: Dict = {"size": "large"}
-            data: ResponseData = await find_image_with_goole_and_save_image(
+            data: ResponseData = await find_image_archives(
                 name=name,
                 count=number.message,
                 filters=filters,
@@ -235,26 +264,9 @@ async def finish_find_image(message: Message, state: FSMContext):
             )
 
             if data.message:
-
-                # Указываем имена изображений
-                list_images_name: List = get_list_images_name(
-                    count_images=data.message,
-                    path_find_image=path_image,
-                )
-                # Сохраняем изображения в архив
-
-                await message.answer(text="Идет упаковка в архив")
-
-                save_images_with_zip_archive(
-                    path_folder=path_image,
-                    path_archive=path_archive,
-                    list_images_name=list_images_name,
-                )
-
-                await bot.send_document(
+                await send_archive_parts(
                     chat_id=message.chat.id,
-                    document=FSInputFile(path=str(path_archive)),
-                    caption="Скаченные изображения",
+                    list_path_archive=data.message,
                     reply_markup=ReplyKeyboardRemove(),
                 )
 
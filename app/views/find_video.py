@@ -1,4 +1,4 @@
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 from aiogram import Router, F
 from aiogram.types import ReplyKeyboardRemove, Message, CallbackQuery
@@ -12,7 +12,11 @@ from keyboards.inline_kb import (
 )
 from keyboards.reply_kb import get_cancel_button, get_start_button_bot
 from keyboards.inline_kb import get_button_for_forward_or_back
-from bot_functions.find_video import get_description_video_by_youtube
+from bot_functions.find_video import (
+    get_description_video_by_youtube,
+    format_video_description,
+)
+from utils.result_store import video_result_store
 from extension import bot
 from settings.config import settings
 from settings.response import ResponseData
@@ -133,14 +137,12 @@ async def finish_find_image(message: Message, state: FSMContext):
             name_video=message.text,
             sort=sort,
             api_key=settings.find_video.youtube.YoutubeApiKey,
-            youtube_video_url=settings.find_video.youtube.VIDEO_URL,
-            youtube_channel_url=settings.find_video.youtube.CHANNEL_URL,
         )
 
         if response_youtube.message:
-            
-            # Обновляем FSM FindVideo.Добавляем список с описаниями видео
-            await state.update_data(video_search_list=response_youtube.message)
+
+            # Результаты хранятся вне FSM, в кнопках передается только id поиска
+            search_id: str = video_result_store.put(records=response_youtube.message)
 
             await bot.send_message(
                 chat_id=message.chat.id,
@@ -149,9 +151,15 @@ async def finish_find_image(message: Message, state: FSMContext):
             )
 
             await message.answer(
-                text=response_youtube.message[0],
+                text=format_video_description(
+                    video=response_youtube.message[0],
+                    order=1,
+                    youtube_video_url=settings.find_video.youtube.VIDEO_URL,
+                    youtube_channel_url=settings.find_video.youtube.CHANNEL_URL,
+                ),
                 reply_markup=get_button_for_forward_or_back(
-                    video_search_list=response_youtube.message,
+                    search_id=search_id,
+                    total=len(response_youtube.message),
                 ),
             )
             await state.set_state(FindVideo.end_search_video)
@@ -180,15 +188,34 @@ async def message_user(message: Message):
 async def finish_find_video(call: CallbackQuery, state: FSMContext):
     """Работа с FSM FindVideo.Пролистывает найденные виедо или завершает работу поиска видео."""
 
-    _, _, count = call.data.split(" ")
-    data: Dict = await state.get_data()
-    video_search_list: List = data["video_search_list"]
+    callback_data: List[str] = call.data.split(" ")
+    page: Optional[Tuple[Dict, int]] = None
+    # Кнопки без id поиска остались от старых сообщений и считаются устаревшими
+    if len(callback_data) == 4:
+        _, _, search_id, count = callback_data
+        count: int = int(count)
+        page = video_result_store.get_page(search_id=search_id, page=count)
+
+    if page is None:
+        await call.message.edit_reply_markup(reply_markup=None)
+        await call.answer(
+            text="Результаты поиска устарели. Выполните поиск снова",
+            show_alert=True,
+        )
+        return
 
+    video, total = page
     await bot.edit_message_text(
-        text=video_search_list[int(count)],
+        text=format_video_description(
+            video=video,
+            order=count + 1,
+            youtube_video_url=settings.find_video.youtube.VIDEO_URL,
+            youtube_channel_url=settings.find_video.youtube.CHANNEL_URL,
+        ),
         reply_markup=get_button_for_forward_or_back(
-            video_search_list=video_search_list,
-            count=int(count),
+            search_id=search_id,
+            total=total,
+            count=count,
         ),
         chat_id=call.message.chat.id,
         message_id=call.message.message_id,
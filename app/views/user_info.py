@@ -6,7 +6,6 @@ from aiogram.types import (
     Message,
     CallbackQuery,
     ReplyKeyboardRemove,
-    FSInputFile,
 )
 from aiogram.filters import StateFilter
 from aiogram.fsm.state import State, StatesGroup
@@ -18,6 +17,7 @@ from errors_handlers.user_info import Ip4Handler, Ipi6Handler
 from bot_functions.user_info import get_user_info, get_ip_info
 from settings.config import settings
 from extension import bot
+from utils.file_id_registry import file_id_registry
 from settings.response import ResponseData
 
 
@@ -173,9 +173,11 @@ async def add_info_ip(message: Message, state: FSMContext):
                     data: str = data_ip.message[1]
 
                     await state.clear()
-                    await bot.send_photo(
+                    # Флаги не меняются - после первой загрузки отправляем file_id
+                    await file_id_registry.send_photo(
+                        bot=bot,
                         chat_id=message.chat.id,
-                        photo=FSInputFile(path=path_img),
+                        path=path_img,
                         caption=data,
                         reply_markup=ReplyKeyboardRemove(),
                     )